@@ -3,6 +3,8 @@ FastAPI application for Dynamics 365 Entity Visualization
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 import sys
 from pathlib import Path
@@ -15,13 +17,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import routes
-from routes.entities import router as entities_router
+from routes.entities import router as entities_router, snapshot_cache, graph_events
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the background snapshot refresher that feeds /api/graph/events
+    """
+    graph_events.attach(asyncio.get_running_loop())
+    snapshot_cache.start_background_refresh()
+    yield
+    snapshot_cache.stop_background_refresh()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Dynamics 365 Entity Visualization API",
     description="API for fetching and visualizing Dynamics 365 entity structures",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for local development and ngrok production
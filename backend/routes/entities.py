@@ -1,20 +1,69 @@
 """
 API routes for entity and relationship operations
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Header
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import io
+import json
 import logging
+import time
 from services.dynamics_service import DynamicsService
-from services.entity_filters import filter_business_entities, filter_core_and_custom_entities
+from services.entity_rules import FILTER_MODES, get_rules, rule_store
+from services.graph_masks import FilterSyntaxError, GraphMasks, format_filter, mode_filter, parse_filter
+from services.graph_snapshot import SnapshotCache
+from services.layout_service import LayoutService, LAYOUT_TYPES
+from services.cluster_service import ClusterService, CLUSTER_MODES
+from services.spatial_index import SpatialIndex
+from services.search_index import SearchIndex
+from services.graph_analytics import analytics_stage
+from services.path_service import PathIndex, RELATIONSHIP_TYPES
+from services.cascade_service import CascadeIndex, CASCADE_OPERATIONS, cascade_stage
+from services.record_counts import RecordCountCache
+from services.snapshot_diff import summarize_changes
+from services.graph_events import GraphEventBroker, format_sse
+from services.graph_records import json_default
+from services.export_writers import (
+    ENTITY_CSV_COLUMNS, RELATIONSHIP_CSV_COLUMNS, CsvWriter, NdjsonWriter,
+    stream_chunks, write_graph_json, write_records
+)
+from services.graph_formats import write_dot, write_gexf, write_graphml
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize service
+# Handlers are plain functions unless they only await: snapshot_cache.get() may run a full
+# crawl or wait for the refresh lock, so FastAPI must run them in its threadpool rather
+# than on the event loop that serves /api/graph/events.
+
+# Initialize services
 dynamics_service = DynamicsService()
+snapshot_cache = SnapshotCache(dynamics_service)
+snapshot_cache.add_stage(analytics_stage)
+snapshot_cache.add_stage(cascade_stage)
+record_counts = RecordCountCache(dynamics_service)
+snapshot_cache.add_stage(record_counts.record_count_stage)
+graph_events = GraphEventBroker()
+snapshot_cache.add_listener(graph_events.publish)
+layout_service = LayoutService()
+cluster_service = ClusterService()
+
+
+def invalidate_on_ingest_change(rules, previous) -> None:
+    """
+    Re-crawl when reloaded entity rules change what is fetched from Dynamics 365
+    (view-only rule changes just key new cached views by rules version)
+    """
+    if rules.ingest_key() != previous.ingest_key():
+        snapshot_cache.invalidate()
+
+
+rule_store.add_listener(invalidate_on_ingest_change)
 
 
 @router.get("/entities")
-async def get_entities():
+def get_entities():
     """
     Get all entity definitions from Dynamics 365
 
@@ -30,8 +79,86 @@ async def get_entities():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/relationships/between")
+def get_relationships_between(
+    source: str = Query(..., description="Logical name of the first entity"),
+    target: str = Query(..., description="Logical name of the second entity"),
+    directed: bool = Query(False, description="Only relationships from source to target")
+):
+    """
+    Get every relationship between two entities (the detail behind an aggregated edge)
+
+    Returns:
+        List of full relationship objects connecting the pair
+    """
+    try:
+        snapshot = snapshot_cache.get()
+        source, target = source.lower(), target.lower()
+        relationships = [
+            e for e in snapshot.edges
+            if (e['sourceEntity'] == source and e['targetEntity'] == target)
+            or (not directed and e['sourceEntity'] == target and e['targetEntity'] == source)
+        ]
+        return {
+            "relationships": relationships,
+            "count": len(relationships),
+            "snapshotVersion": snapshot.version
+        }
+    except Exception as e:
+        logger.error(f"Error fetching relationships between {source} and {target}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/entities/{logical_name}/attributes")
+def get_entity_attributes(
+    logical_name: str,
+    required_only: bool = Query(False, description="Only ApplicationRequired / SystemRequired attributes"),
+    attribute_type: str = Query(None, description="Only attributes of this type, e.g. 'LookupType', 'StringType'")
+):
+    """
+    Get attribute metadata for one entity in the current snapshot
+
+    Served from the columnar attribute catalog, which is fetched in bulk for
+    all snapshot entities on first use (concurrent first requests wait for a
+    single fetch) and kept until the snapshot refreshes.
+
+    Returns:
+        List of attributes with type, required level, max length, option set and lookup targets
+    """
+    try:
+        snapshot = snapshot_cache.get()
+        catalog = get_attribute_catalog(snapshot)
+
+        if logical_name.lower() not in catalog.entity_slices:
+            raise HTTPException(status_code=404, detail=f"Entity not found: {logical_name}")
+
+        attributes = catalog.get_entity_attributes(logical_name.lower(), required_only, attribute_type)
+        return {
+            "entity": logical_name.lower(),
+            "attributes": attributes,
+            "count": len(attributes),
+            "snapshotVersion": snapshot.version
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching attributes for {logical_name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def get_attribute_catalog(snapshot):
+    """
+    Return the attribute catalog for every entity in the snapshot, fetched once per snapshot
+    (get_derived makes concurrent first requests share one fetch)
+    """
+    return snapshot.get_derived(
+        'attributes',
+        lambda: dynamics_service.get_attribute_catalog([n['logicalName'] for n in snapshot.nodes])
+    )
+
+
 @router.get("/relationships")
-async def get_relationships():
+def get_relationships():
     """
     Get all relationships between entities
 
@@ -51,10 +178,14 @@ async def get_relationships():
 
 
 @router.get("/graph")
-async def get_graph_data(
+def get_graph_data(
     filter_mode: str = Query("core_custom", description="Filter mode: 'core_custom' (default, ~620 entities), 'business' (~820 entities), 'custom' (~612 entities), 'all' (964 entities)"),
     prefixes: str = Query(None, description="Comma-separated prefixes to include (e.g., 'qrt_,msdyn_'). Only works with core_custom mode."),
-    limit: int = Query(None, description="Limit number of entities returned")
+    limit: int = Query(None, description="Limit number of entities returned"),
+    layout: str = Query(None, description="Precompute node positions server-side: 'hierarchy', 'radial' or 'layered'"),
+    cluster_by: str = Query(None, description="Collapse entities into clusters: 'prefix', 'hierarchy' or 'component'"),
+    aggregate_edges: bool = Query(False, description="Merge parallel relationships between the same entity pair into one weighted edge"),
+    node_filter: str = Query(None, alias="filter", description="Filter expression, e.g. 'custom AND NOT activity' (replaces filter_mode/prefixes)")
 ):
     """
     Get complete graph data with entities and relationships
@@ -71,76 +202,800 @@ async def get_graph_data(
 
         limit: Limit number of entities (e.g., 100 for testing)
 
+        layout: Optional server-side layout. When set, the response includes a
+                'positions' map of entity id -> {x, y} so the client can skip layout.
+                Positions are cached per snapshot, view and layout type.
+
+        cluster_by: Optional level-of-detail aggregation. Nodes become clusters
+                    (by publisher prefix, hierarchy level or connected component)
+                    with member counts, and edges become weighted inter-cluster
+                    edges. Expand a cluster with /api/graph/clusters/{cluster_id}.
+
+        aggregate_edges: Merge parallel relationships (same type and entity pair)
+                         into one edge with 'weight' and the list of 'schemaNames'.
+                         Full details per pair: /api/relationships/between?source=&target=
+
+        filter: Boolean filter expression over entity predicates, used instead of
+                filter_mode/prefixes. Predicates: all, custom, business, core, activity,
+                empty (no records), prefix:<prefix>, level:<hierarchy level>, entity:<logical name>.
+                Combine with AND, OR, NOT and parentheses (or &, |, !).
+                Relationships are kept when both ends are selected.
+
     Returns:
-        Dictionary containing nodes and edges for graph visualization
+        Dictionary containing nodes and edges for graph visualization.
+        Nodes carry recordCount (total records, null if the entity cannot be counted).
 
     Examples:
         /api/graph - Default: Core + all custom entities
         /api/graph?filter_mode=core_custom&prefixes=qrt_,msdyn_ - Core + specific prefixes only
         /api/graph?filter_mode=business - All business entities
         /api/graph?limit=50 - First 50 entities
+        /api/graph?filter_mode=all&layout=hierarchy - All entities with precomputed positions
+        /api/graph?filter_mode=all&cluster_by=prefix - One node per publisher prefix
+        /api/graph?filter_mode=all&aggregate_edges=true - One edge per related entity pair
+        /api/graph?filter=custom AND NOT activity - Custom entities except activities
+        /api/graph?filter=core OR (prefix:qrt_ AND level:3) - Core entities plus level-3 qrt_ entities
+        /api/graph?filter=custom AND NOT empty - Custom entities that hold data
     """
     try:
-        logger.info(f"Fetching graph data (filter_mode={filter_mode}, prefixes={prefixes}, limit={limit})")
-        graph_data = dynamics_service.get_entity_graph_data()
-
-        # Apply filter based on mode
-        if filter_mode == "core_custom":
-            # Option 2: Core + Custom (RECOMMENDED)
-            prefix_list = prefixes.split(',') if prefixes else None
-            filtered_nodes, filtered_edges = filter_core_and_custom_entities(
-                graph_data['nodes'],
-                graph_data['edges'],
-                include_prefixes=prefix_list
-            )
-            graph_data['nodes'] = filtered_nodes
-            graph_data['edges'] = filtered_edges
-            logger.info(f"Core+Custom filter: {len(filtered_nodes)} entities, {len(filtered_edges)} relationships")
-
-        elif filter_mode == "business":
-            # Business entities only (exclude system/metadata)
-            filtered_nodes, filtered_edges = filter_business_entities(
-                graph_data['nodes'],
-                graph_data['edges']
+        logger.info(f"Fetching graph data (filter_mode={filter_mode}, prefixes={prefixes}, filter={node_filter}, limit={limit}, layout={layout}, cluster_by={cluster_by})")
+        if filter_mode not in FILTER_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid filter_mode: {filter_mode}")
+        if layout is not None and layout not in LAYOUT_TYPES:
+            raise HTTPException(status_code=400, detail=f"Invalid layout: {layout}")
+        if cluster_by is not None and cluster_by not in CLUSTER_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid cluster_by: {cluster_by}")
+
+        snapshot = snapshot_cache.get()
+        try:
+            view_key, nodes, edges = get_graph_view(snapshot, filter_mode, prefixes, limit, node_filter)
+        except FilterSyntaxError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {e}")
+        logger.info(f"{node_filter or filter_mode} view: {len(nodes)} entities, {len(edges)} relationships")
+
+        if cluster_by:
+            clustering = get_clustering(snapshot, view_key, nodes, edges, cluster_by)
+            nodes, edges = clustering.cluster_nodes, clustering.cluster_edges
+            view_key = view_key + (('cluster_by', cluster_by),)
+        elif aggregate_edges:
+            raw_edges = edges
+            edges = snapshot.get_derived(
+                ('aggregated', view_key),
+                lambda: dynamics_service.aggregate_relationships(raw_edges)
             )
-            graph_data['nodes'] = filtered_nodes
-            graph_data['edges'] = filtered_edges
-            logger.info(f"Business filter: {len(filtered_nodes)} entities, {len(filtered_edges)} relationships")
-
-        elif filter_mode == "custom":
-            # Custom entities only
-            filtered_nodes = [n for n in graph_data['nodes'] if n['isCustomEntity']]
-            custom_entity_names = {n['id'] for n in filtered_nodes}
-            filtered_edges = [
-                e for e in graph_data['edges']
-                if e['sourceEntity'] in custom_entity_names and e['targetEntity'] in custom_entity_names
-            ]
-            graph_data['nodes'] = filtered_nodes
-            graph_data['edges'] = filtered_edges
-            logger.info(f"Custom filter: {len(filtered_nodes)} entities, {len(filtered_edges)} relationships")
+            view_key = view_key + (('aggregate_edges', True),)
+            logger.info(f"Aggregated {len(raw_edges)} relationships into {len(edges)} edges")
 
-        elif filter_mode == "all":
-            logger.info(f"No filter: {len(graph_data['nodes'])} entities, {len(graph_data['edges'])} relationships")
+        response = {
+            "nodes": nodes,
+            "edges": edges,
+            "nodeCount": len(nodes),
+            "edgeCount": len(edges),
+            "snapshotVersion": snapshot.version
+        }
 
-        else:
+        if cluster_by:
+            response["clusterBy"] = cluster_by
+
+        if layout:
+            response["positions"] = get_positions(snapshot, view_key, nodes, edges, layout)
+
+        return snapshot_json_response(response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching graph data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def snapshot_json_response(content: dict) -> Response:
+    """
+    JSON response for content holding snapshot records, serialized directly
+    (records become dicts via json_default) instead of through jsonable_encoder
+    """
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':'), default=json_default)
+    return Response(content=body, media_type="application/json")
+
+
+def get_graph_view(snapshot, filter_mode: str, prefixes: str = None, limit: int = None, node_filter: str = None):
+    """
+    Return the filtered nodes and edges for a /api/graph view of the snapshot,
+    cached on the snapshot so repeated requests skip filtering
+
+    Filter modes and filter expressions are both evaluated as boolean masks
+    over the snapshot's predicate masks (see graph_masks).
+
+    :param node_filter: Filter expression used instead of filter_mode/prefixes
+    :return: Tuple of (view_key, nodes, edges)
+    :raises FilterSyntaxError: If node_filter cannot be parsed
+    """
+    rules = get_rules()
+    limit = limit if limit and limit > 0 else None
+    if node_filter:
+        tree = parse_filter(node_filter)
+        view_key = ('filter', format_filter(tree), limit, rules.version)
+    else:
+        prefix_list = view_prefixes(filter_mode, prefixes)
+        tree = mode_filter(filter_mode, prefix_list)
+        view_key = (filter_mode, prefix_list, limit, rules.version)
+
+    def build():
+        masks = snapshot.get_derived(
+            ('masks', rules.version),
+            lambda: GraphMasks(snapshot.nodes, snapshot.edges, rules)
+        )
+        nodes, edges = masks.select(tree, limit)
+        if not node_filter and filter_mode == 'all' and limit is None:
+            # The unfiltered view has always included relationships to entities outside the snapshot
+            edges = list(snapshot.edges)
+        return nodes, edges
+
+    nodes, edges = snapshot.get_derived(('view', view_key), build)
+    return view_key, nodes, edges
+
+
+def view_prefixes(filter_mode: str, prefixes: str = None) -> tuple:
+    """
+    Normalized prefixes of a filter mode view (only core_custom uses them)
+    """
+    if filter_mode != 'core_custom' or not prefixes:
+        return ()
+    return tuple(p.strip().lower() for p in prefixes.split(',') if p.strip())
+
+
+def select_version_view(version, filter_mode: str, prefixes: str = None) -> tuple:
+    """
+    Ids of the nodes and edges a filter mode view held in a recorded snapshot version
+
+    :param version: VersionRecord from the snapshot history
+    :return: Tuple of (node ids, edge ids)
+    """
+    tree = mode_filter(filter_mode, view_prefixes(filter_mode, prefixes))
+    nodes, edges = GraphMasks(list(version.nodes.values()), list(version.edges.values()), get_rules()).select(tree)
+    if filter_mode == 'all':
+        return {n['id'] for n in nodes}, set(version.edges)
+    return {n['id'] for n in nodes}, {e['id'] for e in edges}
+
+
+def get_positions(snapshot, view_key: tuple, nodes: list, edges: list, layout: str) -> dict:
+    """
+    Return node positions for a graph view, computed once per snapshot and layout type
+    """
+    return snapshot.get_derived(
+        ('layout', view_key, layout),
+        lambda: layout_service.compute_layout(nodes, edges, layout)
+    )
+
+
+def get_clustering(snapshot, view_key: tuple, nodes: list, edges: list, cluster_by: str):
+    """
+    Return the clustering of a graph view, computed once per snapshot
+    """
+    return snapshot.get_derived(
+        ('clusters', view_key, cluster_by),
+        lambda: cluster_service.build_clustering(nodes, edges, cluster_by)
+    )
+
+
+@router.get("/graph/clusters/{cluster_id}")
+def expand_cluster(
+    cluster_id: str,
+    filter_mode: str = Query("core_custom", description="Filter mode the cluster was built from"),
+    prefixes: str = Query(None, description="Comma-separated prefixes (only for core_custom mode)"),
+    limit: int = Query(None, description="Limit number of entities in the view")
+):
+    """
+    Drill down into one cluster returned by /api/graph?cluster_by=...
+
+    Path Parameters:
+        cluster_id: Cluster id, e.g. 'prefix:qrt_', 'hierarchy:3' or 'component:0'
+
+    Returns:
+        The cluster summary, its member entities, the relationships among them,
+        and weighted edges to the other clusters
+
+    Example:
+        /api/graph/clusters/prefix:msdyn_?filter_mode=all
+    """
+    try:
+        cluster_by = cluster_id.split(':', 1)[0]
+        if cluster_by not in CLUSTER_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid cluster id: {cluster_id}")
+        if filter_mode not in FILTER_MODES:
             raise HTTPException(status_code=400, detail=f"Invalid filter_mode: {filter_mode}")
 
-        # Apply limit if specified
-        if limit and limit > 0:
-            graph_data['nodes'] = graph_data['nodes'][:limit]
-            limited_entity_names = {n['id'] for n in graph_data['nodes']}
-            graph_data['edges'] = [
-                e for e in graph_data['edges']
-                if e['sourceEntity'] in limited_entity_names and e['targetEntity'] in limited_entity_names
+        snapshot = snapshot_cache.get()
+        view_key, nodes, edges = get_graph_view(snapshot, filter_mode, prefixes, limit)
+        clustering = get_clustering(snapshot, view_key, nodes, edges, cluster_by)
+
+        if cluster_id not in clustering.cluster_index:
+            raise HTTPException(status_code=404, detail=f"Cluster not found: {cluster_id}")
+
+        expanded = clustering.expand(cluster_id)
+        return {
+            **expanded,
+            "nodeCount": len(expanded['nodes']),
+            "edgeCount": len(expanded['edges']),
+            "snapshotVersion": snapshot.version
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error expanding cluster {cluster_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/graph/viewport")
+def get_graph_viewport(
+    x0: float = Query(..., description="Left edge of the viewport in flow coordinates"),
+    y0: float = Query(..., description="Top edge of the viewport in flow coordinates"),
+    x1: float = Query(..., description="Right edge of the viewport in flow coordinates"),
+    y1: float = Query(..., description="Bottom edge of the viewport in flow coordinates"),
+    zoom: float = Query(1.0, description="Client zoom factor; lower zoom returns less detail per node/edge"),
+    layout: str = Query("hierarchy", description="Layout the viewport refers to: 'hierarchy', 'radial' or 'layered'"),
+    filter_mode: str = Query("core_custom", description="Filter mode of the view"),
+    prefixes: str = Query(None, description="Comma-separated prefixes (only for core_custom mode)"),
+    limit: int = Query(None, description="Limit number of entities in the view")
+):
+    """
+    Get only the nodes and edges visible in a viewport of a laid-out graph view
+
+    Uses a grid index over the cached layout positions, so the cost of a
+    pan/zoom request follows what is visible rather than the size of the view.
+
+    Detail levels by zoom:
+        - zoom < 0.3: 'minimal' (id, label, hierarchyLevel)
+        - zoom < 0.6: 'summary' (adds logical name, custom/activity flags, relationship type)
+        - otherwise: 'full' records
+
+    Returns:
+        Dictionary with visible nodes, edges, their positions and the detail level used
+
+    Example:
+        /api/graph/viewport?x0=0&y0=0&x1=1600&y1=900&zoom=0.5&filter_mode=all
+    """
+    try:
+        if filter_mode not in FILTER_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid filter_mode: {filter_mode}")
+        if layout not in LAYOUT_TYPES:
+            raise HTTPException(status_code=400, detail=f"Invalid layout: {layout}")
+
+        snapshot = snapshot_cache.get()
+        view_key, nodes, edges = get_graph_view(snapshot, filter_mode, prefixes, limit)
+        spatial_index = snapshot.get_derived(
+            ('spatial', view_key, layout),
+            lambda: SpatialIndex(nodes, edges, get_positions(snapshot, view_key, nodes, edges, layout))
+        )
+
+        visible = spatial_index.query(x0, y0, x1, y1, zoom)
+        return {
+            **visible,
+            "nodeCount": len(visible['nodes']),
+            "edgeCount": len(visible['edges']),
+            "totalNodeCount": len(nodes),
+            "totalEdgeCount": len(edges),
+            "snapshotVersion": snapshot.version
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching graph viewport: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search")
+def search_entities(
+    q: str = Query(..., min_length=1, description="Search text (logical name, label, schema name, description or required field)"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of results"),
+    filter_mode: str = Query("all", description="Restrict results to a /api/graph filter mode"),
+    prefixes: str = Query(None, description="Comma-separated prefixes (only for core_custom mode)")
+):
+    """
+    Search entities without downloading the graph
+
+    Matches are ranked by field (logical name > label > schema name >
+    required fields > description) and match quality (exact > prefix > substring).
+    Every word of the query must match. The index is built once per snapshot and view.
+
+    Returns:
+        Top matches with their score and the fields that matched
+
+    Examples:
+        /api/search?q=permit
+        /api/search?q=qrt_site&filter_mode=core_custom
+    """
+    try:
+        if filter_mode not in FILTER_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid filter_mode: {filter_mode}")
+
+        snapshot = snapshot_cache.get()
+        view_key, nodes, _ = get_graph_view(snapshot, filter_mode, prefixes)
+        search_index = snapshot.get_derived(('search', view_key), lambda: SearchIndex(nodes))
+
+        start_time = time.perf_counter()
+        matches = search_index.search(q, limit)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+        return {
+            "query": q,
+            "results": [
+                {
+                    "id": m['node']['id'],
+                    "label": m['node'].get('label'),
+                    "logicalName": m['node'].get('logicalName'),
+                    "hierarchyLevel": m['node'].get('hierarchyLevel'),
+                    "isCustomEntity": m['node'].get('isCustomEntity'),
+                    "score": m['score'],
+                    "matchedFields": m['matchedFields']
+                }
+                for m in matches
+            ],
+            "count": len(matches),
+            "tookMs": round(elapsed_ms, 3),
+            "snapshotVersion": snapshot.version
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching entities: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/graph/stats")
+def get_graph_stats(
+    top: int = Query(20, ge=1, le=500, description="Number of entities per ranking")
+):
+    """
+    Get precomputed graph analytics for the current snapshot
+
+    Computed once per snapshot refresh over all entities and relationships:
+    in/out degree, PageRank, betweenness (sampled on large graphs), connected
+    components and articulation points. Per-entity values are also present on
+    every node returned by /api/graph.
+
+    Returns:
+        Summary counts, top entities by degree / PageRank / betweenness,
+        isolated entities and articulation points
+    """
+    try:
+        snapshot = snapshot_cache.get()
+        stats = snapshot.get_derived('stats', lambda: None)
+        if stats is None:
+            raise HTTPException(status_code=503, detail="Graph analytics are not available for this snapshot")
+
+        node_by_id = {n['id']: n for n in snapshot.nodes}
+
+        def ranking(metric: str) -> list:
+            return [
+                {"id": node_id, "label": node_by_id[node_id].get('label'), metric: node_by_id[node_id].get(metric)}
+                for node_id in stats['rankings'].get(metric, [])[:top]
             ]
-            logger.info(f"Limited to {len(graph_data['nodes'])} entities, {len(graph_data['edges'])} relationships")
 
         return {
-            "nodes": graph_data['nodes'],
-            "edges": graph_data['edges'],
-            "nodeCount": len(graph_data['nodes']),
-            "edgeCount": len(graph_data['edges'])
+            "summary": stats['summary'],
+            "topByDegree": ranking('degree'),
+            "topByPageRank": ranking('pageRank'),
+            "topByBetweenness": ranking('betweenness'),
+            "isolated": stats['isolated'],
+            "articulationPoints": stats['articulationPoints'],
+            "snapshotVersion": snapshot.version
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching graph data: {e}")
+        logger.error(f"Error fetching graph stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/graph/path")
+def get_graph_path(
+    from_entity: str = Query(..., alias="from", description="Logical name of the start entity, e.g. 'qrt_permits'"),
+    to_entity: str = Query(..., alias="to", description="Logical name of the end entity, e.g. 'account'"),
+    max_hops: int = Query(6, ge=1, le=20, description="Longest path to consider"),
+    types: str = Query(None, description="Comma-separated relationship types to traverse: 'OneToMany', 'ManyToMany' (default both)"),
+    k: int = Query(1, ge=1, le=10, description="Number of shortest paths to return")
+):
+    """
+    Find how two entities are connected
+
+    Runs a bidirectional BFS (Yen's algorithm for k > 1) over an adjacency index
+    built once per snapshot and relationship-type filter. Relationships are
+    traversed in either direction; each hop lists every relationship between
+    the two entities it connects.
+
+    Returns:
+        Paths in order of length, each with its entities and the relationships per hop
+
+    Examples:
+        /api/graph/path?from=qrt_permits&to=account
+        /api/graph/path?from=qrt_permits&to=systemuser&types=OneToMany&k=3
+    """
+    try:
+        type_list = tuple(sorted({t.strip() for t in types.split(',') if t.strip()})) if types else RELATIONSHIP_TYPES
+        invalid = [t for t in type_list if t not in RELATIONSHIP_TYPES]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid relationship types: {', '.join(invalid)}")
+
+        snapshot = snapshot_cache.get()
+        path_index = snapshot.get_derived(
+            ('paths', type_list),
+            lambda: PathIndex(snapshot.nodes, snapshot.edges, type_list)
+        )
+
+        from_entity, to_entity = from_entity.lower(), to_entity.lower()
+        for name in (from_entity, to_entity):
+            if name not in path_index.index:
+                raise HTTPException(status_code=404, detail=f"Entity not found: {name}")
+
+        start_time = time.perf_counter()
+        paths = path_index.find_paths(from_entity, to_entity, max_hops, k)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+        return {
+            "from": from_entity,
+            "to": to_entity,
+            "found": bool(paths),
+            "paths": paths,
+            "count": len(paths),
+            "tookMs": round(elapsed_ms, 3),
+            "snapshotVersion": snapshot.version
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error finding path from {from_entity} to {to_entity}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/entities/{logical_name}/cascade")
+def get_cascade_impact(
+    logical_name: str,
+    operation: str = Query("Delete", description=f"Operation applied to a record: {', '.join(CASCADE_OPERATIONS)}"),
+    max_depth: int = Query(10, ge=1, le=50, description="Stop expanding the impact tree below this depth")
+):
+    """
+    Show what an operation on a record of this entity cascades to
+
+    Follows the CascadeConfiguration of OneToMany relationships from the entity
+    to its child entities, transitively, over a cascade-only adjacency built
+    once per snapshot. For Delete, RemoveLink children are listed under
+    'unlinked' and Restrict children under 'restrictedBy' (they block the
+    delete) without being expanded further.
+
+    Returns:
+        Impact tree, affected entities with their depth, unlinked/restricting
+        relationships and any cascade cycles
+
+    Examples:
+        /api/entities/account/cascade?operation=Delete
+        /api/entities/qrt_permits/cascade?operation=Assign&max_depth=3
+    """
+    try:
+        if operation not in CASCADE_OPERATIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid operation '{operation}'. Use one of: {', '.join(CASCADE_OPERATIONS)}"
+            )
+
+        snapshot = snapshot_cache.get()
+        cascade_index = snapshot.get_derived('cascade', lambda: CascadeIndex(snapshot.nodes, snapshot.edges))
+
+        logical_name = logical_name.lower()
+        if logical_name not in cascade_index.entities:
+            raise HTTPException(status_code=404, detail=f"Entity not found: {logical_name}")
+
+        impact = cascade_index.analyze(logical_name, operation, max_depth)
+        impact["snapshotVersion"] = snapshot.version
+        return impact
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error analyzing {operation} cascade for {logical_name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/changes")
+def get_changes(
+    since: int = Query(..., ge=0, description="Snapshot version the client currently has (snapshotVersion from /api/graph)"),
+    filter_mode: str = Query(None, description="Only report added/modified records in this /api/graph filter mode"),
+    prefixes: str = Query(None, description="Comma-separated prefixes, as for /api/graph (core_custom mode only)")
+):
+    """
+    Get what changed in the schema since a snapshot version
+
+    Every node and edge is hashed when a snapshot is built and the last few
+    versions are kept, so the diff only compares records whose hash changed.
+    Only crawled metadata is compared: fields added by snapshot stages
+    (analytics metrics, recordCount) change with any schema change and are
+    not reported as modifications.
+    The change-log can be applied to the client's graph as a patch:
+    add 'added' records, drop 'removed' ids and, for 'modified' records,
+    assign 'set' and delete the 'unset' keys.
+
+    Query Parameters:
+        since: Version the client has. If it is no longer held (or unknown),
+               the response has 'resync': true and the client should refetch /api/graph.
+
+        filter_mode / prefixes: Report changes to the /api/graph view: records
+                                that entered the view are added (in full),
+                                records that left it are removed.
+
+    Returns:
+        Change-log with nodes/edges {added, removed, modified}, required field
+        changes per entity and a summary
+
+    Examples:
+        /api/changes?since=3
+        /api/changes?since=3&filter_mode=business
+    """
+    try:
+        if filter_mode is not None and filter_mode not in FILTER_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid filter_mode: {filter_mode}")
+
+        snapshot = snapshot_cache.get()
+        return get_change_log(snapshot, since, filter_mode, prefixes)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing changes since version {since}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def get_change_log(snapshot, since: int, filter_mode: str = None, prefixes: str = None) -> dict:
+    """
+    Change-log from a client's version to the given snapshot, computed once per
+    snapshot and view and shared by /api/changes and every event stream client
+    """
+    key = ('changes', since, filter_mode, view_prefixes(filter_mode, prefixes), get_rules().version)
+    return snapshot.get_derived(key, lambda: build_change_log(snapshot, since, filter_mode, prefixes))
+
+
+def build_change_log(snapshot, since: int, filter_mode: str = None, prefixes: str = None) -> dict:
+    """
+    Change-log from a client's version to the given snapshot, optionally
+    restricted to a /api/graph view
+
+    :return: Change-log with 'resync': False, or a 'resync': True stub if the
+             client's version is no longer held
+    """
+    changes = snapshot_cache.history.diff(since, snapshot.version)
+    old, new = snapshot_cache.history.get(since), snapshot_cache.history.get(snapshot.version)
+    if changes is None or old is None or new is None:
+        return {
+            "since": since,
+            "version": snapshot.version,
+            "resync": True,
+            "availableVersions": [v["version"] for v in snapshot_cache.history.versions]
+        }
+
+    if filter_mode:
+        old_nodes, old_edges = select_version_view(old, filter_mode, prefixes)
+        _, nodes, edges = get_graph_view(snapshot, filter_mode, prefixes)
+        node_ids = {n['id'] for n in nodes}
+        edge_ids = {e['id'] for e in edges}
+        changes = dict(changes)
+        changes["nodes"] = filter_change_set(changes["nodes"], old.nodes, old_nodes, new.nodes, node_ids)
+        changes["edges"] = filter_change_set(changes["edges"], old.edges, old_edges, new.edges, edge_ids)
+        changes["requiredFields"] = [
+            c for c in changes["requiredFields"] if c["entity"] in node_ids and c["entity"] in old_nodes
+        ]
+        changes["summary"] = summarize_changes(changes["nodes"], changes["edges"])
+
+    return {**changes, "resync": False}
+
+
+def filter_change_set(change_set: dict, old_records: dict, old_ids: set, new_records: dict, new_ids: set) -> dict:
+    """
+    Change set as seen through a view: records that entered the view (new or
+    modified into it) are added in full, records that left it (deleted or
+    modified out of it) are removed, and only records in the view in both
+    versions keep their field patches
+    """
+    return {
+        "added": [record for key, record in new_records.items() if key in new_ids and key not in old_ids],
+        "removed": [key for key in old_records if key in old_ids and key not in new_ids],
+        "modified": [change for change in change_set["modified"] if change["id"] in old_ids and change["id"] in new_ids],
+    }
+
+
+# Seconds between keep-alive comments on idle event streams (keeps proxies from closing them)
+EVENT_STREAM_HEARTBEAT_SECONDS = 15
+
+
+@router.get("/graph/events")
+async def stream_graph_events(
+    request: Request,
+    since: int = Query(None, ge=0, description="Snapshot version the client has; missed changes are sent right away"),
+    filter_mode: str = Query(None, description="Only push added/modified records in this /api/graph filter mode"),
+    prefixes: str = Query(None, description="Comma-separated prefixes, as for /api/graph (core_custom mode only)"),
+    last_event_id: str = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-sent events stream of graph updates
+
+    After every snapshot refresh (the background refresher runs every
+    SNAPSHOT_REFRESH_INTERVAL_SECONDS) each client receives the new version and
+    the change-log from the version it last saw, in the /api/changes format, so
+    it can patch its graph instead of polling /api/graph. The server tracks the
+    version each client has, so one connection serves every update; on
+    reconnect the browser's Last-Event-ID takes precedence over since.
+    Change-logs are built in the threadpool, once per snapshot and view, and
+    shared by all clients on the same version.
+
+    Events:
+        hello: {"version": current snapshot version or null}
+        changes: change-log (event id = new snapshot version)
+        version: {"version": n} for a refresh that changed nothing in the view
+        resync: the client's version is no longer held; refetch /api/graph
+
+    Examples:
+        /api/graph/events?since=3
+        /api/graph/events?since=3&filter_mode=core_custom&prefixes=qrt_,msdyn_
+    """
+    if filter_mode is not None and filter_mode not in FILTER_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid filter_mode: {filter_mode}")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    queue = graph_events.subscribe()
+
+    async def event_stream():
+        client_version = since
+        try:
+            current = snapshot_cache.current
+            yield format_sse("hello", json.dumps({"version": current.version if current else None}))
+            if current is not None and client_version is not None and client_version != current.version:
+                yield await run_in_threadpool(change_event, current, client_version, filter_mode, prefixes)
+            if current is not None:
+                client_version = current.version
+
+            while not await request.is_disconnected():
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), timeout=EVENT_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if client_version is not None and snapshot.version <= client_version:
+                    continue
+                if client_version is None:
+                    yield format_sse("resync", json.dumps({"version": snapshot.version}), snapshot.version)
+                else:
+                    yield await run_in_threadpool(change_event, snapshot, client_version, filter_mode, prefixes)
+                client_version = snapshot.version
+        finally:
+            graph_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def change_event(snapshot, since: int, filter_mode: str = None, prefixes: str = None) -> str:
+    """
+    Server-sent event for a client on version since, encoded once per snapshot and view
+    """
+    def build():
+        change_log = get_change_log(snapshot, since, filter_mode, prefixes)
+        if change_log["resync"]:
+            return format_sse("resync", json.dumps(change_log), snapshot.version)
+        if not any(change_log["summary"].values()):
+            return format_sse("version", json.dumps({"version": snapshot.version}), snapshot.version)
+        return format_sse("changes", json.dumps(change_log, default=json_default), snapshot.version)
+
+    key = ('change_event', since, filter_mode, view_prefixes(filter_mode, prefixes), get_rules().version)
+    return snapshot.get_derived(key, build)
+
+
+# format -> (media type, file extension, whether it exports a single table)
+EXPORT_FORMATS = {
+    'json': ('application/json', 'json', False),
+    'ndjson': ('application/x-ndjson', 'ndjson', True),
+    'csv': ('text/csv', 'csv', True),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', True),
+    'feather': ('application/vnd.apache.arrow.file', 'feather', True),
+    'graphml': ('application/graphml+xml', 'graphml', False),
+    'gexf': ('application/gexf+xml', 'gexf', False),
+    'dot': ('text/vnd.graphviz', 'dot', False),
+}
+
+# Whole-graph formats and their streaming writers
+GRAPH_FILE_WRITERS = {
+    'json': write_graph_json,
+    'graphml': write_graphml,
+    'gexf': write_gexf,
+    'dot': write_dot,
+}
+EXPORT_TABLES = ('nodes', 'edges')
+
+
+@router.get("/export")
+def export_graph(
+    format: str = Query("json", description=f"Output format: {', '.join(EXPORT_FORMATS)}"),
+    filter_mode: str = Query("core_custom", description="Filter mode, as for /api/graph"),
+    prefixes: str = Query(None, description="Comma-separated prefixes, as for /api/graph (core_custom mode only)"),
+    table: str = Query("nodes", description="Table for single-table formats (csv, ndjson, parquet, feather): 'nodes' or 'edges'")
+):
+    """
+    Download the current snapshot (or a filtered view of it) as a file
+
+    Works from the cached snapshot, so an export costs no Dataverse requests.
+    Text formats are streamed in chunks; Parquet/Feather files are built once
+    per snapshot and view.
+
+    Query Parameters:
+        format: Whole graph as 'json' ({"nodes", "edges"}), 'graphml', 'gexf'
+                (Gephi) or 'dot' (Graphviz), or a single table as 'csv',
+                'ndjson', 'parquet' or 'feather'. Graph formats carry node
+                attributes (hierarchyLevel, isCustomEntity, isActivity) and edge
+                attributes (type, lookup attributes, cascade behavior per operation).
+        filter_mode / prefixes: Same views as /api/graph
+        table: 'nodes' or 'edges' for the single-table formats
+
+    Returns:
+        File download (Content-Disposition: attachment)
+
+    Examples:
+        /api/export?format=json&filter_mode=business
+        /api/export?format=csv&table=edges
+        /api/export?format=parquet&filter_mode=all&table=nodes
+        /api/export?format=graphml&filter_mode=custom
+        /api/export?format=gexf&filter_mode=business
+        /api/export?format=dot&filter_mode=core_custom&prefixes=qrt_
+    """
+    try:
+        if format not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+        if filter_mode not in FILTER_MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid filter_mode: {filter_mode}")
+        if table not in EXPORT_TABLES:
+            raise HTTPException(status_code=400, detail=f"Invalid table: {table}")
+
+        snapshot = snapshot_cache.get()
+        view_key, nodes, edges = get_graph_view(snapshot, filter_mode, prefixes)
+        media_type, extension, single_table = EXPORT_FORMATS[format]
+        records = nodes if table == 'nodes' else edges
+
+        filename = f"entity_graph_{filter_mode}_v{snapshot.version}"
+        if single_table:
+            filename += f"_{table}"
+        headers = {"Content-Disposition": f'attachment; filename="{filename}.{extension}"'}
+        logger.info(f"Exporting {filter_mode} view of snapshot v{snapshot.version} as {format}")
+
+        if format in ('parquet', 'feather'):
+            content = snapshot.get_derived(
+                ('export', view_key, format, table),
+                lambda: build_arrow_file(records, format, table)
+            )
+            return Response(content=content, media_type=media_type, headers=headers)
+
+        if format in GRAPH_FILE_WRITERS:
+            write_graph = GRAPH_FILE_WRITERS[format]
+            produce = lambda out: write_graph(out, nodes, edges)
+        elif format == 'ndjson':
+            produce = lambda out: write_records(out, records, NdjsonWriter)
+        else:
+            columns = ENTITY_CSV_COLUMNS if table == 'nodes' else RELATIONSHIP_CSV_COLUMNS
+            produce = lambda out: write_records(out, records, lambda buffer: CsvWriter(buffer, columns))
+
+        return StreamingResponse(stream_chunks(produce), media_type=media_type, headers=headers)
+    except HTTPException:
+        raise
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting graph as {format}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def build_arrow_file(records: list, file_format: str, table: str) -> bytes:
+    """
+    Encode a nodes or edges table as Parquet/Feather bytes (pyarrow is imported on first use)
+    """
+    from services.arrow_export import nodes_table, edges_table, write_table
+
+    arrow_table = nodes_table(records) if table == 'nodes' else edges_table(records)
+    buffer = io.BytesIO()
+    write_table(arrow_table, buffer, file_format)
+    return buffer.getvalue()
@@ -0,0 +1,177 @@
+"""
+Columnar (Parquet / Feather) export of a graph snapshot: nodes, edges and
+the attribute catalog as typed Arrow tables.
+
+Entity names and other low-cardinality strings are dictionary-encoded.
+pyarrow is optional and only imported when an export is requested.
+"""
+import logging
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .attribute_catalog import AttributeCatalog, REQUIRED_LEVELS
+from .cascade_service import CASCADE_OPERATIONS
+
+ARROW_FORMATS = ('parquet', 'feather')
+DEFAULT_COMPRESSION = 'zstd'
+FEATHER_COMPRESSIONS = ('zstd', 'lz4', 'uncompressed')
+
+# Per-node metrics added by the graph analytics snapshot stage, exported when present
+NODE_METRIC_FIELDS = (
+    ('inDegree', 'int32'), ('outDegree', 'int32'), ('degree', 'int32'),
+    ('pageRank', 'float64'), ('betweenness', 'float64'),
+    ('componentId', 'int32'), ('isArticulationPoint', 'bool'),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _pyarrow():
+    """
+    Import pyarrow on first use so the API and other exports work without it
+    """
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow is required for Parquet/Feather export: pip install pyarrow") from e
+
+
+def _dictionary_column(pa, ids: np.ndarray, strings: List[str]):
+    """
+    Dictionary array from interned string ids, with a dictionary holding only
+    the strings the column uses (negative ids become nulls)
+    """
+    valid = ids >= 0
+    used, indices = np.unique(ids[valid], return_inverse=True)
+    all_indices = np.zeros(len(ids), dtype=np.int32)
+    all_indices[valid] = indices
+    dictionary = pa.array([strings[i] for i in used.tolist()], type=pa.string())
+    return pa.DictionaryArray.from_arrays(pa.array(all_indices, mask=~valid), dictionary)
+
+
+def nodes_table(nodes: List[Dict[str, Any]]):
+    """
+    Entities as an Arrow table (one row per entity)
+    """
+    pa = _pyarrow()
+    names = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        ('id', names), ('label', pa.string()), ('logicalName', names), ('schemaName', pa.string()),
+        ('entitySetName', pa.string()), ('primaryIdAttribute', pa.string()), ('primaryNameAttribute', pa.string()),
+        ('isCustomEntity', pa.bool_()), ('isActivity', pa.bool_()), ('description', pa.string()),
+        ('hierarchyLevel', pa.int8()),
+        ('requiredFields', pa.list_(pa.struct([('displayName', pa.string()), ('logicalName', pa.string())]))),
+    ]
+    if nodes and all(name in nodes[0] for name, _ in NODE_METRIC_FIELDS):
+        fields += [(name, pa.type_for_alias(type_name)) for name, type_name in NODE_METRIC_FIELDS]
+    if nodes and 'recordCount' in nodes[0]:
+        fields.append(('recordCount', pa.int64()))
+
+    schema = pa.schema(fields)
+    columns = [pa.array([n.get(field.name) for n in nodes], type=field.type) for field in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def edges_table(edges: List[Dict[str, Any]]):
+    """
+    Relationships as an Arrow table, with the cascade configuration flattened
+    into one column per operation (cascadeDelete, cascadeAssign, ...)
+    """
+    pa = _pyarrow()
+    names = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        ('id', pa.string()), ('schemaName', pa.string()), ('type', names),
+        ('sourceEntity', names), ('targetEntity', names),
+        ('sourceAttribute', names), ('targetAttribute', names),
+        ('intersectEntity', names), ('entity1Attribute', names), ('entity2Attribute', names),
+    ]
+    schema = pa.schema(fields + [(f'cascade{op}', names) for op in CASCADE_OPERATIONS])
+
+    columns = [pa.array([e.get(name) for e in edges], type=field_type) for name, field_type in fields]
+    for op in CASCADE_OPERATIONS:
+        columns.append(pa.array([(e.get('relationshipBehavior') or {}).get(op) for e in edges], type=names))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def attributes_table(catalog: AttributeCatalog):
+    """
+    Attribute catalog as an Arrow table, built straight from its columns
+    (string ids become dictionary indexes; nothing is materialized per row)
+    """
+    pa = _pyarrow()
+    strings = catalog.strings.strings
+
+    lookup_values = _dictionary_column(pa, catalog.target_ids, strings)
+    max_length = catalog.max_length
+    columns = {
+        'entity': _dictionary_column(pa, catalog.entity, strings),
+        'logicalName': _dictionary_column(pa, catalog.logical_name, strings),
+        'schemaName': _dictionary_column(pa, catalog.schema_name, strings),
+        'displayName': _dictionary_column(pa, catalog.display_name, strings),
+        'attributeType': _dictionary_column(pa, catalog.attribute_type, strings),
+        'requiredLevel': pa.DictionaryArray.from_arrays(
+            pa.array(catalog.required_level), pa.array(REQUIRED_LEVELS, type=pa.string())
+        ),
+        'maxLength': pa.array(max_length, mask=max_length < 0),
+        'optionSet': _dictionary_column(pa, catalog.option_set, strings),
+        'lookupTargets': pa.ListArray.from_arrays(pa.array(catalog.target_offsets), lookup_values),
+        'isCustomAttribute': pa.array(catalog.is_custom),
+        'isPrimaryId': pa.array(catalog.is_primary_id),
+        'isPrimaryName': pa.array(catalog.is_primary_name),
+    }
+    return pa.table(columns)
+
+
+def write_table(table, path, file_format: str = 'parquet', compression: str = DEFAULT_COMPRESSION) -> None:
+    """
+    Write one Arrow table as Parquet or Feather (v2)
+
+    :param path: Output path or writable binary file object
+    :param file_format: 'parquet' or 'feather'
+    :param compression: Codec, e.g. 'zstd', 'snappy' (Parquet only), 'lz4'
+    """
+    if file_format not in ARROW_FORMATS:
+        raise ValueError(f"Invalid format: {file_format}")
+
+    _pyarrow()
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, compression=compression)
+    else:
+        if compression not in FEATHER_COMPRESSIONS:
+            raise ValueError(f"Feather supports {', '.join(FEATHER_COMPRESSIONS)} compression, not {compression}")
+        import pyarrow.feather as feather
+        feather.write_feather(table, path, compression=compression)
+
+
+def export_graph_tables(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], output_dir,
+                        catalog: AttributeCatalog = None, file_format: str = 'parquet',
+                        compression: str = DEFAULT_COMPRESSION) -> Dict[str, Path]:
+    """
+    Write nodes, edges and (optionally) attributes tables to a directory
+
+    :param nodes: Entity dictionaries, e.g. from a GraphSnapshot
+    :param edges: Relationship dictionaries
+    :param output_dir: Directory for nodes.<ext>, edges.<ext> and attributes.<ext>
+    :param catalog: Attribute catalog to export as well
+    :param file_format: 'parquet' or 'feather'
+    :param compression: Compression codec
+    :return: Dictionary of table name -> written path
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tables = {'nodes': nodes_table(nodes), 'edges': edges_table(edges)}
+    if catalog is not None:
+        tables['attributes'] = attributes_table(catalog)
+
+    paths = {}
+    for name, table in tables.items():
+        path = output_dir / f'{name}.{file_format}'
+        write_table(table, path, file_format, compression)
+        paths[name] = path
+        logger.info(f"Wrote {table.num_rows} rows to {path} ({path.stat().st_size / 1024:.0f} KiB)")
+    return paths
@@ -0,0 +1,202 @@
+"""
+Columnar in-memory catalog of attribute metadata for the entities in a snapshot.
+
+Instead of one dict per attribute, every property is a NumPy column and all
+strings (names, types, labels, lookup targets) are interned in a StringTable.
+Rows are grouped by entity, so an entity's attributes are one contiguous slice.
+"""
+import logging
+from typing import List, Dict, Any, Iterable
+
+import numpy as np
+
+from .string_table import StringTable
+
+REQUIRED_LEVELS = ('None', 'Recommended', 'ApplicationRequired', 'SystemRequired')
+REQUIRED_LEVEL_CODES = {level: code for code, level in enumerate(REQUIRED_LEVELS)}
+
+# Required levels that make a field mandatory on create (matches get_entity_required_attributes)
+MANDATORY_LEVEL_CODES = (REQUIRED_LEVEL_CODES['ApplicationRequired'], REQUIRED_LEVEL_CODES['SystemRequired'])
+
+NO_MAX_LENGTH = -1
+
+
+def _localized_label(label_obj: Any, default: str) -> str:
+    """
+    First localized label of a Dynamics Label object, or the default
+    """
+    if isinstance(label_obj, dict):
+        labels = label_obj.get('LocalizedLabels', [])
+        if labels:
+            return labels[0].get('Label', default)
+    return default
+
+
+class AttributeCatalog:
+    """
+    Attribute metadata stored as parallel columns:
+
+    - entity, logical_name, schema_name, display_name, attribute_type, option_set:
+      int32 ids into the string table
+    - required_level: int8 code into REQUIRED_LEVELS
+    - max_length: int32 (NO_MAX_LENGTH when not applicable)
+    - is_custom, is_primary_id, is_primary_name: bool
+    - lookup targets: CSR layout (target_offsets[row]..target_offsets[row + 1]
+      indexes target_ids)
+    """
+
+    def __init__(self, attributes_by_entity: Dict[str, List[Dict[str, Any]]],
+                 option_sets_by_entity: Dict[str, Dict[str, str]] = None):
+        option_sets_by_entity = option_sets_by_entity or {}
+        self.strings = StringTable()
+        intern = self.strings.intern
+
+        entity, logical_name, schema_name, display_name, attribute_type, option_set = [], [], [], [], [], []
+        required_level, max_length, is_custom, is_primary_id, is_primary_name = [], [], [], [], []
+        target_offsets, target_ids = [0], []
+        self.entity_slices: Dict[str, tuple] = {}
+
+        for entity_name in sorted(attributes_by_entity):
+            start = len(logical_name)
+            entity_id = intern(entity_name)
+            option_sets = option_sets_by_entity.get(entity_name, {})
+
+            for attr in sorted(attributes_by_entity[entity_name], key=lambda a: a.get('LogicalName') or ''):
+                name = attr.get('LogicalName')
+                type_name = attr.get('AttributeTypeName') or {}
+                required = attr.get('RequiredLevel') or {}
+
+                entity.append(entity_id)
+                logical_name.append(intern(name))
+                schema_name.append(intern(attr.get('SchemaName')))
+                display_name.append(intern(_localized_label(attr.get('DisplayName'), name)))
+                attribute_type.append(intern(type_name.get('Value') if isinstance(type_name, dict) else attr.get('AttributeType')))
+                option_set.append(intern(option_sets.get(name)))
+                required_level.append(REQUIRED_LEVEL_CODES.get(required.get('Value') if isinstance(required, dict) else None, 0))
+                max_length.append(attr.get('MaxLength') if isinstance(attr.get('MaxLength'), int) else NO_MAX_LENGTH)
+                is_custom.append(bool(attr.get('IsCustomAttribute')))
+                is_primary_id.append(bool(attr.get('IsPrimaryId')))
+                is_primary_name.append(bool(attr.get('IsPrimaryName')))
+
+                target_ids.extend(intern(target) for target in attr.get('Targets') or [])
+                target_offsets.append(len(target_ids))
+
+            self.entity_slices[entity_name] = (start, len(logical_name))
+
+        self.entity = np.array(entity, dtype=np.int32)
+        self.logical_name = np.array(logical_name, dtype=np.int32)
+        self.schema_name = np.array(schema_name, dtype=np.int32)
+        self.display_name = np.array(display_name, dtype=np.int32)
+        self.attribute_type = np.array(attribute_type, dtype=np.int32)
+        self.option_set = np.array(option_set, dtype=np.int32)
+        self.required_level = np.array(required_level, dtype=np.int8)
+        self.max_length = np.array(max_length, dtype=np.int32)
+        self.is_custom = np.array(is_custom, dtype=bool)
+        self.is_primary_id = np.array(is_primary_id, dtype=bool)
+        self.is_primary_name = np.array(is_primary_name, dtype=bool)
+        self.target_offsets = np.array(target_offsets, dtype=np.int32)
+        self.target_ids = np.array(target_ids, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.logical_name)
+
+    @property
+    def entity_names(self) -> List[str]:
+        return list(self.entity_slices)
+
+    def nbytes(self) -> int:
+        """
+        Approximate size of the numeric columns in bytes (excluding the string table)
+        """
+        return sum(
+            column.nbytes for column in (
+                self.entity, self.logical_name, self.schema_name, self.display_name,
+                self.attribute_type, self.option_set, self.required_level, self.max_length,
+                self.is_custom, self.is_primary_id, self.is_primary_name,
+                self.target_offsets, self.target_ids,
+            )
+        )
+
+    def rows_for_entity(self, entity_name: str, required_only: bool = False,
+                        attribute_type: str = None) -> np.ndarray:
+        """
+        Row indexes of an entity's attributes, optionally filtered
+
+        :param entity_name: Logical name of the entity
+        :param required_only: Only ApplicationRequired / SystemRequired attributes
+        :param attribute_type: Only attributes of this type name, e.g. 'LookupType'
+        :return: Row indexes (ascending)
+        :raises KeyError: If the entity is not in the catalog
+        """
+        start, end = self.entity_slices[entity_name]
+        mask = np.ones(end - start, dtype=bool)
+        if required_only:
+            mask &= np.isin(self.required_level[start:end], MANDATORY_LEVEL_CODES)
+        if attribute_type:
+            mask &= self.attribute_type[start:end] == self.strings.lookup(attribute_type)
+        return start + np.flatnonzero(mask)
+
+    def to_records(self, rows: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        Materialize catalog rows as wire-format dictionaries
+        """
+        get = self.strings.get
+        records = []
+        for row in rows:
+            targets = self.target_ids[self.target_offsets[row]:self.target_offsets[row + 1]]
+            max_length = int(self.max_length[row])
+            records.append({
+                'entity': get(int(self.entity[row])),
+                'logicalName': get(int(self.logical_name[row])),
+                'schemaName': get(int(self.schema_name[row])),
+                'displayName': get(int(self.display_name[row])),
+                'attributeType': get(int(self.attribute_type[row])),
+                'requiredLevel': REQUIRED_LEVELS[self.required_level[row]],
+                'maxLength': None if max_length == NO_MAX_LENGTH else max_length,
+                'optionSet': get(int(self.option_set[row])),
+                'lookupTargets': [get(int(t)) for t in targets],
+                'isCustomAttribute': bool(self.is_custom[row]),
+                'isPrimaryId': bool(self.is_primary_id[row]),
+                'isPrimaryName': bool(self.is_primary_name[row]),
+            })
+        return records
+
+    def get_entity_attributes(self, entity_name: str, required_only: bool = False,
+                              attribute_type: str = None) -> List[Dict[str, Any]]:
+        """
+        Attributes of one entity as wire-format dictionaries
+
+        :raises KeyError: If the entity is not in the catalog
+        """
+        return self.to_records(self.rows_for_entity(entity_name, required_only, attribute_type).tolist())
+
+
+def build_attribute_catalog(dynamics_api, entity_logical_names: List[str],
+                            include_option_sets: bool = True) -> AttributeCatalog:
+    """
+    Pull attribute metadata for the given entities in bulk and store it columnar
+
+    :param dynamics_api: DynamicsAPI instance
+    :param entity_logical_names: Entities to include
+    :param include_option_sets: Also resolve option set names for choice columns
+                                (fetched in chunks, for the entities that have choice columns)
+    :return: AttributeCatalog
+    """
+    logger = logging.getLogger(__name__)
+    attributes_by_entity = dynamics_api.get_attribute_definitions(entity_logical_names)
+
+    option_sets_by_entity = {}
+    if include_option_sets:
+        with_choices = [
+            entity_name for entity_name, attributes in attributes_by_entity.items()
+            if any((a.get('AttributeTypeName') or {}).get('Value') in ('PicklistType', 'MultiSelectPicklistType')
+                   for a in attributes)
+        ]
+        option_sets_by_entity = dynamics_api.get_option_set_names(with_choices)
+
+    catalog = AttributeCatalog(attributes_by_entity, option_sets_by_entity)
+    logger.info(
+        f"Attribute catalog built: {len(catalog)} attributes across {len(catalog.entity_slices)} entities, "
+        f"{len(catalog.strings)} distinct strings, {catalog.nbytes() / 1024:.0f} KiB of columns"
+    )
+    return catalog
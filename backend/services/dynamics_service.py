@@ -2,13 +2,17 @@
 Service layer for processing Dynamics 365 entity and relationship data
 """
 import logging
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Iterator, Optional
 import sys
 from pathlib import Path
 
 # Add parent directory to path to import dynamics_api
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from dynamics_api.dynamics_api import DynamicsAPI
+from .attribute_catalog import AttributeCatalog, build_attribute_catalog
+from .entity_rules import get_rules
+from .metadata_query import RELATIONSHIP_SELECT
 
 
 class DynamicsService:
@@ -18,58 +22,39 @@ class DynamicsService:
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.dynamics_api = DynamicsAPI(logger=self.logger)
+        # Built on first use (see dynamics_api), so importing the routes reads no .env and makes no requests
+        self._dynamics_api = None
+        self._dynamics_api_lock = threading.Lock()  # Route handlers run in a threadpool
 
+    @property
+    def dynamics_api(self) -> DynamicsAPI:
+        """
+        The Dynamics 365 client, created on first use
+        """
+        if self._dynamics_api is None:
+            with self._dynamics_api_lock:
+                if self._dynamics_api is None:
+                    self._dynamics_api = DynamicsAPI(logger=self.logger)
+        return self._dynamics_api
 
     @staticmethod
     def should_include_entity(logical_name: str, is_custom: bool) -> bool:
         """
-        Determine if an entity should be included based on filtering criteria.
+        Determine if an entity should be included based on filtering criteria
+        (the "ingest" rules in entity_rules.json).
 
         Include:
         - All qrt_ custom entities (created by team)
         - System entities: account, contact, systemuser
 
-        Exclude (hardcoded):
+        Exclude:
         - Task Configuration, Task Rules, Bid Issuance, Submittals, etc.
 
         :param logical_name: The logical name of the entity
         :param is_custom: Whether the entity is custom
         :return: True if entity should be included
         """
-        logical_name_lower = logical_name.lower()
-
-        # Hardcoded exclusion list
-        excluded_entities = {
-            'qrt_taskconfiguration',  # Task Configuration
-            'qrt_taskrules',  # Task Rules
-            'qrt_taskconfigrule',  # Task Config Rule
-            'qrt_bidissuance',  # Bid Issuance
-            'qrt_submittals',  # Submittals
-            'qrt_assetcontract',  # Asset Contracts
-            'qrt_bidpackage',  # Bid Package
-            'qrt_bidpackage_account',  # Bid Package junction
-            'qrt_bidpackage_msdyn_project',  # Bid Package junction
-            'qrt_departmentheadsmeetingagenda',  # Department Heads Meeting Agenda
-            'qrt_flowconfiguration',  # Flow Config
-            'task',  # System task entity
-        }
-
-        # If in exclusion list, reject immediately
-        if logical_name_lower in excluded_entities:
-            return False
-
-        # Include required system and Microsoft entities
-        required_entities = {'account', 'contact', 'systemuser', 'msdyn_project'}
-        if logical_name_lower in required_entities:
-            return True
-
-        # Include all qrt_ custom entities (created by team: meldin/teng/SA1/SA2)
-        if logical_name_lower.startswith('qrt_'):
-            return True
-
-        # Exclude all other entities
-        return False
+        return get_rules().should_ingest(logical_name)
 
     @staticmethod
     def get_hierarchy_level(logical_name: str) -> int:
@@ -124,6 +109,73 @@ class DynamicsService:
         # Level 4: Other qrt_ entities - FIFTH/BOTTOM (default 4)
         return 4
 
+    def format_entity(self, entity: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Format one raw entity definition for the frontend, fetching its required
+        fields for hierarchy levels 1-3
+
+        :param entity: Raw EntityDefinitions record
+        :return: Entity object, or None if the entity is filtered out
+        """
+        logical_name = entity.get('LogicalName')
+        is_custom = entity.get('IsCustomEntity', False)
+
+        # Apply filtering: only include entities created by team + system entities
+        if not self.should_include_entity(logical_name, is_custom):
+            return None
+
+        # Extract display name
+        display_name = entity.get('DisplayName', {})
+        if isinstance(display_name, dict):
+            labels = display_name.get('LocalizedLabels', [])
+            label = labels[0].get('Label', entity.get('LogicalName', 'Unknown')) if labels else entity.get('LogicalName', 'Unknown')
+        else:
+            label = entity.get('LogicalName', 'Unknown')
+
+        # Extract description
+        description = entity.get('Description', {})
+        if isinstance(description, dict):
+            desc_labels = description.get('LocalizedLabels', [])
+            desc_text = desc_labels[0].get('Label', '') if desc_labels else ''
+        else:
+            desc_text = ''
+
+        hierarchy_level = self.get_hierarchy_level(logical_name)
+
+        # Only fetch required fields for hierarchy levels 1, 2, and 3
+        # (Account, Portfolio/Project, and Child entities)
+        required_fields = []
+        if hierarchy_level in [1, 2, 3]:
+            required_fields = self.dynamics_api.get_entity_required_attributes(logical_name)
+
+        entity_obj = {
+            'id': logical_name,
+            'label': label,
+            'logicalName': logical_name,
+            'schemaName': entity.get('SchemaName'),
+            'entitySetName': entity.get('EntitySetName'),
+            'primaryIdAttribute': entity.get('PrimaryIdAttribute'),
+            'primaryNameAttribute': entity.get('PrimaryNameAttribute'),
+            'isCustomEntity': entity.get('IsCustomEntity', False),
+            'isActivity': entity.get('IsActivity', False),
+            'description': desc_text,
+            'hierarchyLevel': hierarchy_level,
+            'requiredFields': required_fields
+        }
+        return entity_obj
+
+    def iter_entities(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield formatted entity objects as the definitions are read, without
+        building the full list (for streaming exports)
+
+        :return: Generator of entity objects (same shape as get_all_entities)
+        """
+        for entity in self.dynamics_api.iter_entity_definitions(get_rules().entity_query().query_string):
+            entity_obj = self.format_entity(entity)
+            if entity_obj is not None:
+                yield entity_obj
+
     def get_all_entities(self) -> List[Dict[str, Any]]:
         """
         Fetch all entity definitions and format them for the frontend
@@ -134,58 +186,16 @@ class DynamicsService:
             import time
             start_time = time.time()
 
-            raw_entities = self.dynamics_api.get_all_entity_definitions()
+            # The $filter only narrows the download; format_entity still applies the exact rules
+            raw_entities = self.dynamics_api.get_all_entity_definitions(get_rules().entity_query().query_string)
             entities = []
 
             self.logger.info(f"Fetching required fields for {len(raw_entities.get('value', []))} entities...")
 
             for entity in raw_entities.get('value', []):
-                logical_name = entity.get('LogicalName')
-                is_custom = entity.get('IsCustomEntity', False)
-
-                # Apply filtering: only include entities created by team + system entities
-                if not self.should_include_entity(logical_name, is_custom):
-                    continue
-
-                # Extract display name
-                display_name = entity.get('DisplayName', {})
-                if isinstance(display_name, dict):
-                    labels = display_name.get('LocalizedLabels', [])
-                    label = labels[0].get('Label', entity.get('LogicalName', 'Unknown')) if labels else entity.get('LogicalName', 'Unknown')
-                else:
-                    label = entity.get('LogicalName', 'Unknown')
-
-                # Extract description
-                description = entity.get('Description', {})
-                if isinstance(description, dict):
-                    desc_labels = description.get('LocalizedLabels', [])
-                    desc_text = desc_labels[0].get('Label', '') if desc_labels else ''
-                else:
-                    desc_text = ''
-
-                hierarchy_level = self.get_hierarchy_level(logical_name)
-
-                # Only fetch required fields for hierarchy levels 1, 2, and 3
-                # (Account, Portfolio/Project, and Child entities)
-                required_fields = []
-                if hierarchy_level in [1, 2, 3]:
-                    required_fields = self.dynamics_api.get_entity_required_attributes(logical_name)
-
-                entity_obj = {
-                    'id': logical_name,
-                    'label': label,
-                    'logicalName': logical_name,
-                    'schemaName': entity.get('SchemaName'),
-                    'entitySetName': entity.get('EntitySetName'),
-                    'primaryIdAttribute': entity.get('PrimaryIdAttribute'),
-                    'primaryNameAttribute': entity.get('PrimaryNameAttribute'),
-                    'isCustomEntity': entity.get('IsCustomEntity', False),
-                    'isActivity': entity.get('IsActivity', False),
-                    'description': desc_text,
-                    'hierarchyLevel': hierarchy_level,
-                    'requiredFields': required_fields
-                }
-                entities.append(entity_obj)
+                entity_obj = self.format_entity(entity)
+                if entity_obj is not None:
+                    entities.append(entity_obj)
 
             end_time = time.time()
             elapsed_time = end_time - start_time
@@ -196,54 +206,167 @@ class DynamicsService:
             self.logger.error(f"Error in get_all_entities: {e}")
             raise e
 
-    def get_all_relationships_consolidated(self) -> Dict[str, Any]:
+    @staticmethod
+    def format_relationship(rel: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Format one raw relationship definition as a graph edge
+
+        :param rel: Raw RelationshipDefinitions record
+        :return: Relationship object, or None for unsupported relationship types
+        """
+        rel_type = rel.get('@odata.type', '')
+
+        if 'OneToManyRelationshipMetadata' in rel_type:
+            # One-to-Many relationship
+            relationship_obj = {
+                'id': rel.get('SchemaName', ''),
+                'schemaName': rel.get('SchemaName'),
+                'type': 'OneToMany',
+                'sourceEntity': rel.get('ReferencedEntity'),  # The "One" side
+                'targetEntity': rel.get('ReferencingEntity'),  # The "Many" side
+                'sourceAttribute': rel.get('ReferencedAttribute'),
+                'targetAttribute': rel.get('ReferencingAttribute'),
+                'relationshipBehavior': rel.get('CascadeConfiguration', {}),
+            }
+            return relationship_obj
+
+        elif 'ManyToManyRelationshipMetadata' in rel_type:
+            # Many-to-Many relationship
+            relationship_obj = {
+                'id': rel.get('SchemaName', ''),
+                'schemaName': rel.get('SchemaName'),
+                'type': 'ManyToMany',
+                'sourceEntity': rel.get('Entity1LogicalName'),
+                'targetEntity': rel.get('Entity2LogicalName'),
+                'intersectEntity': rel.get('IntersectEntityName'),
+                'entity1Attribute': rel.get('Entity1IntersectAttribute'),
+                'entity2Attribute': rel.get('Entity2IntersectAttribute'),
+            }
+            return relationship_obj
+
+        return None
+
+    def iter_relationships(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield formatted relationship objects as the definitions are read (for streaming exports)
+
+        :return: Generator of relationship objects (same shape as get_all_relationships_consolidated)
+        """
+        for rel in self.dynamics_api.iter_relationship_definitions(RELATIONSHIP_SELECT):
+            relationship_obj = self.format_relationship(rel)
+            if relationship_obj is not None:
+                yield relationship_obj
+
+    def get_all_relationships_consolidated(self, aggregate: bool = False) -> Dict[str, Any]:
         """
         Fetch all relationships and consolidate them into a graph-friendly format
 
+        :param aggregate: Merge parallel relationships between the same entity pair
+                          into one weighted edge (see aggregate_relationships)
         :return: Dictionary with entities and edges
         """
         try:
-            raw_relationships = self.dynamics_api.get_all_relationships()
+            raw_relationships = self.dynamics_api.get_all_relationships(RELATIONSHIP_SELECT)
             relationships = []
 
             for rel in raw_relationships.get('value', []):
-                rel_type = rel.get('@odata.type', '')
-
-                if 'OneToManyRelationshipMetadata' in rel_type:
-                    # One-to-Many relationship
-                    relationship_obj = {
-                        'id': rel.get('SchemaName', ''),
-                        'schemaName': rel.get('SchemaName'),
-                        'type': 'OneToMany',
-                        'sourceEntity': rel.get('ReferencedEntity'),  # The "One" side
-                        'targetEntity': rel.get('ReferencingEntity'),  # The "Many" side
-                        'sourceAttribute': rel.get('ReferencedAttribute'),
-                        'targetAttribute': rel.get('ReferencingAttribute'),
-                        'relationshipBehavior': rel.get('CascadeConfiguration', {}),
-                    }
-                    relationships.append(relationship_obj)
-
-                elif 'ManyToManyRelationshipMetadata' in rel_type:
-                    # Many-to-Many relationship
-                    relationship_obj = {
-                        'id': rel.get('SchemaName', ''),
-                        'schemaName': rel.get('SchemaName'),
-                        'type': 'ManyToMany',
-                        'sourceEntity': rel.get('Entity1LogicalName'),
-                        'targetEntity': rel.get('Entity2LogicalName'),
-                        'intersectEntity': rel.get('IntersectEntityName'),
-                        'entity1Attribute': rel.get('Entity1IntersectAttribute'),
-                        'entity2Attribute': rel.get('Entity2IntersectAttribute'),
-                    }
+                relationship_obj = self.format_relationship(rel)
+                if relationship_obj is not None:
                     relationships.append(relationship_obj)
 
             self.logger.info(f"Processed {len(relationships)} relationships")
+            if aggregate:
+                relationships = self.aggregate_relationships(relationships)
+                self.logger.info(f"Aggregated into {len(relationships)} weighted edges")
             return {'relationships': relationships}
 
         except Exception as e:
             self.logger.error(f"Error in get_all_relationships_consolidated: {e}")
             raise e
 
+    @staticmethod
+    def aggregate_relationships(relationships: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge parallel relationships into one weighted edge per entity pair and type.
+
+        Many pairs are connected several times (e.g. systemuser -> every entity via
+        createdby, modifiedby, createdonbehalfby, modifiedonbehalfby, owninguser).
+        OneToMany edges keep their direction; ManyToMany pairs are unordered.
+
+        :param relationships: Consolidated relationship objects
+        :return: One edge per (type, source, target) with 'weight', 'schemaNames'
+                 and 'attributes' (the lookup / intersect columns involved)
+        """
+        groups = {}
+        for rel in relationships:
+            source, target = rel['sourceEntity'], rel['targetEntity']
+            if rel['type'] == 'ManyToMany' and target < source:
+                source, target = target, source
+            key = (rel['type'], source, target)
+
+            edge = groups.get(key)
+            if edge is None:
+                edge = groups[key] = {
+                    'id': f"{source}->{target}:{rel['type']}",
+                    'type': rel['type'],
+                    'sourceEntity': source,
+                    'targetEntity': target,
+                    'weight': 0,
+                    'schemaNames': [],
+                    'attributes': [],
+                    'aggregated': True,
+                }
+            edge['weight'] += 1
+            edge['schemaNames'].append(rel['schemaName'])
+            attribute = rel.get('targetAttribute') or rel.get('intersectEntity')
+            if attribute and attribute not in edge['attributes']:
+                edge['attributes'].append(attribute)
+
+        return list(groups.values())
+
+    def get_attribute_catalog(self, entity_logical_names: List[str]) -> AttributeCatalog:
+        """
+        Fetch the full attribute metadata (type, required level, lookup targets,
+        max length, option set) for the given entities in bulk
+
+        :param entity_logical_names: Logical names of the entities to include
+        :return: Columnar AttributeCatalog
+        """
+        try:
+            import time
+            start_time = time.time()
+
+            catalog = build_attribute_catalog(self.dynamics_api, entity_logical_names)
+
+            elapsed_time = time.time() - start_time
+            self.logger.info(f"Fetched {len(catalog)} attributes for {len(entity_logical_names)} entities in {elapsed_time:.2f} seconds")
+            return catalog
+
+        except Exception as e:
+            self.logger.error(f"Error in get_attribute_catalog: {e}")
+            raise e
+
+    def get_record_counts(self, entity_logical_names: List[str]) -> Dict[str, int]:
+        """
+        Fetch the total record count of the given entities in bulk (RetrieveTotalRecordCount)
+
+        :param entity_logical_names: Logical names of the entities to count
+        :return: Dictionary of entity logical name -> record count (entities that cannot be counted are omitted)
+        """
+        try:
+            import time
+            start_time = time.time()
+
+            counts = self.dynamics_api.get_record_counts(entity_logical_names)
+
+            elapsed_time = time.time() - start_time
+            self.logger.info(f"Fetched record counts for {len(counts)} of {len(entity_logical_names)} entities in {elapsed_time:.2f} seconds")
+            return counts
+
+        except Exception as e:
+            self.logger.error(f"Error in get_record_counts: {e}")
+            raise e
+
     def get_entity_graph_data(self) -> Dict[str, Any]:
         """
         Get complete graph data with entities and relationships
@@ -0,0 +1,229 @@
+"""
+Config-driven entity selection rules
+
+All entity include/exclude decisions (what is crawled from Dynamics 365 and
+which entities each /api/graph filter mode shows) come from one JSON file,
+compiled once into hash sets and prefix matchers. The file is re-read when it
+changes on disk, so rules can be edited without restarting the backend.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .metadata_query import EntityQueryPlan, plan_entity_query
+
+ENTITY_RULES_PATH = os.environ.get(
+    'ENTITY_RULES_PATH', str(Path(__file__).resolve().parent.parent / 'entity_rules.json')
+)
+# Minimum seconds between checks of the rules file for changes
+ENTITY_RULES_CHECK_SECONDS = float(os.environ.get('ENTITY_RULES_CHECK_SECONDS', '2'))
+
+FILTER_MODES = ('core_custom', 'business', 'custom', 'all')
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixTrie:
+    """
+    Set of prefixes stored as a character trie. Prefixes that extend another
+    prefix are redundant and dropped, and matching is compiled down to one
+    hash lookup per distinct prefix length (instead of one startswith per prefix).
+    """
+
+    _END = ''
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root: Dict[str, Any] = {}
+        for prefix in prefixes:
+            self._insert(prefix)
+        self._compile()
+
+    def add(self, prefix: str) -> None:
+        self._insert(prefix)
+        self._compile()
+
+    def _insert(self, prefix: str) -> None:
+        node = self._root
+        for char in prefix.lower():
+            if self._END in node:
+                return  # A shorter prefix already covers this one
+            node = node.setdefault(char, {})
+        node.clear()
+        node[self._END] = True
+
+    @property
+    def prefixes(self) -> List[str]:
+        """
+        Minimal prefix set, sorted
+        """
+        found = []
+        stack = [(self._root, '')]
+        while stack:
+            node, path = stack.pop()
+            if self._END in node:
+                found.append(path)
+                continue
+            stack.extend((child, path + char) for char, child in node.items())
+        return sorted(found)
+
+    def _compile(self) -> None:
+        by_length: Dict[int, set] = {}
+        for prefix in self.prefixes:
+            by_length.setdefault(len(prefix), set()).add(prefix)
+        self._lookup: Tuple[Tuple[int, frozenset], ...] = tuple(
+            (length, frozenset(group)) for length, group in sorted(by_length.items())
+        )
+
+    def match(self, name: str) -> bool:
+        """
+        Check whether a lowercase name starts with any prefix
+        """
+        for length, group in self._lookup:
+            if name[:length] in group:
+                return True
+        return False
+
+    def __bool__(self) -> bool:
+        return bool(self._root)
+
+    def __len__(self) -> int:
+        return len(self.prefixes)
+
+
+def _name_set(value) -> frozenset:
+    """
+    Lowercase name set from a list, or from a {group: [names]} mapping
+    """
+    if isinstance(value, dict):
+        value = [name for names in value.values() for name in names]
+    return frozenset(name.lower() for name in value or ())
+
+
+class EntityRules:
+    """
+    Compiled entity selection rules
+
+    Config keys:
+    - ingest.include / ingest.includePrefixes / ingest.exclude: entities crawled from Dynamics 365
+    - coreEntities: always shown in core_custom mode
+    - systemEntities: hidden in business mode (list, or {group: [names]})
+    """
+
+    def __init__(self, config: Dict[str, Any], version: int = 0):
+        ingest = config.get('ingest', {})
+        self.version = version
+        self.ingest_include = _name_set(ingest.get('include'))
+        self.ingest_prefixes = PrefixTrie(ingest.get('includePrefixes', ()))
+        self.ingest_exclude = _name_set(ingest.get('exclude'))
+        self.core_entities = _name_set(config.get('coreEntities'))
+        self.system_entities = _name_set(config.get('systemEntities'))
+
+    @classmethod
+    def load(cls, path, version: int = 0) -> 'EntityRules':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), version)
+
+    def ingest_key(self) -> tuple:
+        """
+        Hashable form of the ingest rules (changes mean the snapshot must be re-crawled)
+        """
+        return (self.ingest_include, tuple(self.ingest_prefixes.prefixes), self.ingest_exclude)
+
+    def should_ingest(self, logical_name: str) -> bool:
+        """
+        Whether an entity is crawled from Dynamics 365: exclusions win, then
+        required entities and prefix rules include
+        """
+        name = logical_name.lower()
+        if name in self.ingest_exclude:
+            return False
+        return name in self.ingest_include or self.ingest_prefixes.match(name)
+
+    def entity_query(self) -> EntityQueryPlan:
+        """
+        EntityDefinitions $select/$filter with the ingest rules pushed down
+        """
+        return plan_entity_query(self.ingest_include, self.ingest_prefixes.prefixes, self.ingest_exclude)
+
+    def is_business(self, logical_name: str, is_custom: bool) -> bool:
+        """
+        Custom entities and standard entities that are not system/metadata entities
+        """
+        return is_custom or logical_name.lower() not in self.system_entities
+
+
+class RuleStore:
+    """
+    Holds the compiled rules for a config file and recompiles them when the
+    file changes. A file that fails to load is logged and the previous rules
+    stay in effect.
+    """
+
+    def __init__(self, path, check_seconds: float = ENTITY_RULES_CHECK_SECONDS):
+        self.path = Path(path)
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[EntityRules, EntityRules], None]] = []
+        self._mtime = self.path.stat().st_mtime_ns
+        self._rules = EntityRules.load(self.path, version=1)
+        self._checked_at = time.monotonic()
+
+    def add_listener(self, listener: Callable[[EntityRules, EntityRules], None]) -> None:
+        """
+        Register a callback that runs after each reload. Failures are logged and ignored.
+
+        :param listener: Callable taking the new and the previous EntityRules
+        """
+        self._listeners.append(listener)
+
+    def get(self) -> EntityRules:
+        """
+        Current rules, reloading the file first if it changed since the last check
+        """
+        if time.monotonic() - self._checked_at >= self.check_seconds:
+            self.reload(force=False)
+        return self._rules
+
+    def reload(self, force: bool = True) -> EntityRules:
+        """
+        Recompile the rules from the file
+
+        :param force: Reload even if the file's modification time is unchanged
+        :return: The current EntityRules
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = self.path.stat().st_mtime_ns
+                if not force and mtime == self._mtime:
+                    return self._rules
+                rules = EntityRules.load(self.path, version=self._rules.version + 1)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not reload entity rules from {self.path}: {e}")
+                return self._rules
+
+            previous = self._rules
+            self._mtime = mtime
+            self._rules = rules
+            logger.info(f"Entity rules v{rules.version} loaded from {self.path}")
+
+        for listener in self._listeners:
+            try:
+                listener(rules, previous)
+            except Exception as e:
+                logger.error(f"Entity rules listener {getattr(listener, '__name__', listener)} failed: {e}")
+        return rules
+
+
+rule_store = RuleStore(ENTITY_RULES_PATH)
+
+
+def get_rules() -> EntityRules:
+    """
+    Current entity rules (hot-reloaded from ENTITY_RULES_PATH)
+    """
+    return rule_store.get()
@@ -0,0 +1,238 @@
+"""
+Streaming record writers for exports.
+
+Each writer takes one record at a time and writes it straight to a text
+stream, so exports run in constant memory and several formats can be fed
+from the same pass over the records (see FanOut).
+"""
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, TextIO, Tuple, Union
+
+from .graph_records import json_default
+
+# A CSV column: (header, record key) or (header, function of the record)
+CsvColumn = Tuple[str, Union[str, Callable[[Dict[str, Any]], Any]]]
+
+ENTITY_CSV_COLUMNS = [
+    ('LogicalName', 'logicalName'),
+    ('Label', 'label'),
+    ('SchemaName', 'schemaName'),
+    ('EntitySetName', 'entitySetName'),
+    ('IsCustomEntity', 'isCustomEntity'),
+    ('IsActivity', 'isActivity'),
+    ('PrimaryIdAttribute', 'primaryIdAttribute'),
+    ('PrimaryNameAttribute', 'primaryNameAttribute'),
+    ('Description', 'description'),
+]
+
+RELATIONSHIP_CSV_COLUMNS = [
+    ('SchemaName', 'schemaName'),
+    ('Type', 'type'),
+    ('SourceEntity', 'sourceEntity'),
+    ('TargetEntity', 'targetEntity'),
+    ('SourceAttribute', 'sourceAttribute'),
+    ('TargetAttribute', 'targetAttribute'),
+    ('IntersectEntity', 'intersectEntity'),
+]
+
+# Text buffered before a chunk is handed to the client in stream_chunks
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+class RecordWriter:
+    """
+    Base class: write(record) per record, close() once at the end.
+    Writers don't own the stream; closing a writer only finishes its format.
+    """
+
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.count = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonArrayWriter(RecordWriter):
+    """
+    JSON array, one record per line
+    """
+
+    def __init__(self, out: TextIO):
+        super().__init__(out)
+        self._closed = False
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.out.write(',\n  ' if self.count else '[\n  ')
+        self.out.write(json.dumps(record, default=json_default))
+        self.count += 1
+
+    def close(self) -> None:
+        # Idempotent: a JsonObjectWriter also closes its member arrays
+        if not self._closed:
+            self.out.write('\n]' if self.count else '[]')
+            self._closed = True
+
+
+class JsonObjectWriter:
+    """
+    JSON object whose members are arrays written one after another, e.g.
+    {"nodes": [...], "edges": [...]} without holding either list
+    """
+
+    def __init__(self, out: TextIO):
+        self.out = out
+        self._members = 0
+        self._current = None
+
+    def array(self, name: str) -> JsonArrayWriter:
+        """
+        Start the next array member (finishing the previous one)
+        """
+        self._finish_current()
+        self.out.write(',\n' if self._members else '{\n')
+        self.out.write(f'{json.dumps(name)}: ')
+        self._members += 1
+        self._current = JsonArrayWriter(self.out)
+        return self._current
+
+    def _finish_current(self) -> None:
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+    def close(self) -> None:
+        self._finish_current()
+        self.out.write('\n}\n' if self._members else '{}\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class NdjsonWriter(RecordWriter):
+    """
+    Newline-delimited JSON, one record per line
+    """
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.out.write(json.dumps(record, default=json_default))
+        self.out.write('\n')
+        self.count += 1
+
+
+class CsvWriter(RecordWriter):
+    """
+    CSV with a fixed set of columns; the header is written immediately
+    """
+
+    def __init__(self, out: TextIO, columns: Sequence[CsvColumn]):
+        super().__init__(out)
+        self.headers = [header for header, _ in columns]
+        self._getters = [
+            source if callable(source) else (lambda record, key=source: record.get(key, ''))
+            for _, source in columns
+        ]
+        self._writer = csv.writer(out)
+        self._writer.writerow(self.headers)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._writer.writerow([getter(record) for getter in self._getters])
+        self.count += 1
+
+
+class FanOut(RecordWriter):
+    """
+    Sends every record to several writers, so all formats come from one pass
+    """
+
+    def __init__(self, writers: List[RecordWriter]):
+        super().__init__(None)
+        self.writers = writers
+
+    def write(self, record: Dict[str, Any]) -> None:
+        for writer in self.writers:
+            writer.write(record)
+        self.count += 1
+
+    def close(self) -> None:
+        for writer in self.writers:
+            writer.close()
+
+
+def write_all(records: Iterable[Dict[str, Any]], writer: RecordWriter) -> int:
+    """
+    Drain an iterable of records into a writer
+
+    :return: Number of records written
+    """
+    for record in records:
+        writer.write(record)
+    return writer.count
+
+
+def tap(records: Iterable[Dict[str, Any]], *observers: Callable[[Dict[str, Any]], None]) -> Iterator[Dict[str, Any]]:
+    """
+    Pass records through unchanged, calling each observer on the way
+    (for running totals and other side statistics)
+    """
+    for record in records:
+        for observer in observers:
+            observer(record)
+        yield record
+
+
+def write_records(out: TextIO, records: Iterable[Dict[str, Any]], make_writer: Callable[[TextIO], RecordWriter]) -> Iterator[None]:
+    """
+    Producer: write records in one format, yielding after each record (see stream_chunks)
+    """
+    writer = make_writer(out)
+    for record in records:
+        writer.write(record)
+        yield
+    writer.close()
+
+
+def write_graph_json(out: TextIO, nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]) -> Iterator[None]:
+    """
+    Producer: write {"nodes": [...], "edges": [...]}, yielding after each record
+    """
+    graph = JsonObjectWriter(out)
+    for name, records in (('nodes', nodes), ('edges', edges)):
+        writer = graph.array(name)
+        for record in records:
+            writer.write(record)
+            yield
+    graph.close()
+
+
+def stream_chunks(produce: Callable[[TextIO], Iterator[None]], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Run a producer against an in-memory buffer and hand its output out in
+    chunks of about chunk_size, e.g. as an HTTP response body
+
+    :param produce: Callable taking a text stream and returning a producer
+                    generator that yields after each record it writes
+    :return: Generator of text chunks
+    """
+    buffer = io.StringIO()
+    for _ in produce(buffer):
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
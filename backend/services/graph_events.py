@@ -0,0 +1,84 @@
+"""
+Fan-out of snapshot updates to connected clients (server-sent events)
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Optional, Set
+
+# Events buffered per client before the oldest is dropped. Clients diff from
+# the version they last saw, so dropping intermediate snapshots loses nothing.
+CLIENT_QUEUE_SIZE = 4
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data: str, event_id: Any = None) -> str:
+    """
+    Encode one server-sent event
+
+    :param event: Event name
+    :param data: Payload (JSON text); must not contain newlines
+    :param event_id: Optional id, sent back by the browser as Last-Event-ID on reconnect
+    """
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {data}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class GraphEventBroker:
+    """
+    Holds one asyncio queue per connected client and pushes each new snapshot
+    to all of them. publish() may be called from any thread (snapshot refreshes
+    run in worker threads); delivery happens on the event loop.
+    """
+
+    def __init__(self, queue_size: int = CLIENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Set[asyncio.Queue] = set()
+        self._lock = threading.Lock()
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Bind the broker to the event loop that serves the clients (call at startup)
+        """
+        self._loop = loop
+
+    @property
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._queues)
+
+    def subscribe(self) -> asyncio.Queue:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._queues.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._queues.discard(queue)
+
+    def publish(self, item: Any) -> None:
+        """
+        Queue an item for every subscribed client
+        """
+        loop = self._loop
+        with self._lock:
+            queues = list(self._queues)
+        if loop is None or not queues or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._deliver, queues, item)
+        logger.info(f"Pushed graph update to {len(queues)} client(s)")
+
+    @staticmethod
+    def _deliver(queues, item: Any) -> None:
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(item)
@@ -0,0 +1,163 @@
+"""
+Streaming graph file formats for external tooling: GraphML (yEd, networkx),
+GEXF (Gephi) and DOT (Graphviz).
+
+Writers emit markup record by record with string formatting instead of
+building a DOM, and follow the producer convention of export_writers: they
+yield after every node/edge so the output can be streamed in chunks.
+"""
+from typing import Any, Dict, Iterable, Iterator, TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+from .cascade_service import CASCADE_OPERATIONS
+
+# (attribute name, GraphML type, getter) for node and edge data
+NODE_ATTRIBUTES = (
+    ('label', 'string', lambda n: n.get('label')),
+    ('logicalName', 'string', lambda n: n.get('logicalName')),
+    ('hierarchyLevel', 'int', lambda n: n.get('hierarchyLevel')),
+    ('isCustomEntity', 'boolean', lambda n: n.get('isCustomEntity')),
+    ('isActivity', 'boolean', lambda n: n.get('isActivity')),
+)
+
+EDGE_ATTRIBUTES = (
+    ('type', 'string', lambda e: e.get('type')),
+    ('schemaName', 'string', lambda e: e.get('schemaName')),
+    ('sourceAttribute', 'string', lambda e: e.get('sourceAttribute')),
+    ('targetAttribute', 'string', lambda e: e.get('targetAttribute')),
+    ('intersectEntity', 'string', lambda e: e.get('intersectEntity')),
+) + tuple(
+    (f'cascade{op}', 'string', lambda e, op=op: (e.get('relationshipBehavior') or {}).get(op))
+    for op in CASCADE_OPERATIONS
+)
+
+
+# GraphML attribute types -> GEXF attribute types
+GEXF_TYPES = {'string': 'string', 'int': 'integer', 'boolean': 'boolean'}
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def write_graphml(out: TextIO, nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]) -> Iterator[None]:
+    """
+    Producer: write a directed GraphML graph. Edges whose ends are not among
+    the written nodes are skipped, since GraphML requires both ends to exist.
+    """
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+              'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+              'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+              'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+    for domain, attributes in (('node', NODE_ATTRIBUTES), ('edge', EDGE_ATTRIBUTES)):
+        for name, attr_type, _ in attributes:
+            out.write(f'  <key id="{domain[0]}_{name}" for="{domain}" attr.name="{name}" attr.type="{attr_type}"/>\n')
+    out.write('  <graph id="entities" edgedefault="directed">\n')
+
+    node_ids = set()
+    for node in nodes:
+        node_ids.add(node['id'])
+        out.write(f'    <node id={quoteattr(node["id"])}>')
+        for name, _, getter in NODE_ATTRIBUTES:
+            value = getter(node)
+            if value is not None:
+                out.write(f'<data key="n_{name}">{escape(_text(value))}</data>')
+        out.write('</node>\n')
+        yield
+
+    for edge in edges:
+        if edge['sourceEntity'] not in node_ids or edge['targetEntity'] not in node_ids:
+            continue
+        out.write(f'    <edge id={quoteattr(edge["id"])} source={quoteattr(edge["sourceEntity"])} '
+                  f'target={quoteattr(edge["targetEntity"])}>')
+        for name, _, getter in EDGE_ATTRIBUTES:
+            value = getter(edge)
+            if value is not None:
+                out.write(f'<data key="e_{name}">{escape(_text(value))}</data>')
+        out.write('</edge>\n')
+        yield
+
+    out.write('  </graph>\n</graphml>\n')
+
+
+def write_gexf(out: TextIO, nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]) -> Iterator[None]:
+    """
+    Producer: write a directed GEXF 1.3 graph (Gephi's native format).
+    Edges whose ends are not among the written nodes are skipped.
+    """
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<gexf xmlns="http://gexf.net/1.3" version="1.3">\n')
+    out.write('  <graph defaultedgetype="directed" mode="static">\n')
+    for domain, attributes in (('node', NODE_ATTRIBUTES), ('edge', EDGE_ATTRIBUTES)):
+        out.write(f'    <attributes class="{domain}">\n')
+        for name, attr_type, _ in attributes:
+            out.write(f'      <attribute id="{name}" title="{name}" type="{GEXF_TYPES[attr_type]}"/>\n')
+        out.write('    </attributes>\n')
+
+    def attvalues(record, attributes):
+        values = [(name, getter(record)) for name, _, getter in attributes]
+        return ''.join(
+            f'<attvalue for="{name}" value={quoteattr(_text(value))}/>'
+            for name, value in values if value is not None
+        )
+
+    node_ids = set()
+    out.write('    <nodes>\n')
+    for node in nodes:
+        node_ids.add(node['id'])
+        out.write(f'      <node id={quoteattr(node["id"])} label={quoteattr(node.get("label") or node["id"])}>'
+                  f'<attvalues>{attvalues(node, NODE_ATTRIBUTES)}</attvalues></node>\n')
+        yield
+    out.write('    </nodes>\n')
+
+    out.write('    <edges>\n')
+    for edge in edges:
+        if edge['sourceEntity'] not in node_ids or edge['targetEntity'] not in node_ids:
+            continue
+        out.write(f'      <edge id={quoteattr(edge["id"])} source={quoteattr(edge["sourceEntity"])} '
+                  f'target={quoteattr(edge["targetEntity"])} label={quoteattr(edge.get("schemaName") or edge["id"])}>'
+                  f'<attvalues>{attvalues(edge, EDGE_ATTRIBUTES)}</attvalues></edge>\n')
+        yield
+    out.write('    </edges>\n')
+
+    out.write('  </graph>\n</gexf>\n')
+
+
+def _dot_id(value: Any) -> str:
+    """
+    Quoted DOT identifier / attribute value
+    """
+    text = _text(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'"{text}"'
+
+
+def write_dot(out: TextIO, nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]) -> Iterator[None]:
+    """
+    Producer: write a Graphviz DOT digraph. ManyToMany edges are drawn
+    without arrowheads; edges whose ends are not among the written nodes are skipped.
+    """
+    def attribute_list(record, attributes, extra=()):
+        values = [(name, getter(record)) for name, _, getter in attributes] + list(extra)
+        return ', '.join(f'{name}={_dot_id(value)}' for name, value in values if value is not None)
+
+    out.write('digraph entities {\n')
+    out.write('  node [shape=box];\n')
+
+    node_ids = set()
+    for node in nodes:
+        node_ids.add(node['id'])
+        out.write(f'  {_dot_id(node["id"])} [{attribute_list(node, NODE_ATTRIBUTES)}];\n')
+        yield
+
+    for edge in edges:
+        if edge['sourceEntity'] not in node_ids or edge['targetEntity'] not in node_ids:
+            continue
+        extra = [('dir', 'none')] if edge.get('type') == 'ManyToMany' else []
+        out.write(f'  {_dot_id(edge["sourceEntity"])} -> {_dot_id(edge["targetEntity"])} '
+                  f'[{attribute_list(edge, EDGE_ATTRIBUTES, extra)}];\n')
+        yield
+
+    out.write('}\n')
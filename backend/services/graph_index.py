@@ -0,0 +1,65 @@
+"""
+Dense integer index over a graph view for vectorized NumPy algorithms
+"""
+from typing import List, Dict, Any
+
+import numpy as np
+
+
+class GraphIndex:
+    """
+    Maps entity ids to dense integer positions and stores edge endpoints as
+    parallel NumPy arrays.
+
+    Only edges whose endpoints are both present in the node list are indexed;
+    edge_positions records where each indexed edge sits in the original list.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+        self.ids = [n['id'] for n in nodes]
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+
+        src, dst, positions = [], [], []
+        for position, edge in enumerate(edges):
+            source = self.index.get(edge['sourceEntity'])
+            target = self.index.get(edge['targetEntity'])
+            if source is None or target is None:
+                continue
+            src.append(source)
+            dst.append(target)
+            positions.append(position)
+
+        self.src = np.array(src, dtype=np.int64)
+        self.dst = np.array(dst, dtype=np.int64)
+        self.edge_positions = np.array(positions, dtype=np.int64)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.src)
+
+    def connected_components(self) -> np.ndarray:
+        """
+        Label each node with its weakly connected component.
+        Labels are dense (0..k-1) and ordered by the lowest node index in each component.
+
+        :return: Component label per node
+        """
+        labels = np.arange(self.node_count, dtype=np.int64)
+        if self.edge_count == 0:
+            return labels
+
+        # Min-label propagation with pointer jumping: converges in O(log n) rounds
+        # on typical graphs instead of O(diameter)
+        while True:
+            previous = labels.copy()
+            np.minimum.at(labels, self.src, labels[self.dst])
+            np.minimum.at(labels, self.dst, labels[self.src])
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                break
+
+        return np.unique(labels, return_inverse=True)[1].reshape(-1)
@@ -0,0 +1,277 @@
+"""
+Boolean filter algebra over snapshot nodes and edges
+
+Each node predicate (custom, business, core, activity, empty, hierarchy
+level, name prefix) is a NumPy boolean mask over the snapshot's dense node index.
+A filter expression such as "custom AND NOT activity" or
+"core OR (prefix:qrt_ AND level:3)" compiles to a few vector operations,
+and the edge mask follows from vectorized endpoint lookups.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .entity_rules import EntityRules
+from .graph_index import GraphIndex
+
+# Predicates that take no argument; 'prefix:<p>', 'level:<n>' and 'entity:<name>' take one
+NODE_PREDICATES = ('all', 'custom', 'business', 'core', 'activity', 'empty')
+ARGUMENT_PREDICATES = ('prefix', 'level', 'entity')
+
+# Argument masks (prefix/level/entity) kept per GraphMasks, least recently used dropped first
+ARGUMENT_MASK_CACHE_SIZE = 32
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|(&|\||!)|([A-Za-z_][A-Za-z0-9_]*(?::[A-Za-z0-9_.\-]*)?))")
+_OPERATORS = {'&': 'and', '|': 'or', '!': 'not'}
+
+
+class FilterSyntaxError(ValueError):
+    """
+    Raised for filter expressions that cannot be parsed
+    """
+
+
+def _tokenize(expression: str) -> List[str]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise FilterSyntaxError(f"Unexpected character at position {position}: {expression[position:]!r}")
+        open_paren, close_paren, symbol, word = match.groups()
+        if symbol:
+            tokens.append(_OPERATORS[symbol])
+        elif word and word.lower() in ('and', 'or', 'not'):
+            tokens.append(word.lower())
+        else:
+            tokens.append(open_paren or close_paren or word)
+        position = match.end()
+    return tokens
+
+
+def parse_filter(expression: str) -> tuple:
+    """
+    Parse a filter expression into a tree of ('and'|'or', left, right),
+    ('not', operand) and ('pred', name, argument) tuples
+
+    Grammar (NOT binds tighter than AND, AND tighter than OR):
+        expr    := term ('OR' term)*
+        term    := factor ('AND' factor)*
+        factor  := 'NOT' factor | '(' expr ')' | predicate
+        predicate := all | custom | business | core | activity | empty
+                   | prefix:<prefix> | level:<n> | entity:<logical name>
+
+    Operators are case-insensitive; &, | and ! may be used instead.
+    'empty' selects entities with a record count of 0 (unknown counts are not empty).
+
+    :param expression: Filter expression
+    :return: Expression tree
+    :raises FilterSyntaxError: If the expression is malformed or uses an unknown predicate
+    """
+    tokens = _tokenize(expression)
+    if not tokens:
+        raise FilterSyntaxError("Empty filter expression")
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise FilterSyntaxError("Unexpected end of filter expression")
+        position += 1
+        return token
+
+    def expr():
+        node = term()
+        while peek() == 'or':
+            take()
+            node = ('or', node, term())
+        return node
+
+    def term():
+        node = factor()
+        while peek() == 'and':
+            take()
+            node = ('and', node, factor())
+        return node
+
+    def factor():
+        token = take()
+        if token == 'not':
+            return ('not', factor())
+        if token == '(':
+            node = expr()
+            if take() != ')':
+                raise FilterSyntaxError("Expected ')'")
+            return node
+        if token in (')', 'and', 'or'):
+            raise FilterSyntaxError(f"Unexpected {token!r}")
+        return predicate(token)
+
+    def predicate(token):
+        name, _, argument = token.partition(':')
+        name = name.lower()
+        if name in NODE_PREDICATES and not argument:
+            return ('pred', name, None)
+        if name in ARGUMENT_PREDICATES and argument:
+            if name == 'level':
+                if not argument.isdigit():
+                    raise FilterSyntaxError(f"level expects an integer: {token!r}")
+                return ('pred', name, int(argument))
+            return ('pred', name, argument.lower())
+        raise FilterSyntaxError(f"Unknown predicate: {token!r}")
+
+    tree = expr()
+    if position != len(tokens):
+        raise FilterSyntaxError(f"Unexpected {tokens[position]!r}")
+    return tree
+
+
+def format_filter(tree: tuple) -> str:
+    """
+    Canonical text of a parsed expression (fully parenthesized), so equivalent
+    spellings share one cache key
+    """
+    kind = tree[0]
+    if kind == 'pred':
+        return tree[1] if tree[2] is None else f"{tree[1]}:{tree[2]}"
+    if kind == 'not':
+        return f"NOT {format_filter(tree[1])}"
+    return f"({format_filter(tree[1])} {kind.upper()} {format_filter(tree[2])})"
+
+
+def mode_filter(filter_mode: str, prefixes: Tuple[str, ...] = ()) -> tuple:
+    """
+    Expression tree equivalent to a /api/graph filter mode
+
+    :param filter_mode: One of entity_rules.FILTER_MODES
+    :param prefixes: Custom prefixes for core_custom (empty: all custom entities)
+    """
+    if filter_mode == 'core_custom':
+        custom = ('pred', 'custom', None)
+        if prefixes:
+            matched = ('pred', 'prefix', prefixes[0])
+            for prefix in prefixes[1:]:
+                matched = ('or', matched, ('pred', 'prefix', prefix))
+            custom = ('and', custom, matched)
+        return ('or', ('pred', 'core', None), custom)
+    return ('pred', filter_mode, None)
+
+
+class GraphMasks:
+    """
+    Dense node/edge indexes of a snapshot with one boolean mask per node
+    predicate. Fixed predicates are computed up front in a single pass;
+    prefix/level/entity masks are computed on first use and only the
+    ARGUMENT_MASK_CACHE_SIZE most recently used are kept, since their
+    arguments come from client requests.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], rules: EntityRules):
+        self.nodes = nodes
+        self.edges = edges
+        self.graph = GraphIndex(nodes, edges)
+
+        count = len(nodes)
+        self.names = np.array([n.get('logicalName', '').lower() for n in nodes], dtype=object)
+        custom = np.fromiter((bool(n.get('isCustomEntity', False)) for n in nodes), dtype=bool, count=count)
+        activity = np.fromiter((bool(n.get('isActivity', False)) for n in nodes), dtype=bool, count=count)
+        empty = np.fromiter((n.get('recordCount') == 0 for n in nodes), dtype=bool, count=count)
+        self.levels = np.fromiter(
+            (n.get('hierarchyLevel') if n.get('hierarchyLevel') is not None else -1 for n in nodes),
+            dtype=np.int16, count=count
+        )
+        system = np.fromiter((name in rules.system_entities for name in self.names), dtype=bool, count=count)
+        core = np.fromiter((name in rules.core_entities for name in self.names), dtype=bool, count=count)
+
+        self._masks: Dict[tuple, np.ndarray] = {
+            ('all', None): np.ones(count, dtype=bool),
+            ('custom', None): custom,
+            ('business', None): custom | ~system,
+            ('core', None): core,
+            ('activity', None): activity,
+            ('empty', None): empty,
+        }
+        for mask in self._masks.values():
+            mask.flags.writeable = False
+        self._argument_masks: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def predicate_mask(self, name: str, argument=None) -> np.ndarray:
+        """
+        Boolean node mask for one predicate (read-only; cached)
+        """
+        key = (name, argument)
+        mask = self._masks.get(key)
+        if mask is not None:
+            return mask
+
+        with self._lock:
+            mask = self._argument_masks.get(key)
+            if mask is not None:
+                self._argument_masks.move_to_end(key)
+                return mask
+
+        if name == 'prefix':
+            mask = np.fromiter((n.startswith(argument) for n in self.names), dtype=bool, count=len(self.names))
+        elif name == 'level':
+            mask = self.levels == argument
+        elif name == 'entity':
+            mask = self.names == argument
+        else:
+            raise ValueError(f"Unknown predicate: {name}")
+        mask.flags.writeable = False
+
+        with self._lock:
+            self._argument_masks[key] = mask
+            while len(self._argument_masks) > ARGUMENT_MASK_CACHE_SIZE:
+                self._argument_masks.popitem(last=False)
+        return mask
+
+    def node_mask(self, tree: tuple) -> np.ndarray:
+        """
+        Evaluate a parsed filter expression to a boolean node mask
+        """
+        kind = tree[0]
+        if kind == 'pred':
+            return self.predicate_mask(tree[1], tree[2])
+        if kind == 'not':
+            return ~self.node_mask(tree[1])
+        left, right = self.node_mask(tree[1]), self.node_mask(tree[2])
+        return left & right if kind == 'and' else left | right
+
+    def edge_mask(self, node_mask: np.ndarray) -> np.ndarray:
+        """
+        Edges whose source and target are both selected (edges with an
+        endpoint outside the snapshot are never selected)
+        """
+        mask = np.zeros(len(self.edges), dtype=bool)
+        graph = self.graph
+        mask[graph.edge_positions] = node_mask[graph.src] & node_mask[graph.dst]
+        return mask
+
+    def select(self, tree: tuple, limit: int = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Nodes and edges of the snapshot selected by a filter expression
+
+        :param tree: Parsed filter expression
+        :param limit: Keep only the first N selected nodes (and the edges between them)
+        :return: Tuple of (nodes, edges), in snapshot order
+        """
+        node_mask = self.node_mask(tree)
+        node_positions = np.flatnonzero(node_mask)
+        if limit and limit > 0 and len(node_positions) > limit:
+            node_positions = node_positions[:limit]
+            node_mask = np.zeros(len(self.nodes), dtype=bool)
+            node_mask[node_positions] = True
+
+        edge_positions = np.flatnonzero(self.edge_mask(node_mask))
+        nodes, edges = self.nodes, self.edges
+        return [nodes[i] for i in node_positions.tolist()], [edges[i] for i in edge_positions.tolist()]
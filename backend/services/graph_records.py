@@ -0,0 +1,201 @@
+"""
+Compact node and edge records for graph snapshots
+
+A snapshot used to hold one dict per entity and relationship, each with its
+own hash table of repeated keys and (for OneToMany edges) its own copy of the
+cascade configuration. The records here store fields in __slots__, intern
+entity and attribute names, and share one cascade configuration dict per
+distinct configuration.
+
+Records are Mappings with the same keys as the dicts they replace, so code
+that reads snapshot nodes and edges is unchanged; they become plain dicts
+only when serialized (to_dict / json_default).
+"""
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+# Node fields in wire order: DynamicsService.format_entity, then the metrics
+# added by graph_analytics.analytics_stage and record_counts.RecordCountCache
+ENTITY_FIELDS = (
+    'id', 'label', 'logicalName', 'schemaName', 'entitySetName', 'primaryIdAttribute',
+    'primaryNameAttribute', 'isCustomEntity', 'isActivity', 'description', 'hierarchyLevel',
+    'requiredFields',
+    'inDegree', 'outDegree', 'degree', 'pageRank', 'betweenness', 'componentId', 'isArticulationPoint',
+    'recordCount',
+)
+
+# Node fields set by snapshot stages rather than the metadata crawl. The metrics
+# are graph-wide and recordCount comes from a TTL cache, so they change on most
+# nodes whenever anything changes; snapshot_diff leaves them out of change-logs.
+STAGE_FIELDS = frozenset({
+    'inDegree', 'outDegree', 'degree', 'pageRank', 'betweenness', 'componentId', 'isArticulationPoint',
+    'recordCount',
+})
+
+# Edge fields in wire order (DynamicsService.format_relationship)
+RELATIONSHIP_FIELDS = (
+    'id', 'schemaName', 'type', 'sourceEntity', 'targetEntity', 'sourceAttribute', 'targetAttribute',
+    'relationshipBehavior', 'intersectEntity', 'entity1Attribute', 'entity2Attribute',
+)
+
+# Name-like fields whose strings repeat across records (free text is not interned)
+INTERNED_FIELDS = frozenset({
+    'id', 'logicalName', 'schemaName', 'entitySetName', 'primaryIdAttribute', 'primaryNameAttribute',
+    'type', 'sourceEntity', 'targetEntity', 'sourceAttribute', 'targetAttribute',
+    'intersectEntity', 'entity1Attribute', 'entity2Attribute',
+})
+
+_MISSING = object()
+
+
+class CompactRecord(Mapping):
+    """
+    Mapping over __slots__ fields. Keys outside FIELDS are kept in a small
+    overflow dict, so records accept anything the dicts they replace did.
+    Item assignment is supported for snapshot stages that annotate records.
+    """
+
+    __slots__ = ('_extra',)
+    FIELDS: Tuple[str, ...] = ()
+    _FIELD_SET = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, values: Mapping = None):
+        self._extra = None
+        if values:
+            for key, value in values.items():
+                self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._FIELD_SET:
+            value = getattr(self, key, _MISSING)
+        else:
+            value = self._extra.get(key, _MISSING) if self._extra is not None else _MISSING
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._FIELD_SET:
+            return getattr(self, key, default)
+        return self._extra.get(key, default) if self._extra is not None else default
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if getattr(self, field, _MISSING) is not _MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._FIELD_SET and getattr(self, key, _MISSING) is not _MISSING:
+            delattr(self, key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Wire format: a plain dict with the same keys and values
+        """
+        result = {}
+        for field in self.FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                result[field] = value
+        if self._extra is not None:
+            result.update(self._extra)
+        return result
+
+    def copy(self) -> 'CompactRecord':
+        """
+        Shallow copy (field values, including shared cascade configs, are not copied)
+        """
+        duplicate = self.__class__()
+        for field in self.FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                setattr(duplicate, field, value)
+        if self._extra is not None:
+            duplicate._extra = dict(self._extra)
+        return duplicate
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+
+class EntityRecord(CompactRecord):
+    __slots__ = ENTITY_FIELDS
+    FIELDS = ENTITY_FIELDS
+
+
+class RelationshipRecord(CompactRecord):
+    __slots__ = RELATIONSHIP_FIELDS
+    FIELDS = RELATIONSHIP_FIELDS
+
+
+def json_default(value: Any) -> Any:
+    """
+    json.dumps default: records as plain dicts, anything else as str
+    """
+    if isinstance(value, CompactRecord):
+        return value.to_dict()
+    return str(value)
+
+
+def _intern_names(record: Mapping) -> Dict[str, Any]:
+    return {
+        key: sys.intern(value) if key in INTERNED_FIELDS and isinstance(value, str) else value
+        for key, value in record.items()
+    }
+
+
+def compact_graph(nodes: Iterable[Mapping], edges: Iterable[Mapping]) -> Tuple[List[EntityRecord], List[RelationshipRecord]]:
+    """
+    Convert entity and relationship dicts into compact records, interning
+    names and sharing identical cascade configurations
+
+    :param nodes: Entity dictionaries (e.g. from DynamicsService.get_entity_graph_data)
+    :param edges: Relationship dictionaries
+    :return: Tuple of (entity records, relationship records)
+    """
+    behaviors: Dict[tuple, Dict[str, Any]] = {}
+
+    def shared_behavior(config):
+        if not isinstance(config, dict) or not config:
+            return config
+        try:
+            key = tuple(sorted(config.items()))
+        except TypeError:  # Unhashable values: keep this record's own copy
+            return config
+        return behaviors.setdefault(key, config)
+
+    entity_records = [EntityRecord(_intern_names(node)) for node in nodes]
+
+    relationship_records = []
+    for edge in edges:
+        values = _intern_names(edge)
+        if 'relationshipBehavior' in values:
+            values['relationshipBehavior'] = shared_behavior(values['relationshipBehavior'])
+        relationship_records.append(RelationshipRecord(values))
+
+    return entity_records, relationship_records
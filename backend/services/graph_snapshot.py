@@ -0,0 +1,244 @@
+"""
+Cached snapshot of the entity graph shared across API requests
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Hashable
+
+from .graph_records import compact_graph
+from .snapshot_diff import SnapshotHistory
+
+# How long a metadata crawl is served before the next request triggers a refresh
+SNAPSHOT_TTL_SECONDS = int(os.environ.get('SNAPSHOT_TTL_SECONDS', '900'))
+
+# How often the background refresher re-crawls (0 disables it; refreshes then only happen on request)
+SNAPSHOT_REFRESH_INTERVAL_SECONDS = int(os.environ.get('SNAPSHOT_REFRESH_INTERVAL_SECONDS', str(SNAPSHOT_TTL_SECONDS)))
+
+# Per-view derived entries (tuple keys) kept per snapshot, least recently used dropped first
+DERIVED_VIEW_CACHE_SIZE = int(os.environ.get('DERIVED_VIEW_CACHE_SIZE', '32'))
+
+
+class GraphSnapshot:
+    """
+    Nodes and edges from a single metadata crawl, plus a cache for any data
+    derived from them (filtered views, layouts, indexes, ...).
+
+    SnapshotCache stores nodes and edges as compact records (see graph_records),
+    which read like the entity/relationship dicts they are built from.
+
+    Snapshots are treated as read-only once built: derived data is keyed on the
+    snapshot itself, so it is dropped together with the snapshot on refresh.
+    Fixed keys ('stats', 'cascade', ...) are kept for the snapshot's lifetime;
+    tuple keys depend on request parameters (view_key), so only the
+    DERIVED_VIEW_CACHE_SIZE most recently used of them are kept.
+    """
+
+    def __init__(self, version: int, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]],
+                 view_cache_size: int = DERIVED_VIEW_CACHE_SIZE):
+        self.version = version
+        self.created_at = time.time()
+        self.nodes = nodes
+        self.edges = edges
+        self._derived: Dict[Hashable, Any] = {}
+        self._views: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._view_cache_size = view_cache_size
+        self._lock = threading.Lock()
+        self._building: Dict[Hashable, threading.Lock] = {}
+
+    def get_derived(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return a value derived from this snapshot, computing it on first use.
+        Concurrent first requests for the same key wait for one computation.
+
+        :param key: Cache key, e.g. ('layout', view_key, 'radial'); tuple keys are LRU-bounded
+        :param factory: Zero-argument callable that computes the value
+        :return: The cached or freshly computed value
+        """
+        cache = self._views if isinstance(key, tuple) else self._derived
+        with self._lock:
+            if key in cache:
+                if cache is self._views:
+                    cache.move_to_end(key)
+                return cache[key]
+            key_lock = self._building.setdefault(key, threading.Lock())
+
+        # Compute under a per-key lock so slow factories don't block other keys
+        with key_lock:
+            with self._lock:
+                if key in cache:
+                    return cache[key]
+            try:
+                value = factory()
+            except BaseException:
+                with self._lock:
+                    self._building.pop(key, None)
+                raise
+
+            with self._lock:
+                self._building.pop(key, None)
+                cache[key] = value
+                if cache is self._views:
+                    cache.move_to_end(key)
+                    while len(cache) > self._view_cache_size:
+                        cache.popitem(last=False)
+                return value
+
+
+class SnapshotCache:
+    """
+    Holds the current GraphSnapshot and rebuilds it from Dynamics 365 once it
+    is older than the configured TTL. Recent versions are kept in a
+    SnapshotHistory so clients can fetch what changed since their version.
+    """
+
+    def __init__(self, dynamics_service, ttl_seconds: int = SNAPSHOT_TTL_SECONDS):
+        self.logger = logging.getLogger(__name__)
+        self.dynamics_service = dynamics_service
+        self.ttl_seconds = ttl_seconds
+        self._snapshot = None
+        self._version = 0
+        self._invalidated = False
+        self._refresh_lock = threading.Lock()
+        self._stages: List[Callable[[GraphSnapshot], None]] = []
+        self.history = SnapshotHistory()
+        self._listeners: List[Callable[[GraphSnapshot], None]] = []
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    def add_stage(self, stage: Callable[[GraphSnapshot], None]) -> None:
+        """
+        Register a stage that runs on every new snapshot before it is published.
+        Stages may annotate nodes/edges or precompute derived data; a failing
+        stage is logged and skipped so the graph itself stays available.
+        The version is recorded in the history after all stages have run, so
+        the history's copies carry the fields they set; change-logs leave those
+        fields out (graph_records.STAGE_FIELDS). Stages must not modify the
+        records after that.
+
+        :param stage: Callable taking the new GraphSnapshot
+        """
+        self._stages.append(stage)
+
+    def add_listener(self, listener: Callable[[GraphSnapshot], None]) -> None:
+        """
+        Register a callback that runs after each new snapshot is published
+        (in the refreshing thread). Failures are logged and ignored.
+
+        :param listener: Callable taking the new GraphSnapshot
+        """
+        self._listeners.append(listener)
+
+    @property
+    def current(self):
+        """
+        The published snapshot, without triggering a refresh (None before the first crawl)
+        """
+        return self._snapshot
+
+    def is_stale(self) -> bool:
+        """
+        Check whether the current snapshot is missing, invalidated or past its TTL
+        """
+        snapshot = self._snapshot
+        return snapshot is None or self._invalidated or time.time() - snapshot.created_at >= self.ttl_seconds
+
+    def invalidate(self) -> None:
+        """
+        Mark the current snapshot stale so the next get() (or the background
+        refresher) re-crawls, e.g. after the entity rules changed
+        """
+        self._invalidated = True
+
+    def get(self, force_refresh: bool = False) -> GraphSnapshot:
+        """
+        Return the current snapshot, refreshing it first if stale
+
+        :param force_refresh: Rebuild the snapshot even if it is still fresh
+        :return: The current GraphSnapshot
+        """
+        if force_refresh or self.is_stale():
+            return self.refresh(force=force_refresh)
+        return self._snapshot
+
+    def refresh(self, force: bool = True) -> GraphSnapshot:
+        """
+        Rebuild the snapshot from Dynamics 365.
+        Concurrent callers wait for a single crawl instead of starting their own.
+
+        :param force: If False, skip the crawl when another caller already refreshed
+        :return: The new GraphSnapshot
+        """
+        with self._refresh_lock:
+            if not force and not self.is_stale():
+                return self._snapshot
+
+            start_time = time.time()
+            graph_data = self.dynamics_service.get_entity_graph_data()
+            nodes, edges = compact_graph(graph_data['nodes'], graph_data['edges'])
+            self._version += 1
+            snapshot = GraphSnapshot(self._version, nodes, edges)
+
+            for stage in self._stages:
+                try:
+                    stage(snapshot)
+                except Exception as e:
+                    self.logger.error(f"Snapshot stage {getattr(stage, '__name__', stage)} failed: {e}")
+
+            # After the stages, so records reported as added carry their annotations
+            self.history.record(snapshot.version, snapshot.created_at, snapshot.nodes, snapshot.edges)
+
+            self._snapshot = snapshot
+            self._invalidated = False
+
+            self.logger.info(
+                f"Snapshot v{self._version} built: {len(graph_data['nodes'])} entities, "
+                f"{len(graph_data['edges'])} relationships in {time.time() - start_time:.2f} seconds"
+            )
+
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                self.logger.error(f"Snapshot listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+        return snapshot
+
+    def start_background_refresh(self, interval_seconds: int = SNAPSHOT_REFRESH_INTERVAL_SECONDS) -> None:
+        """
+        Re-crawl in a daemon thread whenever the snapshot is older than the interval,
+        so snapshots (and pushed updates) don't depend on incoming requests
+
+        :param interval_seconds: Refresh interval; 0 or less leaves the refresher off
+        """
+        if interval_seconds <= 0 or self._refresh_thread is not None:
+            return
+
+        def run():
+            wait = 0
+            while not self._stop_event.wait(wait):
+                snapshot = self._snapshot
+                age = time.time() - snapshot.created_at if snapshot else interval_seconds
+                if age < interval_seconds and not self._invalidated:
+                    # Refreshed by a request in the meantime
+                    wait = interval_seconds - age
+                    continue
+                try:
+                    self.refresh(force=True)
+                except Exception as e:
+                    self.logger.error(f"Background snapshot refresh failed: {e}")
+                wait = interval_seconds
+
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(target=run, name='snapshot-refresh', daemon=True)
+        self._refresh_thread.start()
+        self.logger.info(f"Background snapshot refresh every {interval_seconds} seconds")
+
+    def stop_background_refresh(self) -> None:
+        """
+        Stop the background refresher (an in-flight crawl finishes first)
+        """
+        self._stop_event.set()
+        self._refresh_thread = None
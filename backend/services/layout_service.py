@@ -0,0 +1,188 @@
+"""
+Server-side graph layouts so clients don't have to run dagre on large views.
+
+Positions are computed with vectorized NumPy math and returned as React Flow
+style {x, y} dictionaries keyed by entity id.
+"""
+import logging
+from typing import List, Dict, Any
+
+import numpy as np
+
+from .dynamics_service import DynamicsService
+from .graph_index import GraphIndex
+
+LAYOUT_TYPES = ('hierarchy', 'radial', 'layered')
+
+# Hierarchy layout spacing (mirrors getHierarchyLayout in frontend/src/utils/layoutHelpers.ts)
+HIERARCHY_NODE_WIDTH = 220
+HIERARCHY_NODE_HEIGHT = 120
+HIERARCHY_LEVEL_SPACING = 200
+HIERARCHY_BOX_SPACING = 150
+HIERARCHY_ROW_SPACING = 100
+HIERARCHY_MAX_PER_ROW = 6
+HIERARCHY_CANVAS_WIDTH = 3000
+LAYOUT_START_X = 100
+LAYOUT_START_Y = 100
+
+# Radial layout rings (mirrors getFullCircularLayout): levels 1-3 get their own ring,
+# everything else goes on the outermost ring
+RADIAL_CENTER = 1500
+RADIAL_RADII = {1: 400, 2: 800, 3: 1200}
+RADIAL_DEFAULT_RADIUS = 4800
+
+# Layered layout spacing (mirrors getLayoutedElements / dagre defaults)
+LAYERED_NODE_WIDTH = 200
+LAYERED_NODE_HEIGHT = 100
+LAYERED_RANKSEP = 150
+LAYERED_NODESEP = 100
+LAYERED_ORDERING_SWEEPS = 4
+
+
+class LayoutService:
+    """
+    Computes node positions for a graph view
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def compute_layout(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]],
+                       layout_type: str) -> Dict[str, Dict[str, float]]:
+        """
+        Compute positions for every node in the view
+
+        :param nodes: Entity dictionaries (must have 'id' and 'logicalName')
+        :param edges: Relationship dictionaries (must have 'sourceEntity' and 'targetEntity')
+        :param layout_type: One of LAYOUT_TYPES
+        :return: Dictionary of node id -> {'x': float, 'y': float}
+        """
+        if layout_type not in LAYOUT_TYPES:
+            raise ValueError(f"Invalid layout: {layout_type}")
+        if not nodes:
+            return {}
+
+        if layout_type == 'hierarchy':
+            x, y = self._hierarchy_layout(nodes)
+        elif layout_type == 'radial':
+            x, y = self._radial_layout(nodes)
+        else:
+            x, y = self._layered_layout(nodes, edges)
+
+        return {
+            node['id']: {'x': float(px), 'y': float(py)}
+            for node, px, py in zip(nodes, x.tolist(), y.tolist())
+        }
+
+    @staticmethod
+    def _hierarchy_levels(nodes: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Hierarchy level (0-4) per node, as assigned by DynamicsService
+        """
+        return np.fromiter(
+            (DynamicsService.get_hierarchy_level(n.get('logicalName') or n['id']) for n in nodes),
+            dtype=np.int64,
+            count=len(nodes)
+        )
+
+    @staticmethod
+    def _rank_within_groups(groups: np.ndarray) -> tuple:
+        """
+        Stable position of each element within its group, plus the group sizes
+
+        :param groups: Non-negative integer group id per element
+        :return: Tuple of (rank per element, size of each group)
+        """
+        order = np.argsort(groups, kind='stable')
+        counts = np.bincount(groups)
+        group_start = np.cumsum(counts) - counts
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(groups)) - group_start[groups[order]]
+        return rank, counts
+
+    def _hierarchy_layout(self, nodes: List[Dict[str, Any]]) -> tuple:
+        """
+        One band per hierarchy level (top to bottom), wrapped into centered rows
+        """
+        levels = self._hierarchy_levels(nodes)
+        rank, counts = self._rank_within_groups(levels)
+
+        row = rank // HIERARCHY_MAX_PER_ROW
+        col = rank % HIERARCHY_MAX_PER_ROW
+
+        # Height of each level band, and where each band starts
+        rows_per_level = -(-counts // HIERARCHY_MAX_PER_ROW)
+        level_height = (rows_per_level * HIERARCHY_NODE_HEIGHT
+                        + np.maximum(rows_per_level - 1, 0) * HIERARCHY_ROW_SPACING)
+        level_span = np.where(counts > 0, level_height + HIERARCHY_LEVEL_SPACING, 0)
+        level_offset = np.cumsum(level_span) - level_span
+
+        # Center each row horizontally on the canvas
+        row_length = np.minimum(HIERARCHY_MAX_PER_ROW, counts[levels] - row * HIERARCHY_MAX_PER_ROW)
+        row_width = row_length * HIERARCHY_NODE_WIDTH + (row_length - 1) * HIERARCHY_BOX_SPACING
+        row_start_x = LAYOUT_START_X + (HIERARCHY_CANVAS_WIDTH - row_width) / 2
+
+        x = row_start_x + col * (HIERARCHY_NODE_WIDTH + HIERARCHY_BOX_SPACING)
+        y = LAYOUT_START_Y + level_offset[levels] + row * (HIERARCHY_NODE_HEIGHT + HIERARCHY_ROW_SPACING)
+        return x.astype(np.float64), y.astype(np.float64)
+
+    def _radial_layout(self, nodes: List[Dict[str, Any]]) -> tuple:
+        """
+        Concentric rings by hierarchy level, evenly spaced starting at the top
+        """
+        levels = self._hierarchy_levels(nodes)
+        ring = np.where(np.isin(levels, list(RADIAL_RADII)), levels, 0)
+        radii = np.full(ring.max() + 1, RADIAL_DEFAULT_RADIUS, dtype=np.float64)
+        for level, radius in RADIAL_RADII.items():
+            if level < len(radii):
+                radii[level] = radius
+
+        rank, counts = self._rank_within_groups(ring)
+        angle = 2 * np.pi * rank / counts[ring] - np.pi / 2
+
+        x = RADIAL_CENTER + radii[ring] * np.cos(angle)
+        y = RADIAL_CENTER + radii[ring] * np.sin(angle)
+        return x, y
+
+    def _layered_layout(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> tuple:
+        """
+        Sugiyama-style layered layout: longest-path layer assignment along
+        relationship direction, then barycenter sweeps to order each layer
+        """
+        node_count = len(nodes)
+        graph = GraphIndex(nodes, edges)
+        not_loop = graph.src != graph.dst
+        src, dst = graph.src[not_loop], graph.dst[not_loop]
+
+        # Longest-path layering by relaxation. Cycles never converge, so the
+        # iteration count is capped and layers are compacted afterwards.
+        layer = np.zeros(node_count, dtype=np.int64)
+        for _ in range(min(node_count, 64)):
+            candidate = layer.copy()
+            np.maximum.at(candidate, dst, layer[src] + 1)
+            if np.array_equal(candidate, layer):
+                break
+            layer = candidate
+        layer = np.unique(layer, return_inverse=True)[1].reshape(-1)
+
+        # Barycenter ordering: each node moves towards the mean position of its neighbours
+        position, layer_size = self._rank_within_groups(layer)
+        position = position.astype(np.float64)
+        layer_start = np.cumsum(layer_size) - layer_size
+        all_src = np.concatenate([src, dst])
+        all_dst = np.concatenate([dst, src])
+        degree = np.bincount(all_dst, minlength=node_count)
+        for _ in range(LAYERED_ORDERING_SWEEPS):
+            neighbour_sum = np.bincount(all_dst, weights=position[all_src], minlength=node_count)
+            barycenter = np.where(degree > 0, neighbour_sum / np.maximum(degree, 1), position)
+            order = np.lexsort((barycenter, layer))
+            position = np.empty(node_count, dtype=np.float64)
+            position[order] = np.arange(node_count) - layer_start[layer[order]]
+
+        # Center each layer around the widest one
+        width = layer_size * LAYERED_NODE_WIDTH + (layer_size - 1) * LAYERED_NODESEP
+        max_width = width.max()
+        x = (LAYOUT_START_X + (max_width - width[layer]) / 2
+             + position * (LAYERED_NODE_WIDTH + LAYERED_NODESEP))
+        y = LAYOUT_START_Y + layer * (LAYERED_NODE_HEIGHT + LAYERED_RANKSEP)
+        return x.astype(np.float64), y.astype(np.float64)
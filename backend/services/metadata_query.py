@@ -0,0 +1,91 @@
+"""
+Query planning for Dataverse metadata requests: turns entity include rules
+into an OData $filter and trims each request to the columns its consumer reads.
+
+Metadata queries only support comparison and logical operators in $filter
+(no startswith), so prefix rules are pushed down as the closest superset the
+server can evaluate and the exact rules still run in Python afterwards.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+# Columns DynamicsService.format_entity reads
+ENTITY_SELECT = (
+    'LogicalName', 'SchemaName', 'DisplayName', 'PrimaryIdAttribute', 'PrimaryNameAttribute',
+    'EntitySetName', 'IsCustomEntity', 'IsActivity', 'Description',
+)
+
+# Columns DynamicsService.format_relationship reads, per relationship type. Derived-type
+# properties can only be selected through a type cast, so each type is its own request.
+RELATIONSHIP_SELECT: Dict[str, Tuple[str, ...]] = {
+    'OneToManyRelationshipMetadata': (
+        'SchemaName', 'ReferencedEntity', 'ReferencingEntity',
+        'ReferencedAttribute', 'ReferencingAttribute', 'CascadeConfiguration',
+    ),
+    'ManyToManyRelationshipMetadata': (
+        'SchemaName', 'Entity1LogicalName', 'Entity2LogicalName', 'IntersectEntityName',
+        'Entity1IntersectAttribute', 'Entity2IntersectAttribute',
+    ),
+}
+
+
+def odata_string(value: str) -> str:
+    """
+    OData string literal (single quotes doubled)
+    """
+    return "'" + value.replace("'", "''") + "'"
+
+
+class EntityQueryPlan:
+    """
+    $select / $filter for an EntityDefinitions request. The filter may match
+    more entities than the rules it came from, never fewer.
+    """
+
+    def __init__(self, select: Tuple[str, ...], odata_filter: Optional[str] = None):
+        self.select = select
+        self.odata_filter = odata_filter
+
+    @property
+    def query_string(self) -> str:
+        query = f"$select={','.join(self.select)}"
+        if self.odata_filter:
+            query += f"&$filter={self.odata_filter}"
+        return query
+
+    def __repr__(self) -> str:
+        return f"EntityQueryPlan({self.query_string})"
+
+
+def plan_entity_query(required_entities: Iterable[str], included_prefixes: Iterable[str],
+                      excluded_entities: Iterable[str] = ()) -> EntityQueryPlan:
+    """
+    Build the EntityDefinitions query for a set of include rules
+
+    - Required entities become LogicalName eq clauses
+    - Prefix rules become IsCustomEntity eq true: every publisher-prefixed
+      entity is custom, so this is a superset the server can evaluate
+    - Exclusions that could otherwise match become LogicalName ne clauses
+
+    :param required_entities: Logical names always included
+    :param included_prefixes: Publisher prefixes whose entities are included, e.g. 'qrt_'
+    :param excluded_entities: Logical names never included
+    :return: EntityQueryPlan
+    """
+    required = sorted({name.lower() for name in required_entities})
+    prefixes = tuple(sorted({prefix.lower() for prefix in included_prefixes}))
+
+    include_terms = ['IsCustomEntity eq true'] if prefixes else []
+    include_terms += [f"LogicalName eq {odata_string(name)}" for name in required]
+    if not include_terms:
+        return EntityQueryPlan(ENTITY_SELECT)
+
+    # Only exclusions inside the included set change the result
+    exclusions = sorted(
+        name for name in {n.lower() for n in excluded_entities}
+        if (prefixes and name.startswith(prefixes)) or name in required
+    )
+
+    odata_filter = include_terms[0] if len(include_terms) == 1 else f"({' or '.join(include_terms)})"
+    for name in exclusions:
+        odata_filter += f" and LogicalName ne {odata_string(name)}"
+    return EntityQueryPlan(ENTITY_SELECT, odata_filter)
@@ -0,0 +1,171 @@
+"""
+Shortest-path queries between entities over a cached adjacency index
+"""
+import heapq
+from typing import List, Dict, Any, Optional, Iterable
+
+RELATIONSHIP_TYPES = ('OneToMany', 'ManyToMany')
+
+
+class PathIndex:
+    """
+    Undirected entity adjacency for path finding.
+
+    Parallel relationships between the same pair collapse into one hop; the
+    relationships behind each hop are kept in pair_edges so a path can be
+    expanded into the full chain of relationships.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], types: Iterable[str] = None):
+        self.types = tuple(sorted(types)) if types else RELATIONSHIP_TYPES
+        self.edges = edges
+        self.ids = [n['id'] for n in nodes]
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+
+        neighbour_sets = [set() for _ in self.ids]
+        self.pair_edges: Dict[tuple, List[int]] = {}
+        for position, edge in enumerate(edges):
+            if edge['type'] not in self.types:
+                continue
+            a = self.index.get(edge['sourceEntity'])
+            b = self.index.get(edge['targetEntity'])
+            if a is None or b is None or a == b:
+                continue
+            neighbour_sets[a].add(b)
+            neighbour_sets[b].add(a)
+            self.pair_edges.setdefault((min(a, b), max(a, b)), []).append(position)
+
+        self.neighbours = [sorted(s) for s in neighbour_sets]
+
+    def shortest_path(self, source: int, target: int, max_hops: int,
+                      blocked_nodes: frozenset = frozenset(), blocked_pairs: frozenset = frozenset()) -> Optional[List[int]]:
+        """
+        Bidirectional BFS: grows the smaller frontier one full level at a time
+        and stops at the first level where the two searches meet
+
+        :param source: Source node index
+        :param target: Target node index
+        :param max_hops: Longest path to consider
+        :param blocked_nodes: Node indexes the path may not visit
+        :param blocked_pairs: (min, max) node pairs the path may not use
+        :return: Node indexes from source to target, or None
+        """
+        if source == target:
+            return [source]
+
+        parents = ({source: None}, {target: None})
+        distances = ({source: 0}, {target: 0})
+        frontiers = ([source], [target])
+        depths = [0, 0]
+
+        while frontiers[0] and frontiers[1] and depths[0] + depths[1] < max_hops:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            own, other_distance = parents[side], distances[1 - side]
+            next_frontier = []
+            best = None
+
+            for node in frontiers[side]:
+                for neighbour in self.neighbours[node]:
+                    if neighbour in own or neighbour in blocked_nodes:
+                        continue
+                    if (min(node, neighbour), max(node, neighbour)) in blocked_pairs:
+                        continue
+                    own[neighbour] = node
+                    distances[side][neighbour] = depths[side] + 1
+                    next_frontier.append(neighbour)
+                    # Several meeting points can appear in one level; keep the closest to the other end
+                    if neighbour in other_distance and (best is None or other_distance[neighbour] < other_distance[best]):
+                        best = neighbour
+
+            depths[side] += 1
+            if best is not None:
+                return self._join(parents, best)
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+
+        return None
+
+    @staticmethod
+    def _join(parents: tuple, meeting: int) -> List[int]:
+        forward, backward = parents
+        path = []
+        node = meeting
+        while node is not None:
+            path.append(node)
+            node = forward[node]
+        path.reverse()
+        node = backward[meeting]
+        while node is not None:
+            path.append(node)
+            node = backward[node]
+        return path
+
+    def k_shortest_paths(self, source: int, target: int, k: int, max_hops: int) -> List[List[int]]:
+        """
+        Up to k loopless paths in order of length (Yen's algorithm on top of shortest_path)
+
+        :return: List of paths, each a list of node indexes
+        """
+        first = self.shortest_path(source, target, max_hops)
+        if first is None:
+            return []
+
+        paths = [first]
+        seen = {tuple(first)}
+        candidates = []
+
+        while len(paths) < k:
+            previous = paths[-1]
+            for i in range(len(previous) - 1):
+                root = previous[:i + 1]
+                blocked_pairs = frozenset(
+                    (min(p[i], p[i + 1]), max(p[i], p[i + 1]))
+                    for p in paths if len(p) > i + 1 and p[:i + 1] == root
+                )
+                spur = self.shortest_path(
+                    previous[i], target, max_hops - i,
+                    blocked_nodes=frozenset(root[:-1]), blocked_pairs=blocked_pairs
+                )
+                if spur is None:
+                    continue
+                candidate = root[:-1] + spur
+                if tuple(candidate) not in seen:
+                    seen.add(tuple(candidate))
+                    heapq.heappush(candidates, (len(candidate), [self.ids[n] for n in candidate], candidate))
+
+            if not candidates:
+                break
+            paths.append(heapq.heappop(candidates)[2])
+
+        return paths
+
+    def describe_path(self, path: List[int]) -> Dict[str, Any]:
+        """
+        Expand a path of node indexes into entities and the relationships behind each hop
+        """
+        steps = []
+        for a, b in zip(path, path[1:]):
+            positions = self.pair_edges[(min(a, b), max(a, b))]
+            steps.append({
+                'from': self.ids[a],
+                'to': self.ids[b],
+                'relationships': [self.edges[p] for p in positions],
+            })
+        return {
+            'entities': [self.ids[n] for n in path],
+            'hops': len(path) - 1,
+            'steps': steps,
+        }
+
+    def find_paths(self, from_entity: str, to_entity: str, max_hops: int = 6, k: int = 1) -> List[Dict[str, Any]]:
+        """
+        Shortest path(s) between two entities by logical name
+
+        :raises KeyError: If either entity is not in the index
+        """
+        source, target = self.index[from_entity], self.index[to_entity]
+        if k <= 1:
+            path = self.shortest_path(source, target, max_hops)
+            paths = [path] if path is not None else []
+        else:
+            paths = self.k_shortest_paths(source, target, k, max_hops)
+        return [self.describe_path(p) for p in paths]
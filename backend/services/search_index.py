@@ -0,0 +1,183 @@
+"""
+Prefix / substring search index over entities in a graph view
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Dict, Any
+
+# How much a match in each field counts towards an entity's score
+FIELD_WEIGHTS = {
+    'logicalName': 10,
+    'label': 8,
+    'schemaName': 6,
+    'requiredFields': 2,
+    'description': 1,
+}
+
+# Multipliers for how well a query term matched a token
+EXACT_MATCH = 3
+PREFIX_MATCH = 2
+SUBSTRING_MATCH = 1
+
+# Bonus when the whole query equals the entity's logical name or label
+FULL_NAME_BONUS = 100
+
+QUERY_CACHE_SIZE = 1024
+
+_TOKEN_SPLIT = re.compile(r'[^0-9a-z]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens of a text. Underscored names are kept whole and also
+    split into parts, so 'qrt_permits' matches 'qrt_per' as well as 'permits'.
+
+    :param text: Text to tokenize
+    :return: List of tokens (may contain duplicates)
+    """
+    tokens = []
+    for word in text.lower().split():
+        parts = [p for p in _TOKEN_SPLIT.split(word) if p]
+        tokens.extend(parts)
+        whole = word.strip('.,;:()[]"\'')
+        if len(parts) > 1 and whole:
+            tokens.append(whole)
+    return tokens
+
+
+def trigrams(token: str) -> set:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """
+    Inverted index from tokens to entities.
+
+    Tokens are kept in a sorted array, so every token starting with a prefix is
+    one contiguous range found with two binary searches (a flattened trie).
+    A trigram index over the tokens handles substring matches.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.nodes = nodes
+        self._full_names = [
+            {(n.get('logicalName') or '').lower(), (n.get('label') or '').lower()} for n in nodes
+        ]
+
+        # token -> {doc: (best field weight, field name)}
+        postings: Dict[str, Dict[int, tuple]] = {}
+        for doc, node in enumerate(nodes):
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(self._field_text(node, field)):
+                    doc_postings = postings.setdefault(token, {})
+                    if doc not in doc_postings or doc_postings[doc][0] < weight:
+                        doc_postings[doc] = (weight, field)
+
+        self.tokens = sorted(postings)
+        self.postings = [postings[token] for token in self.tokens]
+
+        self.trigram_index: Dict[str, set] = {}
+        for token_id, token in enumerate(self.tokens):
+            for gram in trigrams(token):
+                self.trigram_index.setdefault(gram, set()).add(token_id)
+
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _field_text(node: Dict[str, Any], field: str) -> str:
+        if field == 'requiredFields':
+            return ' '.join(
+                f"{f.get('logicalName') or ''} {f.get('displayName') or ''}"
+                for f in node.get('requiredFields') or []
+            )
+        return node.get(field) or ''
+
+    def _matching_tokens(self, term: str) -> Dict[int, int]:
+        """
+        Token ids matching a query term, with the match multiplier
+
+        :return: Dictionary of token id -> EXACT_MATCH / PREFIX_MATCH / SUBSTRING_MATCH
+        """
+        matches = {}
+        lo = bisect_left(self.tokens, term)
+        hi = bisect_left(self.tokens, term + '\uffff', lo)
+        for token_id in range(lo, hi):
+            matches[token_id] = EXACT_MATCH if self.tokens[token_id] == term else PREFIX_MATCH
+
+        grams = trigrams(term)
+        if grams:
+            candidates = set.intersection(*(self.trigram_index.get(g, set()) for g in grams))
+            for token_id in candidates:
+                if token_id not in matches and term in self.tokens[token_id]:
+                    matches[token_id] = SUBSTRING_MATCH
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Rank entities against a query. Every query term must match (AND);
+        each term contributes its best field weight x match multiplier.
+
+        :param query: Free-text query, e.g. 'permit' or 'qrt_site control'
+        :param limit: Maximum number of results
+        :return: Top results as {node, score, matchedFields}, best first
+        """
+        key = (query.strip().lower(), limit)
+        # Searches run on threadpool threads; the cache is only touched under the lock
+        with self._cache_lock:
+            results = self._cache.get(key)
+            if results is not None:
+                self._cache.move_to_end(key)
+                return results
+
+        results = self._search(key[0], limit)
+
+        with self._cache_lock:
+            self._cache[key] = results
+            self._cache.move_to_end(key)
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return results
+
+    def _search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        scores: Dict[int, float] = {}
+        fields: Dict[int, set] = {}
+        for position, term in enumerate(terms):
+            term_scores: Dict[int, tuple] = {}
+            for token_id, multiplier in self._matching_tokens(term).items():
+                for doc, (weight, field) in self.postings[token_id].items():
+                    score = weight * multiplier
+                    if doc not in term_scores or term_scores[doc][0] < score:
+                        term_scores[doc] = (score, field)
+
+            if position == 0:
+                scores = {doc: score for doc, (score, _) in term_scores.items()}
+                fields = {doc: {field} for doc, (_, field) in term_scores.items()}
+            else:
+                scores = {doc: scores[doc] + term_scores[doc][0] for doc in scores if doc in term_scores}
+                for doc in scores:
+                    fields[doc].add(term_scores[doc][1])
+            if not scores:
+                return []
+
+        for doc in scores:
+            if query in self._full_names[doc]:
+                scores[doc] += FULL_NAME_BONUS
+
+        # Ties go to shorter logical names (closer matches), then alphabetical
+        top = heapq.nsmallest(
+            limit,
+            scores.items(),
+            key=lambda item: (-item[1], len(self.nodes[item[0]].get('logicalName') or ''), self.nodes[item[0]]['id'])
+        )
+        return [
+            {'node': self.nodes[doc], 'score': score, 'matchedFields': sorted(fields[doc])}
+            for doc, score in top
+        ]
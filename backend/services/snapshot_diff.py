@@ -0,0 +1,173 @@
+"""
+Versioned snapshot history and diffs between metadata crawls.
+
+Every record (entity or relationship) is fingerprinted when a snapshot is
+built, so comparing two versions is a dictionary walk over short hashes; only
+records whose hash changed are compared field by field. Only crawled metadata
+is compared: fields set by snapshot stages (graph_records.STAGE_FIELDS) are
+left out of the hashes and patches.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from .graph_records import STAGE_FIELDS, json_default
+
+# How many past snapshot versions can be diffed against
+SNAPSHOT_HISTORY_SIZE = int(os.environ.get('SNAPSHOT_HISTORY_SIZE', '10'))
+
+
+def fingerprint(record: Dict[str, Any]) -> str:
+    """
+    Stable hash of a record's crawled content (key order and STAGE_FIELDS do not matter)
+    """
+    crawled = {key: value for key, value in record.items() if key not in STAGE_FIELDS}
+    payload = json.dumps(crawled, sort_keys=True, separators=(',', ':'), default=json_default)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class VersionRecord:
+    """
+    What is kept of one snapshot version: a hash and a copy of each node and
+    edge, keyed by id. The copies keep the stage annotations, so records
+    reported as added are complete; the hashes cover crawled fields only.
+    """
+
+    __slots__ = ('version', 'created_at', 'nodes', 'edges', 'node_hashes', 'edge_hashes')
+
+    def __init__(self, version: int, created_at: float, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]):
+        self.version = version
+        self.created_at = created_at
+        # Shallow copies, so the hashes keep describing the records as recorded
+        self.nodes = {n['id']: n.copy() for n in nodes}
+        self.edges = {e['id']: e.copy() for e in edges}
+        self.node_hashes = {node_id: fingerprint(n) for node_id, n in self.nodes.items()}
+        self.edge_hashes = {edge_id: fingerprint(e) for edge_id, e in self.edges.items()}
+
+
+def _field_changes(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Changed crawled fields of a modified record as a patch: 'set' holds new values, 'unset' removed keys
+    """
+    return {
+        'set': {key: value for key, value in new.items()
+                if key not in STAGE_FIELDS and (key not in old or old[key] != value)},
+        'unset': sorted(key for key in old if key not in new and key not in STAGE_FIELDS),
+    }
+
+
+def _diff_records(old_records: Dict[str, Dict[str, Any]], old_hashes: Dict[str, str],
+                  new_records: Dict[str, Dict[str, Any]], new_hashes: Dict[str, str]) -> Dict[str, Any]:
+    added = [new_records[key] for key in new_hashes if key not in old_hashes]
+    removed = [key for key in old_hashes if key not in new_hashes]
+    modified = [
+        {'id': key, **_field_changes(old_records[key], new_records[key])}
+        for key, digest in new_hashes.items()
+        if key in old_hashes and old_hashes[key] != digest
+    ]
+    return {'added': added, 'removed': removed, 'modified': modified}
+
+
+def summarize_changes(nodes: Dict[str, Any], edges: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Record counts per kind of change
+    """
+    return {
+        'nodesAdded': len(nodes['added']),
+        'nodesRemoved': len(nodes['removed']),
+        'nodesModified': len(nodes['modified']),
+        'edgesAdded': len(edges['added']),
+        'edgesRemoved': len(edges['removed']),
+        'edgesModified': len(edges['modified']),
+    }
+
+
+def diff_versions(old: VersionRecord, new: VersionRecord) -> Dict[str, Any]:
+    """
+    Compare two snapshot versions
+
+    :return: Change-log with added records, removed ids and field patches for
+             modified records, for nodes and edges, plus per-entity required field changes
+    """
+    nodes = _diff_records(old.nodes, old.node_hashes, new.nodes, new.node_hashes)
+    edges = _diff_records(old.edges, old.edge_hashes, new.edges, new.edge_hashes)
+
+    required_fields = []
+    for change in nodes['modified']:
+        if 'requiredFields' not in change['set']:
+            continue
+        before = {f['logicalName']: f for f in old.nodes[change['id']].get('requiredFields') or []}
+        after = {f['logicalName']: f for f in new.nodes[change['id']].get('requiredFields') or []}
+        required_fields.append({
+            'entity': change['id'],
+            'added': [after[name] for name in sorted(after.keys() - before.keys())],
+            'removed': [before[name] for name in sorted(before.keys() - after.keys())],
+        })
+
+    return {
+        'since': old.version,
+        'version': new.version,
+        'nodes': nodes,
+        'edges': edges,
+        'requiredFields': required_fields,
+        'summary': summarize_changes(nodes, edges),
+    }
+
+
+class SnapshotHistory:
+    """
+    The last few snapshot versions, oldest first, and the diffs between them
+    """
+
+    def __init__(self, max_versions: int = SNAPSHOT_HISTORY_SIZE):
+        self.max_versions = max_versions
+        self._versions: "OrderedDict[int, VersionRecord]" = OrderedDict()
+        self._diffs: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, version: int, created_at: float, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]]) -> None:
+        """
+        Add a snapshot version, dropping the oldest one beyond max_versions.
+        Called after the snapshot stages, so the kept copies carry their annotations.
+        """
+        entry = VersionRecord(version, created_at, nodes, edges)
+        with self._lock:
+            self._versions[version] = entry
+            while len(self._versions) > self.max_versions:
+                dropped, _ = self._versions.popitem(last=False)
+                self._diffs = {key: value for key, value in self._diffs.items() if dropped not in key}
+
+    def get(self, version: int) -> Optional[VersionRecord]:
+        """
+        A held version, or None
+        """
+        with self._lock:
+            return self._versions.get(version)
+
+    @property
+    def versions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{'version': v.version, 'createdAt': v.created_at} for v in self._versions.values()]
+
+    def diff(self, since: int, version: int) -> Optional[Dict[str, Any]]:
+        """
+        Change-log from one version to another (cached per pair)
+
+        :param since: Version the client has
+        :param version: Version to diff to
+        :return: Change-log, or None if either version is no longer held
+        """
+        key = (since, version)
+        with self._lock:
+            if key in self._diffs:
+                return self._diffs[key]
+            old, new = self._versions.get(since), self._versions.get(version)
+        if old is None or new is None:
+            return None
+
+        changes = diff_versions(old, new)
+        with self._lock:
+            return self._diffs.setdefault(key, changes)
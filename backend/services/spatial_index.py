@@ -0,0 +1,250 @@
+"""
+Spatial index over laid-out graph views for viewport-windowed queries
+"""
+import math
+from typing import List, Dict, Any
+
+import numpy as np
+
+from .graph_index import GraphIndex
+from .layout_service import HIERARCHY_NODE_WIDTH, HIERARCHY_NODE_HEIGHT
+
+# Positions are top-left corners (React Flow convention); nodes are treated as
+# boxes of this size when testing them against the viewport
+NODE_BOX_WIDTH = HIERARCHY_NODE_WIDTH
+NODE_BOX_HEIGHT = HIERARCHY_NODE_HEIGHT
+
+# Zoom thresholds for level of detail (React Flow zoom: 1.0 = 100%)
+ZOOM_MINIMAL = 0.3
+ZOOM_SUMMARY = 0.6
+
+# Node/edge fields returned at each detail level (None = the full record)
+DETAIL_FIELDS = {
+    'minimal': {
+        'node': ('id', 'label', 'hierarchyLevel'),
+        'edge': ('id', 'sourceEntity', 'targetEntity'),
+    },
+    'summary': {
+        'node': ('id', 'label', 'logicalName', 'hierarchyLevel', 'isCustomEntity', 'isActivity'),
+        'edge': ('id', 'schemaName', 'type', 'sourceEntity', 'targetEntity'),
+    },
+    'full': {
+        'node': None,
+        'edge': None,
+    },
+}
+
+
+def _cell_slices(order: np.ndarray, sorted_keys: np.ndarray, rows: int, first_column: int, last_column: int,
+                 first_row: int, last_row: int) -> List[np.ndarray]:
+    """
+    Items of a column-major grid (items sorted by cell key) in a range of cells:
+    one searchsorted per grid column
+    """
+    slices = []
+    for column in range(first_column, last_column + 1):
+        lo, hi = np.searchsorted(sorted_keys, (column * rows + first_row, column * rows + last_row + 1))
+        if hi > lo:
+            slices.append(order[lo:hi])
+    return slices
+
+
+def get_detail_level(zoom: float) -> str:
+    """
+    Map a client zoom factor to a detail level
+
+    :param zoom: React Flow zoom factor
+    :return: 'minimal', 'summary' or 'full'
+    """
+    if zoom < ZOOM_MINIMAL:
+        return 'minimal'
+    if zoom < ZOOM_SUMMARY:
+        return 'summary'
+    return 'full'
+
+
+class SpatialIndex:
+    """
+    Uniform grid over node positions of one laid-out view.
+
+    Nodes are bucketed by grid cell and sorted by cell key (column-major), so
+    each visible grid column is one contiguous slice found with searchsorted.
+    Edges are bucketed the same way on grids of doubling cell size (see
+    _build_edge_grids), so only edges near the viewport are tested against it.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]],
+                 positions: Dict[str, Dict[str, float]]):
+        self.nodes = nodes
+        self.edges = edges
+        self.graph = GraphIndex(nodes, edges)
+
+        node_count = len(nodes)
+        self.x = np.fromiter((positions[n['id']]['x'] for n in nodes), dtype=np.float64, count=node_count)
+        self.y = np.fromiter((positions[n['id']]['y'] for n in nodes), dtype=np.float64, count=node_count)
+
+        # Edges are drawn between node centers
+        center_x = self.x + NODE_BOX_WIDTH / 2
+        center_y = self.y + NODE_BOX_HEIGHT / 2
+        self.edge_x0, self.edge_y0 = center_x[self.graph.src], center_y[self.graph.src]
+        self.edge_x1, self.edge_y1 = center_x[self.graph.dst], center_y[self.graph.dst]
+
+        self._build_grid()
+        self._build_edge_grids()
+
+    def _build_grid(self) -> None:
+        """
+        Bucket nodes into square cells sized for a handful of nodes per cell
+        """
+        node_count = len(self.nodes)
+        if node_count == 0:
+            self.min_x = self.min_y = 0.0
+            self.cell_size = 1.0
+            self.rows = 1
+            self.order = np.empty(0, dtype=np.int64)
+            self.sorted_keys = np.empty(0, dtype=np.int64)
+            return
+
+        self.min_x, self.min_y = float(self.x.min()), float(self.y.min())
+        width = max(float(self.x.max()) - self.min_x, 1.0)
+        height = max(float(self.y.max()) - self.min_y, 1.0)
+        self.cell_size = max(math.sqrt(width * height / node_count) * 2, NODE_BOX_WIDTH)
+        self.rows = int(height // self.cell_size) + 1
+
+        cell_keys = self._cell_column(self.x) * self.rows + self._cell_row(self.y)
+        self.order = np.argsort(cell_keys, kind='stable')
+        self.sorted_keys = cell_keys[self.order]
+
+    def _build_edge_grids(self) -> None:
+        """
+        Bucket edge segments by bounding box. An edge goes to the finest grid
+        (cell size cell_size * 2**level) whose cells are at least as large as
+        its box, keyed by the cell of the box's top-left corner. An edge whose
+        box overlaps the viewport then has its corner in the viewport widened
+        by one cell up and left, so each level is searched like the node grid,
+        and long edges sit on coarse levels instead of in many cells.
+        """
+        ex0, ey0, ex1, ey1 = self.edge_x0, self.edge_y0, self.edge_x1, self.edge_y1
+        self.edge_left, self.edge_top = np.minimum(ex0, ex1), np.minimum(ey0, ey1)
+        self.edge_grids = []
+        if len(ex0) == 0:
+            return
+
+        extent = np.maximum(np.abs(ex1 - ex0), np.abs(ey1 - ey0))
+        levels = np.ceil(np.log2(np.maximum(extent / self.cell_size, 1.0))).astype(np.int64)
+        levels += self.cell_size * 2.0 ** levels < extent  # Rounding in log2 must not leave a box larger than its cells
+        bottom = float(self.edge_top.max())
+        for level in np.unique(levels).tolist():
+            members = np.flatnonzero(levels == level)
+            size = self.cell_size * 2.0 ** level
+            rows = int((bottom - self.min_y) // size) + 1
+            keys = (np.floor_divide(self.edge_left[members] - self.min_x, size).astype(np.int64) * rows
+                    + np.floor_divide(self.edge_top[members] - self.min_y, size).astype(np.int64))
+            order = np.argsort(keys, kind='stable')
+            self.edge_grids.append((size, rows, members[order], keys[order]))
+
+    def _cell_column(self, x):
+        return np.floor_divide(np.asarray(x) - self.min_x, self.cell_size).astype(np.int64)
+
+    def _cell_row(self, y):
+        return np.clip(np.floor_divide(np.asarray(y) - self.min_y, self.cell_size).astype(np.int64), 0, self.rows - 1)
+
+    def query_nodes(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        Indexes of nodes whose box overlaps the viewport
+
+        :return: Node indexes (ascending)
+        """
+        if len(self.order) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # A node's box starts at its position, so widen the search window by one box
+        first_column = int(self._cell_column(x0 - NODE_BOX_WIDTH))
+        last_column = int(self._cell_column(x1))
+        first_row = int(self._cell_row(y0 - NODE_BOX_HEIGHT))
+        last_row = int(self._cell_row(y1))
+        max_column = int(self.sorted_keys[-1] // self.rows)
+        first_column, last_column = max(first_column, 0), min(last_column, max_column)
+
+        slices = _cell_slices(self.order, self.sorted_keys, self.rows, first_column, last_column, first_row, last_row)
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate(slices)
+        cx, cy = self.x[candidates], self.y[candidates]
+        visible = (cx <= x1) & (cx + NODE_BOX_WIDTH >= x0) & (cy <= y1) & (cy + NODE_BOX_HEIGHT >= y0)
+        return np.sort(candidates[visible])
+
+    def query_edges(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        Indexes (into the indexed edge arrays) of edge segments crossing the viewport
+
+        :return: Edge indexes (ascending)
+        """
+        slices = []
+        for size, rows, order, sorted_keys in self.edge_grids:
+            if len(order) == 0:
+                continue
+            first_column = max(int((x0 - size - self.min_x) // size), 0)
+            last_column = min(int((x1 - self.min_x) // size), int(sorted_keys[-1] // rows))
+            first_row = min(max(int((y0 - size - self.min_y) // size), 0), rows - 1)
+            last_row = min(max(int((y1 - self.min_y) // size), 0), rows - 1)
+            slices.extend(_cell_slices(order, sorted_keys, rows, first_column, last_column, first_row, last_row))
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate(slices)
+        ex0, ey0 = self.edge_x0[candidates], self.edge_y0[candidates]
+        ex1, ey1 = self.edge_x1[candidates], self.edge_y1[candidates]
+
+        # Bounding boxes must overlap...
+        candidate = (
+            (np.minimum(ex0, ex1) <= x1) & (np.maximum(ex0, ex1) >= x0)
+            & (np.minimum(ey0, ey1) <= y1) & (np.maximum(ey0, ey1) >= y0)
+        )
+        # ...and the viewport corners must not all lie on the same side of the segment
+        dx, dy = ex1 - ex0, ey1 - ey0
+        sides = np.stack([
+            dx * (cy - ey0) - dy * (cx - ex0)
+            for cx, cy in ((x0, y0), (x1, y0), (x0, y1), (x1, y1))
+        ])
+        straddles = (sides.min(axis=0) <= 0) & (sides.max(axis=0) >= 0)
+        return np.sort(candidates[candidate & straddles])
+
+    def query(self, x0: float, y0: float, x1: float, y1: float, zoom: float = 1.0) -> Dict[str, Any]:
+        """
+        Nodes and edges intersecting the viewport, trimmed to the zoom's detail level
+
+        :param x0: Left edge of the viewport (flow coordinates)
+        :param y0: Top edge of the viewport
+        :param x1: Right edge of the viewport
+        :param y1: Bottom edge of the viewport
+        :param zoom: Client zoom factor, used to pick the detail level
+        :return: Dictionary with nodes, edges, positions and detail level
+        """
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        detail = get_detail_level(zoom)
+        node_fields = DETAIL_FIELDS[detail]['node']
+        edge_fields = DETAIL_FIELDS[detail]['edge']
+
+        node_indexes = self.query_nodes(x0, y0, x1, y1).tolist()
+        edge_indexes = self.query_edges(x0, y0, x1, y1)
+        edge_positions = self.graph.edge_positions[edge_indexes].tolist()
+
+        nodes = [self.nodes[i] for i in node_indexes]
+        edges = [self.edges[p] for p in edge_positions]
+        if node_fields is not None:
+            nodes = [{field: n.get(field) for field in node_fields} for n in nodes]
+        if edge_fields is not None:
+            edges = [{field: e.get(field) for field in edge_fields} for e in edges]
+
+        return {
+            'nodes': nodes,
+            'edges': edges,
+            'positions': {
+                self.graph.ids[i]: {'x': float(self.x[i]), 'y': float(self.y[i])}
+                for i in node_indexes
+            },
+            'detail': detail,
+        }
@@ -0,0 +1,51 @@
+"""
+Interned string table for compact columnar storage
+"""
+from typing import List, Dict, Optional
+
+# Id stored in integer columns for a missing (None) string
+NO_STRING = -1
+
+
+class StringTable:
+    """
+    Maps each distinct string to a small integer id, so columns can store
+    int32 ids instead of repeating the same Python strings per row
+    """
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def intern(self, value: Optional[str]) -> int:
+        """
+        Return the id of a string, adding it to the table if new
+
+        :param value: String to intern (None maps to NO_STRING)
+        :return: Integer id
+        """
+        if value is None:
+            return NO_STRING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self._ids[value] = string_id
+        return string_id
+
+    def lookup(self, value: str) -> int:
+        """
+        Return the id of a string without adding it
+
+        :return: Integer id, or NO_STRING if the string is not in the table
+        """
+        return self._ids.get(value, NO_STRING)
+
+    def get(self, string_id: int) -> Optional[str]:
+        """
+        Return the string for an id (None for NO_STRING)
+        """
+        return None if string_id == NO_STRING else self.strings[string_id]
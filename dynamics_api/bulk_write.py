@@ -0,0 +1,267 @@
+"""
+Bulk writes: records chunked into CreateMultiple / UpdateMultiple / UpsertMultiple
+requests or $batch changesets, written concurrently under a shared rate limiter
+
+Each chunk is one request and is applied atomically by the server: a single
+invalid record fails the whole chunk. A chunk rejected with a client error is
+split in halves until the failing records are isolated, so every other record
+is still written and each record gets its own result. Throttled requests
+(429/503) are retried after Retry-After, pausing every worker that shares the
+limiter.
+"""
+import json
+import logging
+import re
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .partitioned_scan import THROTTLED_STATUS, RateLimiter
+
+# Operation -> (bound action for method='multiple', status of a written record)
+OPERATIONS = {
+    'create': ('CreateMultiple', 'created'),
+    'update': ('UpdateMultiple', 'updated'),
+    'upsert': ('UpsertMultiple', 'upserted'),
+}
+
+METHODS = ('multiple', 'batch')
+
+# Client errors that are not caused by the records themselves, so splitting the chunk does not help
+NOT_SPLIT_STATUS = (401, 403) + THROTTLED_STATUS
+
+GUID = re.compile(r'\(([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})\)')
+
+logger = logging.getLogger(__name__)
+
+
+class WriteResult(NamedTuple):
+    """
+    Outcome of writing one record: index is its position in the input, status one of
+    created / updated / upserted / failed, error the server's message for failed records
+    """
+    index: int
+    id: Optional[str]
+    status: str
+    error: Optional[str] = None
+
+
+class ChunkError(Exception):
+    """
+    A chunk the server rejected as a whole
+    """
+
+    def __init__(self, status_code: int, message: str, retry_after: float = None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+
+
+def _chunks(records: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    chunk = []
+    for item in enumerate(records):
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _error_message(text: str) -> str:
+    try:
+        return json.loads(text)['error']['message']
+    except (ValueError, KeyError, TypeError):
+        return text.strip()
+
+
+def parse_batch_response(text: str) -> List[Dict[str, Any]]:
+    """
+    Splits a $batch response into its operation responses
+
+    :param text: multipart/mixed response body
+    :return: List of {'content_id', 'status', 'headers', 'body'} in response order
+    """
+    parts = []
+    for segment in re.split(r'^--\S+\r?$', text, flags=re.MULTILINE):
+        status_line = re.search(r'^HTTP/1\.1 (\d{3}).*$', segment, flags=re.MULTILINE)
+        if not status_line:
+            continue
+        content_id = re.search(r'^Content-ID:\s*(\S+)', segment[:status_line.start()], flags=re.MULTILINE | re.IGNORECASE)
+        header_block, body = (re.split(r'\r?\n\r?\n', segment[status_line.end():].lstrip('\r\n'), maxsplit=1) + [''])[:2]
+        headers = {}
+        for line in header_block.splitlines():
+            name, separator, value = line.partition(':')
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+        parts.append({
+            'content_id': content_id.group(1) if content_id else None,
+            'status': int(status_line.group(1)),
+            'headers': headers,
+            'body': body.strip(),
+        })
+    return parts
+
+
+class BulkWriter:
+    """
+    Writes records to one table in chunks, each chunk one request
+    """
+
+    def __init__(self, dynamics_api, base_url: str, table_name: str, logical_name: str, primary_key: str,
+                 operation: str = 'create', method: str = 'multiple', limiter: RateLimiter = None,
+                 max_retries: int = 5):
+        """
+        :param dynamics_api: DynamicsAPI used to send the requests
+        :param base_url: Web API root, e.g. https://org.crm.dynamics.com/api/data/v9.2
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param logical_name: The entity logical name of the table (for @odata.type)
+        :param primary_key: The primary id attribute of the table
+        :param operation: 'create', 'update' or 'upsert'
+        :param method: 'multiple' (CreateMultiple / UpdateMultiple / UpsertMultiple) or 'batch' ($batch changesets)
+        :param limiter: Rate limiter shared by the workers (default: DEFAULT_REQUESTS_PER_SECOND)
+        :param max_retries: Retries for throttled requests
+        :raises ValueError: If the operation or method is unknown
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation} (expected one of {', '.join(OPERATIONS)})")
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method} (expected one of {', '.join(METHODS)})")
+        self.dynamics_api = dynamics_api
+        self.base_url = base_url
+        self.table_name = table_name
+        self.logical_name = logical_name
+        self.primary_key = primary_key
+        self.operation = operation
+        self.method = method
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.action, self.written_status = OPERATIONS[operation]
+
+    def write(self, records: Iterable[Dict[str, Any]], chunk_size: int = 200, max_workers: int = 4) -> List[WriteResult]:
+        """
+        Write records concurrently, max_workers chunks in flight at a time. Records are
+        consumed lazily, so a generator of any size can be written.
+
+        :param records: Dictionaries of column values (lookups as name@odata.bind)
+        :param chunk_size: Records per request
+        :param max_workers: Chunks written at the same time
+        :return: One WriteResult per record, in input order
+        """
+        results = []
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dynamics-write') as executor:
+            for chunk in _chunks(records, chunk_size):
+                if len(in_flight) >= max_workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results.extend(future.result())
+                in_flight.add(executor.submit(self._write_chunk, chunk))
+            for future in in_flight:
+                results.extend(future.result())
+
+        results.sort(key=lambda result: result.index)
+        failed = sum(1 for result in results if result.status == 'failed')
+        logger.info(f"Wrote {len(results) - failed} of {len(results)} {self.table_name} records "
+                    f"({self.operation} via {self.method}), {failed} failed")
+        return results
+
+    def _write_chunk(self, chunk: List[Tuple[int, Dict[str, Any]]], retries: int = 0) -> List[WriteResult]:
+        """
+        Write one chunk, splitting it on client errors until the failing records are isolated
+        """
+        invalid = []
+        if self.operation == 'update' or (self.operation == 'upsert' and self.method == 'batch'):
+            invalid = [(index, record) for index, record in chunk if not record.get(self.primary_key)]
+            chunk = [(index, record) for index, record in chunk if record.get(self.primary_key)]
+        results = [WriteResult(index, None, 'failed', f"Missing primary key {self.primary_key}")
+                   for index, _ in invalid]
+        if not chunk:
+            return results
+
+        try:
+            ids = self._send_chunk([record for _, record in chunk])
+        except ChunkError as e:
+            if e.retry_after is not None and retries < self.max_retries:
+                # Throttled inside the batch, which send cannot see: pause everyone and retry
+                logger.warning(f"Changeset throttled (HTTP {e.status_code}), retrying in {e.retry_after:g}s")
+                self.limiter.pause(e.retry_after)
+                return results + self._write_chunk(chunk, retries + 1)
+            if 400 <= e.status_code < 500 and e.status_code not in NOT_SPLIT_STATUS and len(chunk) > 1:
+                middle = len(chunk) // 2
+                return results + self._write_chunk(chunk[:middle]) + self._write_chunk(chunk[middle:])
+            return results + [WriteResult(index, record.get(self.primary_key), 'failed', e.message)
+                              for index, record in chunk]
+        except Exception as e:  # Connection errors and the like: the chunk's records are reported, not lost
+            logger.error(f"Writing {len(chunk)} {self.table_name} records failed: {e}")
+            return results + [WriteResult(index, record.get(self.primary_key), 'failed', str(e))
+                              for index, record in chunk]
+
+        return results + [WriteResult(index, record_id or record.get(self.primary_key), self.written_status)
+                          for (index, record), record_id in zip(chunk, ids)]
+
+    def _send_chunk(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        One request for the records
+
+        :return: The id of each record (None where the server returned none)
+        :raises ChunkError: If the server rejected the chunk
+        """
+        if self.method == 'multiple':
+            return self._send_multiple(records)
+        return self._send_batch(records)
+
+    def _send_multiple(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        url = f"{self.base_url}/{self.table_name}/Microsoft.Dynamics.CRM.{self.action}"
+        targets = [{'@odata.type': f'Microsoft.Dynamics.CRM.{self.logical_name}', **record} for record in records]
+        response = self.dynamics_api.send(
+            'POST', url, limiter=self.limiter, max_retries=self.max_retries,
+            headers=self.dynamics_api.headers, data=json.dumps({'Targets': targets})
+        )
+        if response.status_code >= 400:
+            raise ChunkError(response.status_code, _error_message(response.text))
+
+        ids = json.loads(response.content.decode('utf-8')).get('Ids', []) if response.content else []
+        return ids if len(ids) == len(records) else [None] * len(records)
+
+    def _send_batch(self, records: List[Dict[str, Any]]) -> List[Optional[str]]:
+        batch, changeset = f'batch_{uuid.uuid4()}', f'changeset_{uuid.uuid4()}'
+        lines = [f'--{batch}', f'Content-Type: multipart/mixed; boundary={changeset}', '']
+        for content_id, record in enumerate(records, start=1):
+            if self.operation == 'create':
+                request_line, body, headers = f'POST {self.base_url}/{self.table_name} HTTP/1.1', record, []
+            else:
+                body = {name: value for name, value in record.items() if name != self.primary_key}
+                request_line = f'PATCH {self.base_url}/{self.table_name}({record[self.primary_key]}) HTTP/1.1'
+                # If-Match: * makes a PATCH update-only; without it a PATCH is an upsert
+                headers = ['If-Match: *'] if self.operation == 'update' else []
+            lines += [f'--{changeset}', 'Content-Type: application/http', 'Content-Transfer-Encoding: binary',
+                      f'Content-ID: {content_id}', '', request_line, 'Content-Type: application/json; type=entry',
+                      *headers, '', json.dumps(body)]
+        lines += [f'--{changeset}--', f'--{batch}--', '']
+
+        response = self.dynamics_api.send(
+            'POST', f"{self.base_url}/$batch", limiter=self.limiter, max_retries=self.max_retries,
+            headers={**self.dynamics_api.headers, 'Content-Type': f'multipart/mixed; boundary={batch}'},
+            data='\r\n'.join(lines).encode('utf-8')
+        )
+        if response.status_code >= 400:
+            raise ChunkError(response.status_code, _error_message(response.text))
+
+        # A failed changeset is answered by the failing operation's response alone
+        parts = parse_batch_response(response.text)
+        for part in parts:
+            if part['status'] >= 400:
+                retry_after = None
+                if part['status'] in THROTTLED_STATUS:
+                    try:
+                        retry_after = float(part['headers'].get('retry-after'))
+                    except (TypeError, ValueError):
+                        retry_after = 1.0
+                raise ChunkError(part['status'], _error_message(part['body']), retry_after)
+        ids = {}
+        for part in parts:
+            entity_id = GUID.search(part['headers'].get('odata-entityid', ''))
+            ids[part['content_id']] = entity_id.group(1) if entity_id else None
+        return [ids.get(str(content_id)) for content_id in range(1, len(records) + 1)]
@@ -1,21 +1,53 @@
 import json
 import requests
-import msal
-import pandas as pd
-from typing import List
+from typing import List, TYPE_CHECKING
 from .utils import create_attribute_payload
+from .record_columns import ATTRIBUTE_SELECT, DECIMAL_LIMITS, EXACT_NUMBERS_ACCEPT, pages_to_table, record_schema
+from .partitioned_scan import THROTTLED_STATUS, Partition, RateLimiter, ordered_scan, time_partitions
+from .bulk_write import BulkWriter, WriteResult
 import os
 import logging
+import threading
 from pathlib import Path
-from dotenv import load_dotenv
 from datetime import datetime, timedelta
-dotenv_path = Path('.env').resolve()
-load_dotenv(dotenv_path=dotenv_path)
+
+# pandas and msal are slow to import and only needed by retrieve_records / token
+# acquisition, so they are imported on first use
+if TYPE_CHECKING:
+    import msal
+    import pandas as pd
+    import pyarrow as pa
+
+# Connection settings, read from the environment and .env by load_settings()
 DYNAMICS_AUTHORITY = os.environ.get('DYNAMICS_AUTHORITY')
 DYNAMICS_CLIENT_ID = os.environ.get('DYNAMICS_CLIENT_ID')
 DYNAMICS_CLIENT_SECRET = os.environ.get('DYNAMICS_CLIENT_SECRET')
 DYNAMICS_RESOURCE_URL = os.environ.get('DYNAMICS_RESOURCE_URL')
 DYNAMICS_SCOPES = os.environ.get('DYNAMICS_SCOPES')
+_settings_loaded = False
+
+
+def load_settings() -> None:
+    """
+    Loads .env from the working directory (once) and refreshes the connection settings.
+    Called when the first DynamicsAPI is created rather than at import.
+    """
+    global DYNAMICS_AUTHORITY, DYNAMICS_CLIENT_ID, DYNAMICS_CLIENT_SECRET, DYNAMICS_RESOURCE_URL, DYNAMICS_SCOPES
+    global _settings_loaded
+    if _settings_loaded:
+        return
+
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=Path('.env').resolve())
+    DYNAMICS_AUTHORITY = os.environ.get('DYNAMICS_AUTHORITY')
+    DYNAMICS_CLIENT_ID = os.environ.get('DYNAMICS_CLIENT_ID')
+    DYNAMICS_CLIENT_SECRET = os.environ.get('DYNAMICS_CLIENT_SECRET')
+    DYNAMICS_RESOURCE_URL = os.environ.get('DYNAMICS_RESOURCE_URL')
+    DYNAMICS_SCOPES = os.environ.get('DYNAMICS_SCOPES')
+    _settings_loaded = True
+
+# Default EntityDefinitions query (properties used by the entity graph)
+ENTITY_DEFINITION_QUERY = '$select=LogicalName,SchemaName,DisplayName,PrimaryIdAttribute,PrimaryNameAttribute,EntitySetName,IsCustomEntity,IsActivity,Description'
 
 
 class DynamicsAPI:
@@ -27,11 +59,15 @@ class DynamicsAPI:
     def __init__(self, logger=None) -> None:
         # Use provided logger or create a default one
         self.logger = logger or logging.getLogger(__name__)
-        self.msal_app = self._build_msal_app()
-        self.session = requests.Session()
+        load_settings()
+        # The MSAL app and the first token are created on first use (see msal_app / session),
+        # so constructing the client costs no network round trip
+        self._msal_app = None
+        self._session = requests.Session()
         self.token_cache = None
         self.token_expiry = None
-        self._refresh_token()  # Initial token acquisition
+        self._token_lock = threading.Lock()  # Scan workers share the token
+        self._table_definitions = {}  # Entity set name -> entity definition with attributes (see get_table_definition)
         self.headers = {
             "OData-MaxVersion": "4.0",
             "OData-Version": "4.0",
@@ -40,12 +76,30 @@ class DynamicsAPI:
         }
         self.logger.info("DynamicsAPI Class initialized with automatic token refresh")
 
-    def _build_msal_app(self) -> msal.ConfidentialClientApplication:
+    @property
+    def msal_app(self) -> 'msal.ConfidentialClientApplication':
+        """
+        The MSAL app, built on first use
+        """
+        if self._msal_app is None:
+            self._msal_app = self._build_msal_app()
+        return self._msal_app
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        The HTTP session, with a valid Authorization header (the token is acquired on first use)
+        """
+        self._ensure_valid_token()
+        return self._session
+
+    def _build_msal_app(self) -> 'msal.ConfidentialClientApplication':
         """
         Returns the MSAL app with the client's credentials
 
         :return: An instance of ConfidentialClientApplication
         """
+        import msal
 
         return msal.ConfidentialClientApplication(
             client_id=DYNAMICS_CLIENT_ID,
@@ -78,7 +132,7 @@ class DynamicsAPI:
             self.token_cache = access_token
             # Tokens typically expire in 1 hour, refresh 5 minutes before expiry
             self.token_expiry = datetime.now() + timedelta(minutes=55)
-            self.session.headers.update({'Authorization': f'Bearer {access_token}'})
+            self._session.headers.update({'Authorization': f'Bearer {access_token}'})
             self.logger.info(f"Token refreshed successfully. Expires at: {self.token_expiry}")
         except Exception as e:
             self.logger.error(f"Error refreshing token: {e}")
@@ -90,8 +144,10 @@ class DynamicsAPI:
         Called before each API request to ensure authentication.
         """
         if self.token_expiry is None or datetime.now() >= self.token_expiry:
-            self.logger.info("Token expired or missing, refreshing...")
-            self._refresh_token()
+            with self._token_lock:
+                if self.token_expiry is None or datetime.now() >= self.token_expiry:
+                    self.logger.info("Token expired or missing, refreshing...")
+                    self._refresh_token()
 
     def create_http_session(self) -> requests.Session:
         """
@@ -105,7 +161,7 @@ class DynamicsAPI:
         self._ensure_valid_token()
         return self.session
 
-    def retrieve_records(self, table_name: str, guid: str = None, display_columns: List[str] = None) -> pd.DataFrame:
+    def retrieve_records(self, table_name: str, guid: str = None, display_columns: List[str] = None) -> 'pd.DataFrame':
         """
         Retrieves a record's information given table name and optional additional information.
 
@@ -114,7 +170,12 @@ class DynamicsAPI:
         :param (OPTIONAL) display_columns: List of specific columns to retrieve in the format of a list of strings
 
         :return: Dataframe of the requested information.
+
+        For large pulls prefer retrieve_table (typed columns, all pages) and for a
+        single record retrieve_record.
         """
+        import pandas as pd
+
         self._ensure_valid_token()  # Ensure token is valid before API call
         full_url = f'{DYNAMICS_RESOURCE_URL}/api/data/v9.2/{table_name}'
         if guid:
@@ -148,6 +209,205 @@ class DynamicsAPI:
         response_df = pd.DataFrame(response_data['value'])
         return response_df
 
+    def get_table_attributes(self, table_name: str) -> List[dict]:
+        """
+        Retrieves the attribute metadata of a table in one request, cached per table.
+        Used to type the columns returned by retrieve_table.
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :return: List of attribute metadata dicts (LogicalName, AttributeType, AttributeTypeName, AttributeOf,
+                 Precision for Money / Decimal)
+        """
+        return self.get_table_definition(table_name).get('Attributes', [])
+
+    def get_table_definition(self, table_name: str) -> dict:
+        """
+        Retrieves the entity definition of a table by entity set name, with its attribute metadata.
+        Money and Decimal attributes get their Precision (and Money its PrecisionSource), which
+        only the derived metadata types carry, in one extra request per type. Cached per table.
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :return: Dictionary with LogicalName, PrimaryIdAttribute and Attributes
+        """
+        if table_name not in self._table_definitions:
+            url = (f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/EntityDefinitions"
+                   f"?$select=LogicalName,PrimaryIdAttribute&$filter=EntitySetName eq '{table_name}'"
+                   f"&$expand=Attributes($select={ATTRIBUTE_SELECT})")
+            entities = [entity for page in self.iter_pages(url) for entity in page]
+            if not entities:
+                raise KeyError(f"No table with entity set name '{table_name}'")
+            self._add_decimal_precision(entities[0])
+            self._table_definitions[table_name] = entities[0]
+        return self._table_definitions[table_name]
+
+    def _add_decimal_precision(self, definition: dict) -> None:
+        attributes = {attribute['LogicalName']: attribute for attribute in definition.get('Attributes', [])}
+        for attribute_type in DECIMAL_LIMITS:
+            if not any(attribute.get('AttributeType') == attribute_type for attribute in attributes.values()):
+                continue
+            select = 'LogicalName,Precision' + (',PrecisionSource' if attribute_type == 'Money' else '')
+            url = (f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/EntityDefinitions(LogicalName='{definition['LogicalName']}')"
+                   f"/Attributes/Microsoft.Dynamics.CRM.{attribute_type}AttributeMetadata?$select={select}")
+            for page in self.iter_pages(url):
+                for metadata in page:
+                    if metadata.get('LogicalName') in attributes:
+                        attributes[metadata['LogicalName']].update(
+                            {name: metadata.get(name) for name in ('Precision', 'PrecisionSource') if name in metadata})
+
+    def retrieve_table(self, table_name: str, columns: List[str] = None, odata_filter: str = None,
+                       page_size: int = 5000, partitions: List[Partition] = None,
+                       max_workers: int = 4) -> 'pa.Table':
+        """
+        Retrieves all records of a table as a typed Arrow table, following every page.
+        Column types come from the table's attribute metadata; each page is decoded into
+        one chunk of the table, so nothing is concatenated or converted to pandas until
+        asked for (table.to_pandas(), table.column(name).to_numpy()). Money and Decimal columns
+        are exact decimal128 at the attribute's precision: the records are requested with
+        numbers as strings, so no value passes through float. Requires pyarrow.
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param columns: Optional columns to retrieve (lookups as _<name>_value or their logical name)
+        :param odata_filter: Optional $filter expression
+        :param page_size: Records per page (odata.maxpagesize)
+        :param partitions: Optional key ranges to fetch concurrently (see scan_table / plan_time_partitions)
+        :param max_workers: Partitions fetched at the same time
+        :return: pyarrow.Table with one column per selected attribute
+        """
+        schema = record_schema(self.get_table_attributes(table_name), columns)
+        if partitions:
+            pages = self.scan_table(table_name, partitions, schema.names, odata_filter, page_size, max_workers,
+                                    exact_numbers=True)
+            return pages_to_table(pages, schema)
+
+        query = [f"$select={','.join(schema.names)}"]
+        if odata_filter:
+            query.append(f"$filter={odata_filter}")
+        url = f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/{table_name}?{'&'.join(query)}"
+        self.logger.info(f"Retrieving {table_name} ({len(schema)} columns)")
+
+        table = pages_to_table(self.iter_pages(url, page_size=page_size, exact_numbers=True), schema)
+        self.logger.info(f"Retrieved {table.num_rows} {table_name} records")
+        return table
+
+    def get_key_range(self, table_name: str, key: str = 'createdon', odata_filter: str = None) -> tuple:
+        """
+        Retrieves the smallest and largest value of a column (two $top=1 requests)
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param key: Column to read, e.g. createdon
+        :param odata_filter: Optional $filter expression
+        :return: Tuple of (min, max) as returned by the Web API, (None, None) for an empty table
+        """
+        bounds = []
+        for direction in ('asc', 'desc'):
+            url = f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/{table_name}?$select={key}&$orderby={key} {direction}&$top=1"
+            if odata_filter:
+                url += f"&$filter={odata_filter}"
+            records = next(self.iter_pages(url), [])
+            bounds.append(records[0].get(key) if records else None)
+        return tuple(bounds)
+
+    def plan_time_partitions(self, table_name: str, count: int, key: str = 'createdon',
+                             odata_filter: str = None) -> List[Partition]:
+        """
+        Splits a table into count equal windows of a DateTime column, between its oldest and newest value
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param count: Number of partitions (a few per worker evens out skewed windows)
+        :param key: DateTime column to partition on
+        :param odata_filter: Optional $filter expression
+        :return: List of partitions in key order
+        """
+        oldest, newest = self.get_key_range(table_name, key, odata_filter)
+        if oldest is None:
+            return [Partition(key)]
+        parse = lambda value: datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return time_partitions(parse(oldest), parse(newest), count, key)
+
+    def scan_table(self, table_name: str, partitions: List[Partition], columns: List[str] = None,
+                   odata_filter: str = None, page_size: int = 5000, max_workers: int = 4,
+                   limiter: RateLimiter = None, exact_numbers: bool = False):
+        """
+        Reads a table by key range: partitions are paged concurrently by a bounded pool of workers
+        sharing one rate limiter, and their pages are yielded in partition order (records ordered
+        by the partition key). Throttled requests (429/503) pause all workers for Retry-After.
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param partitions: Disjoint key ranges, e.g. from plan_time_partitions or guid_partitions
+        :param columns: Optional columns to retrieve
+        :param odata_filter: Optional $filter expression applied to every partition
+        :param page_size: Records per page (odata.maxpagesize)
+        :param max_workers: Partitions fetched at the same time
+        :param limiter: Rate limiter shared by the workers (default: DEFAULT_REQUESTS_PER_SECOND)
+        :param exact_numbers: Receive Decimal, Money and BigInt values as strings (see iter_responses)
+        :return: Generator of lists of records
+        """
+        limiter = limiter or RateLimiter()
+        self.logger.info(f"Scanning {table_name} in {len(partitions)} partitions with {max_workers} workers")
+
+        def fetch(partition: Partition):
+            conditions = [f"({condition})" for condition in (odata_filter, partition.odata_filter) if condition]
+            query = [f"$orderby={partition.key} asc"]
+            if columns:
+                query.append(f"$select={','.join(columns)}")
+            if conditions:
+                query.append(f"$filter={' and '.join(conditions)}")
+            url = f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/{table_name}?{'&'.join(query)}"
+            return self.iter_pages(url, page_size=page_size, limiter=limiter, exact_numbers=exact_numbers)
+
+        return ordered_scan(partitions, fetch, max_workers=max_workers)
+
+    def retrieve_record(self, table_name: str, guid: str, columns: List[str] = None) -> dict:
+        """
+        Retrieves one record as a dictionary
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param guid: The guid of the record
+        :param columns: Optional columns to retrieve
+        :return: Dictionary of the record's values
+        """
+        self._ensure_valid_token()  # Ensure token is valid before API call
+        url = f'{DYNAMICS_RESOURCE_URL}/api/data/v9.2/{table_name}({guid})'
+        if columns:
+            url += f"?$select={','.join(columns)}"
+
+        response = self.session.get(url, headers=self.headers)
+
+        if response.status_code != 200:
+            self.logger.error(f"HTTP {response.status_code}: {response.text}")
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+
+        return json.loads(response.content.decode('utf-8'))
+
+    def write_records(self, table_name: str, records, operation: str = 'create', method: str = 'multiple',
+                      chunk_size: int = 200, max_workers: int = 4, limiter: RateLimiter = None,
+                      max_retries: int = 5) -> List[WriteResult]:
+        """
+        Creates, updates or upserts many records, chunk_size records per request: CreateMultiple /
+        UpdateMultiple / UpsertMultiple, or one $batch changeset per chunk for tables without
+        those messages. Chunks are written concurrently under a shared rate limiter and throttled
+        requests are retried. A chunk the server rejects is split until the failing records are
+        isolated, so one bad record does not fail the rest.
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param records: Iterable of dictionaries of column values, e.g. {"name": "Contoso"};
+                        update (and upsert with method='batch') needs the primary key in each record
+        :param operation: 'create', 'update' or 'upsert'
+        :param method: 'multiple' or 'batch'
+        :param chunk_size: Records per request
+        :param max_workers: Chunks written at the same time
+        :param limiter: Rate limiter shared by the workers (default: DEFAULT_REQUESTS_PER_SECOND)
+        :param max_retries: Retries for throttled requests
+        :return: One WriteResult (index, id, status, error) per record, in input order
+        """
+        definition = self.get_table_definition(table_name)
+        writer = BulkWriter(self, f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2", table_name,
+                            definition['LogicalName'], definition['PrimaryIdAttribute'],
+                            operation=operation, method=method, limiter=limiter, max_retries=max_retries)
+        self.logger.info(f"Writing {table_name} records ({operation} via {method}, {chunk_size} per request, "
+                         f"{max_workers} workers)")
+        return writer.write(records, chunk_size=chunk_size, max_workers=max_workers)
+
     def get_access_token(self) -> str:
         """
         Public method to get access token (for enhanced MCP server compatibility)
@@ -317,77 +577,17 @@ class DynamicsAPI:
     #     # print(response.json())
     #     self.logger.info(f"Response: {response.json()}")
 
-    # def create_table_row(self,
-    #                      table_name: str,
-    #                      data: dict) -> None:
-    #     """
-    #     Creates a new row in a Dynamics 365 table.
-
-    #     :param table_name: The name of the Dynamics 365 table (PLURAL FORM!)
-    #     :param data: data in dictionary format. For example {"cre90_aclandedtoinverters": 5}
-    #     """
-    #     try:
-    #         url = f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/{table_name}"
-    #         response = self.session.post(url, headers=self.headers, data=json.dumps(data))
-    #         response.raise_for_status()
-    #         # print(f"Table row has been created for table {table_name}")
-    #         self.logger.info(f"Table row has been created for table {table_name}")
-    #     except Exception as ex:
-    #         # print("error from create_table_row:", ex)
-    #         self.logger.error(f"error from create_table_row: {ex}")
-    #         # print(f"Response content: {response.content.decode('utf-8')}")
-    #         self.logger.error(f"Response content: {response.content.decode('utf-8')}")
-
-    # def update_table_row(self, table_name: str, row_id: str, update_data: dict) -> None:
-    #     """
-    #     Updates an existing row in a specified Dynamics 365 table.
-
-    #     :param entity_name: The logical name of the Dynamics 365 entity, PLURAL FORM
-    #     :param row_id: The unique identifier (ID) of the row to be updated.
-    #     :param update_data: A dictionary containing the properties and their new values.
-    #                         For example, {"name": "New Name", "creditonhold": False}
-    #     """
-    #     try:
-    #         # Construct the URL for the Dynamics 365 API endpoint.
-    #         url = f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/{table_name}({row_id})"
-    #         # print(f"[DYNAMICS] Attempting to update table: {table_name}, row_id: {row_id}")
-    #         self.logger.info(f"Attempting to update table: {table_name}, row_id: {row_id}")
-    #         # print(f"[DYNAMICS] Update URL: {url}")
-    #         self.logger.info(f"Update URL: {url}")
-    #         # print(f"[DYNAMICS] Update data: {update_data}")
-    #         self.logger.info(f"Update data: {update_data}")
-
-    #         # Send a PATCH request to update the specified record.
-    #         response = self.session.patch(url, headers=self.headers, data=json.dumps(update_data))
-
-    #         # print(f"[DYNAMICS] Response status code: {response.status_code}")
-    #         self.logger.info(f"Response status code: {response.status_code}")
-
-    #         response.raise_for_status()
-    #         # print(f"[DYNAMICS] Successfully updated table {table_name} for row {row_id}")
-    #         self.logger.info(f"Successfully updated table {table_name} for row {row_id}")
-
-    #         # Log response content if any (usually empty for successful PATCH)
-    #         if response.content:
-    #             # print(f"[DYNAMICS] Response content: {response.content.decode('utf-8')}")
-    #             self.logger.info(f"Response content: {response.content.decode('utf-8')}")
-
-    #     except Exception as ex:
-    #         # print(f"[DYNAMICS] Error during update_table_row for table {table_name}, row_id {row_id}: {ex}")
-    #         self.logger.error(f"Error during update_table_row for table {table_name}, row_id {row_id}: {ex}")
-    #         # print(f"[DYNAMICS] Response content: {response.content.decode('utf-8')}")
-    #         self.logger.error(f"Response content: {response.content.decode('utf-8')}")
-
-    def get_all_entity_definitions(self) -> dict:
+    def get_all_entity_definitions(self, query: str = None) -> dict:
         """
         Retrieves all entity definitions (metadata) from Dynamics 365.
         Returns entity information including LogicalName, DisplayName, and other metadata.
 
+        :param query: Optional query string ($select/$filter) replacing the default $select
         :return: Dictionary containing all entity definitions
         """
         try:
             self._ensure_valid_token()  # Ensure token is valid before API call
-            url = f'{DYNAMICS_RESOURCE_URL}/api/data/v9.2/EntityDefinitions?$select=LogicalName,SchemaName,DisplayName,PrimaryIdAttribute,PrimaryNameAttribute,EntitySetName,IsCustomEntity,IsActivity,Description'
+            url = f'{DYNAMICS_RESOURCE_URL}/api/data/v9.2/EntityDefinitions?{query or ENTITY_DEFINITION_QUERY}'
             self.logger.info(f"Fetching entity definitions from: {url}")
 
             response = self.session.get(url, headers=self.headers)
@@ -428,13 +628,18 @@ class DynamicsAPI:
             self.logger.error(f"Error fetching relationships for {entity_logical_name}: {e}")
             raise e
 
-    def get_all_relationships(self) -> dict:
+    def get_all_relationships(self, select_by_type: dict = None) -> dict:
         """
         Retrieves all relationships across all entities in a more efficient way.
         Returns consolidated relationship data.
 
+        :param select_by_type: Optional {relationship type: properties} to fetch only those
+                               types and properties, e.g. {'OneToManyRelationshipMetadata': ('SchemaName', ...)}
         :return: Dictionary containing relationship information
         """
+        if select_by_type:
+            return {'value': list(self.iter_relationship_definitions(select_by_type))}
+
         try:
             self._ensure_valid_token()  # Ensure token is valid before API call
             # Fetch RelationshipDefinitions which includes all relationships
@@ -499,3 +704,247 @@ class DynamicsAPI:
         except Exception as e:
             self.logger.error(f"Error fetching required attributes for {entity_logical_name}: {e}")
             return []  # Return empty list on error
+
+    def get_attribute_definitions(self, entity_logical_names: List[str], chunk_size: int = 20) -> dict:
+        """
+        Retrieves the full attribute metadata for many entities in bulk.
+        Entities are requested in chunks with $expand=Attributes instead of one request per entity,
+        so each attribute comes back with the properties of its concrete type (MaxLength, Targets, ...).
+
+        :param entity_logical_names: Logical names of the entities to fetch attributes for
+        :param chunk_size: Number of entities per request
+        :return: Dictionary of entity logical name -> list of raw attribute metadata dicts
+        """
+        attributes_by_entity = {}
+        for start in range(0, len(entity_logical_names), chunk_size):
+            chunk = entity_logical_names[start:start + chunk_size]
+            try:
+                self._ensure_valid_token()  # Ensure token is valid before API call
+                name_filter = ' or '.join(f"LogicalName eq '{name}'" for name in chunk)
+                url = f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/EntityDefinitions?$select=LogicalName&$filter={name_filter}&$expand=Attributes"
+                self.logger.info(f"Fetching attribute definitions for entities {start + 1}-{start + len(chunk)} of {len(entity_logical_names)}")
+
+                response = self.session.get(url, headers=self.headers)
+
+                if response.status_code != 200:
+                    self.logger.error(f"HTTP {response.status_code}: {response.text}")
+                    raise Exception(f"HTTP {response.status_code}: {response.text}")
+
+                response_data = json.loads(response.content.decode('utf-8'))
+                for entity in response_data.get('value', []):
+                    attributes_by_entity[entity.get('LogicalName')] = entity.get('Attributes', [])
+
+            except Exception as e:
+                self.logger.error(f"Error fetching attribute definitions for {chunk}: {e}")
+                raise e
+
+        return attributes_by_entity
+
+    def get_record_counts(self, entity_logical_names: List[str], chunk_size: int = 100) -> dict:
+        """
+        Retrieves the total number of records of many entities with the RetrieveTotalRecordCount
+        function, chunk_size entities per request. The counts are the server's periodic snapshot
+        (refreshed about daily), not a live $count.
+        A chunk rejected with HTTP 400 (e.g. an entity that does not support counting) is split
+        until the offending entities are isolated; they are left out of the result.
+
+        :param entity_logical_names: Logical names of the entities to count
+        :param chunk_size: Number of entities per request
+        :return: Dictionary of entity logical name -> record count
+        """
+        counts = {}
+
+        def fetch(names: List[str]) -> None:
+            self._ensure_valid_token()  # Ensure token is valid before API call
+            url = (f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/RetrieveTotalRecordCount(EntityNames=@names)"
+                   f"?@names={json.dumps(names, separators=(',', ':'))}")
+            response = self.session.get(url, headers=self.headers)
+
+            if response.status_code == 400 and len(names) > 1:
+                middle = len(names) // 2
+                fetch(names[:middle])
+                fetch(names[middle:])
+                return
+            if response.status_code == 400:
+                self.logger.warning(f"Record count not available for {names[0]}: {response.text}")
+                return
+            if response.status_code != 200:
+                self.logger.error(f"HTTP {response.status_code}: {response.text}")
+                raise Exception(f"HTTP {response.status_code}: {response.text}")
+
+            collection = json.loads(response.content.decode('utf-8')).get('EntityRecordCountCollection', {})
+            for name, count in zip(collection.get('Keys', []), collection.get('Values', [])):
+                if isinstance(count, int) and count >= 0:
+                    counts[name] = count
+
+        for start in range(0, len(entity_logical_names), chunk_size):
+            chunk = list(entity_logical_names[start:start + chunk_size])
+            self.logger.info(f"Fetching record counts for entities {start + 1}-{start + len(chunk)} of {len(entity_logical_names)}")
+            fetch(chunk)
+
+        return counts
+
+    def get_option_set_names(self, entity_logical_names: List[str], chunk_size: int = 20) -> dict:
+        """
+        Retrieves which option set each choice (Picklist / MultiSelectPicklist) column uses, for many
+        entities in bulk: one request per chunk of entities and choice type, expanding the typed
+        attribute metadata with its OptionSet / GlobalOptionSet name.
+
+        :param entity_logical_names: Logical names of the entities
+        :param chunk_size: Number of entities per request
+        :return: Dictionary of entity logical name -> {attribute logical name -> option set name}
+        """
+        option_set_names = {}
+        for start in range(0, len(entity_logical_names), chunk_size):
+            chunk = entity_logical_names[start:start + chunk_size]
+            name_filter = ' or '.join(f"LogicalName eq '{name}'" for name in chunk)
+            for metadata_type in ('PicklistAttributeMetadata', 'MultiSelectPicklistAttributeMetadata'):
+                try:
+                    self._ensure_valid_token()  # Ensure token is valid before API call
+                    url = (f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/EntityDefinitions?$select=LogicalName&$filter={name_filter}"
+                           f"&$expand=Attributes/Microsoft.Dynamics.CRM.{metadata_type}"
+                           f"($select=LogicalName;$expand=OptionSet($select=Name),GlobalOptionSet($select=Name))")
+
+                    response = self.session.get(url, headers=self.headers)
+
+                    if response.status_code != 200:
+                        self.logger.error(f"HTTP {response.status_code}: {response.text}")
+                        continue  # Option set names are optional; keep going on error
+
+                    response_data = json.loads(response.content.decode('utf-8'))
+                    for entity in response_data.get('value', []):
+                        names = option_set_names.setdefault(entity.get('LogicalName'), {})
+                        for attr in entity.get('Attributes', []):
+                            option_set = attr.get('GlobalOptionSet') or attr.get('OptionSet') or {}
+                            if option_set.get('Name'):
+                                names[attr.get('LogicalName')] = option_set['Name']
+
+                except Exception as e:
+                    self.logger.error(f"Error fetching option sets for {chunk}: {e}")
+
+        return option_set_names
+
+    def iter_pages(self, url: str, page_size: int = None, limiter: RateLimiter = None, max_retries: int = 5,
+                   exact_numbers: bool = False):
+        """
+        Yields the records of a collection request one page at a time, following @odata.nextLink.
+        Metadata collections (EntityDefinitions, RelationshipDefinitions) are not paged by the
+        server and arrive as a single page.
+
+        :param url: Full request URL
+        :param page_size: Optional page size requested with the odata.maxpagesize preference
+        :param limiter: Optional rate limiter; with one, throttled requests (429/503) are retried
+                        after Retry-After, pausing everything that shares the limiter
+        :param max_retries: Retries per page for throttled requests
+        :param exact_numbers: Receive Decimal, Money and BigInt values as strings (see iter_responses)
+        :return: Generator of lists of records
+        """
+        for response_data in self.iter_responses(url, page_size, limiter, max_retries, exact_numbers=exact_numbers):
+            yield response_data.get('value', [])
+
+    def iter_responses(self, url: str, page_size: int = None, limiter: RateLimiter = None, max_retries: int = 5,
+                       track_changes: bool = False, exact_numbers: bool = False):
+        """
+        Yields the parsed response of every page of a collection request, following @odata.nextLink.
+        Unlike iter_pages, the page annotations are kept: with track_changes the last page
+        carries the @odata.deltaLink to request later changes from.
+
+        :param url: Full request URL (or a delta link)
+        :param page_size: Optional page size requested with the odata.maxpagesize preference
+        :param limiter: Optional rate limiter, as for iter_pages
+        :param max_retries: Retries per page for throttled requests
+        :param track_changes: Request change tracking (Prefer: odata.track-changes)
+        :param exact_numbers: Receive Decimal, Money and BigInt values as JSON strings
+                              (IEEE754Compatible), so they can be decoded without float rounding
+        :return: Generator of response dictionaries
+        :raises requests.HTTPError: For a non-200 response (the response is attached)
+        """
+        headers = dict(self.headers)
+        if exact_numbers:
+            headers['Accept'] = EXACT_NUMBERS_ACCEPT
+        preferences = ['odata.track-changes'] if track_changes else []
+        if page_size:
+            preferences.append(f'odata.maxpagesize={page_size}')
+        if preferences:
+            headers['Prefer'] = ','.join(preferences)
+
+        while url:
+            response = self.send('GET', url, limiter=limiter, max_retries=max_retries, headers=headers)
+
+            if response.status_code != 200:
+                self.logger.error(f"HTTP {response.status_code}: {response.text}")
+                raise requests.HTTPError(f"HTTP {response.status_code}: {response.text}", response=response)
+
+            response_data = json.loads(response.content.decode('utf-8'))
+            yield response_data
+            url = response_data.get('@odata.nextLink')
+
+    def send(self, method: str, url: str, limiter: RateLimiter = None, max_retries: int = 5,
+             **kwargs) -> requests.Response:
+        """
+        Sends one request with a valid token. With a rate limiter, the request waits for its turn
+        and throttled responses (429/503) are retried after Retry-After, pausing everything that
+        shares the limiter.
+
+        :param method: HTTP method, e.g. 'GET' or 'POST'
+        :param url: Full request URL
+        :param limiter: Optional rate limiter
+        :param max_retries: Retries for throttled responses
+        :param kwargs: Passed to the session (headers, data, ...)
+        :return: The response (the last one if retries ran out)
+        """
+        retries = 0
+        while True:
+            self._ensure_valid_token()  # Pages and chunks can outlive a token on long runs
+            if limiter:
+                limiter.acquire()
+            response = getattr(self.session, method.lower())(url, **kwargs)
+
+            if not limiter or response.status_code not in THROTTLED_STATUS or retries >= max_retries:
+                return response
+            try:
+                retry_after = float(response.headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                retry_after = 2 ** retries
+            retries += 1
+            self.logger.warning(f"Throttled (HTTP {response.status_code}), retrying in {retry_after:g}s")
+            limiter.pause(retry_after)
+
+    def iter_entity_definitions(self, query: str = None):
+        """
+        Yields entity definitions one by one, with the same properties as get_all_entity_definitions
+
+        :param query: Optional query string ($select/$filter) replacing the default $select
+        :return: Generator of raw entity metadata dicts
+        """
+        url = f'{DYNAMICS_RESOURCE_URL}/api/data/v9.2/EntityDefinitions?{query or ENTITY_DEFINITION_QUERY}'
+        self.logger.info(f"Streaming entity definitions from: {url}")
+        for page in self.iter_pages(url):
+            yield from page
+
+    def iter_relationship_definitions(self, select_by_type: dict = None):
+        """
+        Yields relationship definitions one by one, with the same properties as get_all_relationships
+
+        With select_by_type, each relationship type is requested through its type cast
+        (RelationshipDefinitions/Microsoft.Dynamics.CRM.<type>?$select=...), since properties of
+        the derived types cannot be selected on the base collection. '@odata.type' is filled in
+        when the trimmed response omits it.
+
+        :param select_by_type: Optional {relationship type: properties}, as for get_all_relationships
+        :return: Generator of raw relationship metadata dicts
+        """
+        if not select_by_type:
+            url = f'{DYNAMICS_RESOURCE_URL}/api/data/v9.2/RelationshipDefinitions'
+            self.logger.info(f"Streaming all relationship definitions")
+            for page in self.iter_pages(url):
+                yield from page
+            return
+
+        for rel_type, properties in select_by_type.items():
+            url = f"{DYNAMICS_RESOURCE_URL}/api/data/v9.2/RelationshipDefinitions/Microsoft.Dynamics.CRM.{rel_type}?$select={','.join(properties)}"
+            self.logger.info(f"Streaming {rel_type} definitions")
+            for page in self.iter_pages(url):
+                for rel in page:
+                    rel.setdefault('@odata.type', f'#Microsoft.Dynamics.CRM.{rel_type}')
+                    yield rel
@@ -0,0 +1,210 @@
+"""
+Typed columnar decoding of Dynamics 365 Web API records
+
+Each page of a table query is transposed into an Arrow RecordBatch whose
+column types come from the table's attribute metadata, and the page's dicts
+are dropped. The batches become the chunks of one Arrow Table, so pages are
+never concatenated or copied; table.to_pandas() / column(...).to_numpy()
+convert only when asked.
+
+Money and Decimal columns are exact decimal128 columns. Records are requested
+with EXACT_NUMBERS_ACCEPT, so the Web API sends their values (and BigInt
+values) as JSON strings that are decoded without passing through float; if a
+server sends plain numbers instead, they are rounded to the column's scale.
+
+pyarrow is optional and only imported when a columnar retrieval is requested.
+"""
+import re
+from typing import Any, Dict, Iterable, List
+
+# AttributeType -> Arrow type alias. Lookup-like attributes arrive as
+# _<name>_value GUID strings; types missing here (PartyList, CalendarRules,
+# ManagedProperty, most Virtual attributes) are not returned as plain columns.
+ATTRIBUTE_TYPES = {
+    'String': 'string', 'Memo': 'string', 'EntityName': 'string', 'Uniqueidentifier': 'string',
+    'Lookup': 'string', 'Customer': 'string', 'Owner': 'string',
+    'Boolean': 'bool',
+    'Integer': 'int32', 'Picklist': 'int32', 'State': 'int32', 'Status': 'int32',
+    'BigInt': 'int64',
+    'Double': 'float64', 'Decimal': 'decimal', 'Money': 'decimal',
+    'DateTime': 'timestamp[s, tz=UTC]',
+}
+
+# Money / Decimal -> (digits before the decimal point, largest Precision): the Web API limits
+# Money to +-922,337,203,685,477 with up to 4 decimals and Decimal to +-100,000,000,000 with up to 10
+DECIMAL_LIMITS = {'Money': (15, 4), 'Decimal': (12, 10)}
+
+# Accept header that makes the Web API serialize Edm.Decimal and Edm.Int64 values as strings
+EXACT_NUMBERS_ACCEPT = 'application/json;IEEE754Compatible=true'
+
+_DECIMAL_ALIAS = re.compile(r'decimal128\((\d+),(\d+)\)')
+
+# Virtual attributes that are returned as values (comma-separated option values)
+VIRTUAL_TYPE_NAMES = {'MultiSelectPicklistType': 'string'}
+
+LOOKUP_TYPES = ('Lookup', 'Customer', 'Owner')
+
+# $select used when reading a table's attribute metadata
+ATTRIBUTE_SELECT = 'LogicalName,AttributeType,AttributeTypeName,AttributeOf,IsValidForRead,IsPrimaryId'
+
+
+def _pyarrow():
+    """
+    Import pyarrow on first use so the rest of the client works without it
+    """
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("pyarrow is required for columnar record retrieval: pip install pyarrow") from e
+
+
+def column_name(attribute: Dict[str, Any]) -> str:
+    """
+    Name of an attribute's column in Web API records (_<name>_value for lookups)
+    """
+    name = attribute.get('LogicalName')
+    return f'_{name}_value' if attribute.get('AttributeType') in LOOKUP_TYPES else name
+
+
+def decimal_type_alias(attribute: Dict[str, Any]) -> str:
+    """
+    decimal128(precision,scale) alias for a Money or Decimal attribute. The scale is the
+    attribute's Precision; Money whose precision comes from the organization or currency
+    (PrecisionSource 1 or 2), or an attribute without Precision metadata, gets the largest scale.
+    """
+    digits, max_scale = DECIMAL_LIMITS[attribute['AttributeType']]
+    scale = attribute.get('Precision')
+    if not isinstance(scale, int) or not 0 <= scale <= max_scale or attribute.get('PrecisionSource'):
+        scale = max_scale
+    return f'decimal128({digits + scale},{scale})'
+
+
+def column_type_alias(attribute: Dict[str, Any]) -> str:
+    """
+    Arrow type alias for an attribute, or None if it is not returned as a column
+    """
+    if attribute.get('AttributeOf') or attribute.get('IsValidForRead') is False:
+        return None  # Derived (e.g. <lookup>name) or unreadable: never a column of its own
+    type_name = attribute.get('AttributeTypeName') or {}
+    type_name = type_name.get('Value') if isinstance(type_name, dict) else None
+    alias = ATTRIBUTE_TYPES.get(attribute.get('AttributeType')) or VIRTUAL_TYPE_NAMES.get(type_name)
+    return decimal_type_alias(attribute) if alias == 'decimal' else alias
+
+
+def readable_columns(attributes: Iterable[Dict[str, Any]]) -> Dict[str, tuple]:
+    """
+    Columns returned for a table's records, from its attribute metadata
+
+    :param attributes: Attribute metadata dicts (LogicalName, AttributeType, AttributeTypeName, AttributeOf,
+                       Precision for Money / Decimal)
+    :return: Dictionary of column name -> (logical name, Arrow type alias), in metadata order
+    """
+    columns = {}
+    for attribute in attributes:
+        alias = column_type_alias(attribute)
+        if alias:
+            columns[column_name(attribute)] = (attribute.get('LogicalName'), alias)
+    return columns
+
+
+def _type_for_alias(pa, alias: str):
+    if alias.startswith('timestamp'):
+        return pa.timestamp('s', tz='UTC')
+    decimal = _DECIMAL_ALIAS.fullmatch(alias)
+    if decimal:
+        return pa.decimal128(int(decimal.group(1)), int(decimal.group(2)))
+    return pa.type_for_alias(alias)
+
+
+def record_schema(attributes: Iterable[Dict[str, Any]], columns: List[str] = None):
+    """
+    Arrow schema for a table's records from its attribute metadata
+
+    :param attributes: Attribute metadata dicts (LogicalName, AttributeType, AttributeTypeName, AttributeOf)
+    :param columns: Optional columns to keep, in this order (Web API names or logical names of lookups)
+    :return: pyarrow.Schema
+    :raises ValueError: If a requested column is not a readable attribute of the table
+    """
+    pa = _pyarrow()
+    fields = {}
+    aliases = {}
+    for name, (logical_name, alias) in readable_columns(attributes).items():
+        fields[name] = pa.field(name, _type_for_alias(pa, alias))
+        aliases[logical_name] = name
+
+    if not columns:
+        return pa.schema(sorted(fields.values(), key=lambda field: field.name))
+
+    selected = []
+    for column in columns:
+        field = fields.get(column) or fields.get(aliases.get(column))
+        if field is None:
+            raise ValueError(f"Unknown or unreadable column: {column}")
+        selected.append(field)
+    return pa.schema(selected)
+
+
+def _wire_field(pa, field, records: List[Dict[str, Any]]):
+    """
+    A field as its values arrive in JSON: timestamps are ISO 8601 strings; decimals and
+    int64 are strings with EXACT_NUMBERS_ACCEPT, otherwise numbers (decimals as float64)
+    """
+    if pa.types.is_timestamp(field.type):
+        return pa.field(field.name, pa.string())
+    if pa.types.is_decimal(field.type) or pa.types.is_int64(field.type):
+        sample = next((r[field.name] for r in records if r.get(field.name) is not None), None)
+        if isinstance(sample, str):
+            return pa.field(field.name, pa.string())
+        if pa.types.is_decimal(field.type):
+            return pa.field(field.name, pa.float64())
+    return field
+
+
+def _timestamps(pa, strings, arrow_type):
+    """
+    ISO 8601 strings as UTC timestamps. Date-only values ('2024-05-01') are
+    read as midnight UTC so every page of a column has the same type.
+    """
+    import pyarrow.compute as pc
+
+    date_only = pc.equal(pc.utf8_length(strings), 10)
+    if pc.any(date_only).as_py():
+        strings = pc.if_else(date_only, pc.binary_join_element_wise(strings, 'T00:00:00Z', ''), strings)
+    return strings.cast(arrow_type)
+
+
+def records_to_batch(records: List[Dict[str, Any]], schema):
+    """
+    Transpose one page of records into a RecordBatch with the given schema
+    (missing values become nulls; keys outside the schema are ignored)
+
+    :param records: Records of one response page
+    :param schema: pyarrow.Schema, e.g. from record_schema
+    :return: pyarrow.RecordBatch
+    """
+    pa = _pyarrow()
+    wire_schema = pa.schema([_wire_field(pa, field, records) for field in schema])
+    batch = pa.RecordBatch.from_pylist(records, schema=wire_schema)
+    if batch.schema.equals(schema):
+        return batch
+    arrays = [
+        _timestamps(pa, column, field.type) if pa.types.is_timestamp(field.type)
+        else column if column.type == field.type
+        else column.cast(field.type)  # Safe cast: a string with more decimals than the scale raises
+        for column, field in zip(batch.columns, schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def pages_to_table(pages: Iterable[List[Dict[str, Any]]], schema):
+    """
+    Arrow Table with one chunk per page (batches are not concatenated)
+
+    :param pages: Iterable of record pages, e.g. DynamicsAPI.iter_pages
+    :param schema: pyarrow.Schema of the records
+    :return: pyarrow.Table
+    """
+    pa = _pyarrow()
+    batches = [records_to_batch(page, schema) for page in pages if page]
+    return pa.Table.from_batches(batches, schema=schema)
@@ -0,0 +1,299 @@
+"""
+Local SQLite mirror of Dataverse tables, kept current with change tracking
+
+A table is loaded in full once with Prefer: odata.track-changes; the last page
+of that load carries an @odata.deltaLink. Every later sync requests that link
+and gets only the records created, updated or deleted since, plus the next
+delta link. Changes are applied as batched upserts and deletes in a single
+transaction together with the new link, so a failed sync leaves the mirror at
+its previous state and the same changes are applied again on the next try.
+
+Reads are plain SQLite queries on a separate connection (WAL mode), so they
+see the last committed state and are not blocked by a running sync.
+Tables without change tracking enabled are reloaded in full on every sync.
+Throttled requests are retried after Retry-After; a delta link is only given
+up for a full reload when the service rejects it.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from . import dynamics_api as client_module
+from .partitioned_scan import RateLimiter
+from .record_columns import readable_columns
+
+# Arrow type alias (record_columns, decimal128(p,s) by its base name) -> SQLite column type;
+# timestamps stay ISO 8601 text
+SQLITE_TYPES = {'bool': 'INTEGER', 'int32': 'INTEGER', 'int64': 'INTEGER', 'float64': 'REAL', 'decimal128': 'REAL'}
+
+# Responses to a delta link the service no longer accepts (expired or invalid token):
+# the table is reloaded in full. Other failures leave the mirror as it was and are raised.
+DELTA_LINK_REJECTED_STATUS = (400, 410)
+
+# Bookkeeping table: one row per mirrored table
+MIRROR_TABLES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS _mirror_tables (
+    table_name TEXT PRIMARY KEY,
+    primary_key TEXT NOT NULL,
+    columns TEXT NOT NULL,
+    delta_link TEXT,
+    synced_at REAL
+)
+"""
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _is_deleted(record: Dict[str, Any]) -> bool:
+    return record.get('reason') == 'deleted' or '$deletedEntity' in record.get('@odata.context', '')
+
+
+class TableMirror:
+    """
+    SQLite mirror of selected Dataverse tables (one SQLite table per entity set,
+    named after it, with one column per readable attribute; booleans are 0/1)
+    """
+
+    def __init__(self, dynamics_api, path: str = 'dataverse_mirror.db', page_size: int = 5000):
+        """
+        :param dynamics_api: DynamicsAPI used for metadata, loads and delta syncs
+        :param path: SQLite database file (':memory:' for a throwaway mirror)
+        :param page_size: Records per page requested from the Web API
+        """
+        self.dynamics_api = dynamics_api
+        self.path = path
+        self.page_size = page_size
+        self.limiter = RateLimiter()
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        # Autocommit mode: transactions are opened explicitly around each load / delta
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(MIRROR_TABLES_SCHEMA)
+        if path == ':memory:':  # Each connection would get its own in-memory database
+            self._reader, self._read_lock = self._connection, self._lock
+        else:
+            self._reader, self._read_lock = sqlite3.connect(path, check_same_thread=False), threading.Lock()
+            self._reader.row_factory = sqlite3.Row
+
+    def __enter__(self) -> 'TableMirror':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock, self._read_lock:
+            if self._reader is not self._connection:
+                self._reader.close()
+            self._connection.close()
+
+    def add_table(self, table_name: str, columns: List[str] = None) -> None:
+        """
+        Start mirroring a table (loaded on the next sync). Re-adding a table with
+        other columns recreates it.
+
+        :param table_name: The entity set name of the table, PLURAL FORM!
+        :param columns: Optional columns to mirror (default: all readable columns); the primary key is always kept
+        :raises ValueError: If a requested column is not a readable attribute of the table
+        """
+        attributes = self.dynamics_api.get_table_attributes(table_name)
+        available = readable_columns(attributes)
+        primary_key = next(
+            (a['LogicalName'] for a in attributes if a.get('IsPrimaryId') and a.get('LogicalName') in available),
+            None
+        )
+        if primary_key is None:
+            raise ValueError(f"No primary key attribute found for {table_name}")
+
+        if columns:
+            by_logical_name = {logical_name: name for name, (logical_name, _) in available.items()}
+            selected = [primary_key]
+            for column in columns:
+                name = column if column in available else by_logical_name.get(column)
+                if name is None:
+                    raise ValueError(f"Unknown or unreadable column: {column}")
+                if name not in selected:
+                    selected.append(name)
+        else:
+            selected = [primary_key] + sorted(name for name in available if name != primary_key)
+
+        with self._lock:
+            existing = self._connection.execute(
+                'SELECT columns FROM _mirror_tables WHERE table_name = ?', (table_name,)
+            ).fetchone()
+            if existing and json.loads(existing['columns']) == selected:
+                return
+
+            definitions = ', '.join(
+                f"{_quote(name)} {SQLITE_TYPES.get(available[name][1].split('(')[0], 'TEXT')}"
+                + (' PRIMARY KEY' if name == primary_key else '')
+                for name in selected
+            )
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.execute(f'DROP TABLE IF EXISTS {_quote(table_name)}')
+                self._connection.execute(f'CREATE TABLE {_quote(table_name)} ({definitions}) WITHOUT ROWID')
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO _mirror_tables (table_name, primary_key, columns, delta_link, synced_at) '
+                    'VALUES (?, ?, ?, NULL, NULL)',
+                    (table_name, primary_key, json.dumps(selected))
+                )
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+        self.logger.info(f"Mirroring {table_name} ({len(selected)} columns)")
+
+    def remove_table(self, table_name: str) -> None:
+        """
+        Stop mirroring a table and drop its local copy
+        """
+        with self._lock:
+            self._connection.execute(f'DROP TABLE IF EXISTS {_quote(table_name)}')
+            self._connection.execute('DELETE FROM _mirror_tables WHERE table_name = ?', (table_name,))
+
+    def tables(self) -> List[Dict[str, Any]]:
+        """
+        Mirrored tables with their row count, last sync time and whether a delta link is held
+        """
+        with self._read_lock:
+            rows = self._reader.execute(
+                'SELECT table_name, primary_key, delta_link, synced_at FROM _mirror_tables ORDER BY table_name'
+            ).fetchall()
+            return [
+                {
+                    'table': row['table_name'],
+                    'primaryKey': row['primary_key'],
+                    'rows': self._reader.execute(f"SELECT COUNT(*) FROM {_quote(row['table_name'])}").fetchone()[0],
+                    'syncedAt': row['synced_at'],
+                    'changeTracking': row['delta_link'] is not None,
+                }
+                for row in rows
+            ]
+
+    def sync(self, table_name: str = None, full: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Bring mirrored tables up to date: a delta sync where a delta link is held,
+        otherwise (or if the service rejects the link, e.g. expired) a full reload
+
+        :param table_name: Table to sync (default: every mirrored table)
+        :param full: Reload in full even when a delta link is held
+        :return: Dictionary of table name -> {'mode', 'upserted', 'deleted', 'seconds'}
+        :raises Exception: Any other failure (network, HTTP 5xx, throttling beyond the retries,
+                            SQLite); the failing table keeps its previous state and delta link
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT * FROM _mirror_tables' + (' WHERE table_name = ?' if table_name else ''),
+                (table_name,) if table_name else ()
+            ).fetchall()
+        if table_name and not rows:
+            raise KeyError(f"{table_name} is not mirrored (add_table first)")
+
+        results = {}
+        for row in rows:
+            name, primary_key, columns = row['table_name'], row['primary_key'], json.loads(row['columns'])
+            start_time = time.time()
+            result = None
+            if row['delta_link'] and not full:
+                try:
+                    result = self._apply(name, primary_key, columns, row['delta_link'], full=False)
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code not in DELTA_LINK_REJECTED_STATUS:
+                        raise
+                    self.logger.warning(f"Delta link of {name} rejected, reloading in full: {e}")
+            if result is None:
+                url = f"{client_module.DYNAMICS_RESOURCE_URL}/api/data/v9.2/{name}?$select={','.join(columns)}"
+                result = self._apply(name, primary_key, columns, url, full=True)
+            result['seconds'] = round(time.time() - start_time, 3)
+            results[name] = result
+            self.logger.info(f"Synced {name}: {result}")
+        return results
+
+    def _apply(self, table_name: str, primary_key: str, columns: List[str], url: str, full: bool) -> Dict[str, Any]:
+        """
+        Fetch a full load or a delta and apply it in one transaction with the new delta link
+        """
+        table = _quote(table_name)
+        upsert = (f"INSERT OR REPLACE INTO {table} ({', '.join(map(_quote, columns))}) "
+                  f"VALUES ({', '.join('?' * len(columns))})")
+        delete = f"DELETE FROM {table} WHERE {_quote(primary_key)} = ?"
+        upserted = deleted = 0
+        delta_link = None
+
+        def value(v):
+            return json.dumps(v) if isinstance(v, (dict, list)) else v
+
+        with self._lock:
+            connection = self._connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                if full:
+                    connection.execute(f'DELETE FROM {table}')
+                pages = self.dynamics_api.iter_responses(url, page_size=self.page_size, limiter=self.limiter,
+                                                         track_changes=True)
+                for response_data in pages:
+                    page = response_data.get('value', [])
+                    removed = [(r.get('id'),) for r in page if _is_deleted(r)]
+                    changed = [tuple(value(r.get(c)) for c in columns) for r in page if not _is_deleted(r)]
+                    if changed:
+                        connection.executemany(upsert, changed)
+                    if removed:
+                        connection.executemany(delete, removed)
+                    upserted += len(changed)
+                    deleted += len(removed)
+                    delta_link = response_data.get('@odata.deltaLink', delta_link)
+
+                if full and delta_link is None:
+                    self.logger.warning(f"{table_name} has no change tracking; every sync reloads it in full")
+                connection.execute(
+                    'UPDATE _mirror_tables SET delta_link = ?, synced_at = ? WHERE table_name = ?',
+                    (delta_link, time.time(), table_name)
+                )
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+
+        return {'mode': 'full' if full else 'delta', 'upserted': upserted, 'deleted': deleted}
+
+    def get(self, table_name: str, record_id: str) -> Optional[Dict[str, Any]]:
+        """
+        One mirrored record by primary key
+
+        :param table_name: The entity set name of the table
+        :param record_id: The guid of the record
+        :return: Dictionary of the record's columns, or None if not mirrored
+        """
+        with self._read_lock:
+            row = self._reader.execute(
+                'SELECT primary_key FROM _mirror_tables WHERE table_name = ?', (table_name,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"{table_name} is not mirrored")
+            record = self._reader.execute(
+                f"SELECT * FROM {_quote(table_name)} WHERE {_quote(row['primary_key'])} = ?", (record_id,)
+            ).fetchone()
+            return dict(record) if record is not None else None
+
+    def query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """
+        Run a SQL query against the mirror (changes come from sync only; writes here are
+        overwritten or lost on the next full reload)
+
+        :param sql: SELECT statement; mirrored tables are named after their entity sets
+        :param params: Query parameters
+        :return: List of rows as dictionaries
+        """
+        with self._read_lock:
+            return [dict(row) for row in self._reader.execute(sql, params).fetchall()]
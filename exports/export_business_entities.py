@@ -1,59 +1,100 @@
 """
 Export BUSINESS entities only (filtered) to see what we're actually visualizing
+
+Records are filtered and written to every output format as they stream in;
+only the set of kept entity names is held to filter the relationships.
 """
-import json
-import csv
+import argparse
 import sys
+from contextlib import ExitStack
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent))
 from dynamics_api.dynamics_api import DynamicsAPI
 from backend.services.dynamics_service import DynamicsService
-from backend.services.entity_filters import filter_business_entities
-
-def export_business_data():
-    """Export business entities only"""
+from backend.services.entity_filters import is_business_entity
+from backend.services.export_writers import CsvWriter, FanOut, JsonObjectWriter, NdjsonWriter, tap, write_all
+from export_entities import EntitySummary
+
+BUSINESS_ENTITY_COLUMNS = [
+    ('LogicalName', 'logicalName'),
+    ('Label', 'label'),
+    ('SchemaName', 'schemaName'),
+    ('IsCustomEntity', 'isCustomEntity'),
+    ('IsActivity', 'isActivity'),
+    ('Description', 'description'),
+]
+
+BUSINESS_RELATIONSHIP_COLUMNS = [
+    ('SchemaName', 'schemaName'),
+    ('Type', 'type'),
+    ('SourceEntity', 'sourceEntity'),
+    ('TargetEntity', 'targetEntity'),
+    ('SourceAttribute', 'sourceAttribute'),
+    ('TargetAttribute', 'targetAttribute'),
+]
+
+def export_business_data(ndjson=False):
+    """
+    Stream business entities only into business_entities.json,
+    business_entities.csv and business_relationships.csv in one pass
+
+    :param ndjson: Also write business_entities.ndjson / business_relationships.ndjson
+    :return: EntitySummary of the exported records
+    """
     print("Fetching data from Dynamics 365...")
     service = DynamicsService()
-
-    # Get all data
-    graph_data = service.get_entity_graph_data()
-    print(f"  Raw data: {len(graph_data['nodes'])} entities, {len(graph_data['edges'])} relationships")
-
-    # Filter to business entities only
-    business_nodes, business_edges = filter_business_entities(
-        graph_data['nodes'],
-        graph_data['edges']
-    )
-
-    print(f"  Business entities: {len(business_nodes)} entities, {len(business_edges)} relationships")
-
-    # Save to JSON
-    business_data = {
-        'nodes': business_nodes,
-        'edges': business_edges
-    }
-
-    output_file = 'business_entities.json'
-    with open(output_file, 'w') as f:
-        json.dump(business_data, f, indent=2)
-
-    print(f"\n✓ Exported to {output_file}")
-
-    return business_nodes, business_edges
-
-def create_business_summary(entities, relationships):
+    summary = EntitySummary()
+    business_entity_names = set()
+    raw_counts = {'entities': 0, 'relationships': 0}
+
+    def business_entities():
+        for entity in service.iter_entities():
+            raw_counts['entities'] += 1
+            if is_business_entity(entity):
+                business_entity_names.add(entity['id'])
+                yield entity
+
+    def business_relationships():
+        # Entities are fully streamed before relationships, so the name set is complete here
+        for rel in service.iter_relationships():
+            raw_counts['relationships'] += 1
+            if rel['sourceEntity'] in business_entity_names and rel['targetEntity'] in business_entity_names:
+                yield rel
+
+    with ExitStack() as stack:
+        def output(name):
+            return stack.enter_context(open(name, 'w', newline='', encoding='utf-8'))
+
+        business_json = JsonObjectWriter(output('business_entities.json'))
+
+        node_writers = [business_json.array('nodes'), CsvWriter(output('business_entities.csv'), BUSINESS_ENTITY_COLUMNS)]
+        if ndjson:
+            node_writers.append(NdjsonWriter(output('business_entities.ndjson')))
+        with FanOut(node_writers) as nodes_out:
+            write_all(tap(business_entities(), summary.add_entity), nodes_out)
+
+        edge_writers = [business_json.array('edges'), CsvWriter(output('business_relationships.csv'), BUSINESS_RELATIONSHIP_COLUMNS)]
+        if ndjson:
+            edge_writers.append(NdjsonWriter(output('business_relationships.ndjson')))
+        with FanOut(edge_writers) as edges_out:
+            write_all(tap(business_relationships(), summary.add_relationship), edges_out)
+
+        business_json.close()
+
+    print(f"  Raw data: {raw_counts['entities']} entities, {raw_counts['relationships']} relationships")
+    print(f"  Business entities: {len(summary.entities)} entities, {summary.relationship_count} relationships")
+    print("\n✓ Exported to business_entities.json, business_entities.csv, business_relationships.csv")
+
+    return summary
+
+def create_business_summary(summary):
     """Create summary of business entities"""
     output_file = 'BUSINESS_ENTITY_SUMMARY.md'
 
-    # Count relationships per entity
-    entity_rel_count = {}
-    for rel in relationships:
-        source = rel['sourceEntity']
-        target = rel['targetEntity']
-        entity_rel_count[source] = entity_rel_count.get(source, 0) + 1
-        entity_rel_count[target] = entity_rel_count.get(target, 0) + 1
+    entities = summary.entities
+    entity_rel_count = summary.entity_rel_count
 
     # Count custom vs standard
     custom_count = sum(1 for e in entities if e['isCustomEntity'])
@@ -97,7 +138,7 @@ def create_business_summary(entities, relationships):
         f.write(f"- **Custom Entities**: {custom_count}\n")
         f.write(f"- **Standard Business Entities**: {standard_count}\n")
         f.write(f"- **Activity Entities**: {activity_count}\n")
-        f.write(f"- **Business Relationships**: {len(relationships)}\n\n")
+        f.write(f"- **Business Relationships**: {summary.relationship_count}\n\n")
 
         f.write("## What Was Filtered Out?\n\n")
         f.write("System entities removed (144 entities):\n")
@@ -152,7 +193,7 @@ def create_business_summary(entities, relationships):
 
         for entity in sorted_custom:
             rel_count = entity_rel_count.get(entity['logicalName'], 0)
-            desc = entity.get('description', '')[:80]
+            desc = entity['description'][:80]
             f.write(f"| {entity['logicalName']} | {entity['label']} | {rel_count} | {desc} |\n")
 
         if len(custom_entities) > 50:
@@ -160,61 +201,20 @@ def create_business_summary(entities, relationships):
 
     print(f"✓ Created summary in {output_file}")
 
-def export_business_csv(entities, relationships):
-    """Export business entities to CSV"""
-    # Entities CSV
-    with open('business_entities.csv', 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            'LogicalName', 'Label', 'SchemaName', 'IsCustomEntity',
-            'IsActivity', 'Description'
-        ])
-        writer.writeheader()
-
-        for entity in entities:
-            writer.writerow({
-                'LogicalName': entity['logicalName'],
-                'Label': entity['label'],
-                'SchemaName': entity['schemaName'],
-                'IsCustomEntity': entity['isCustomEntity'],
-                'IsActivity': entity['isActivity'],
-                'Description': entity.get('description', '')
-            })
-
-    print("✓ Exported to business_entities.csv")
-
-    # Relationships CSV
-    with open('business_relationships.csv', 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            'SchemaName', 'Type', 'SourceEntity', 'TargetEntity',
-            'SourceAttribute', 'TargetAttribute'
-        ])
-        writer.writeheader()
-
-        for rel in relationships:
-            writer.writerow({
-                'SchemaName': rel['schemaName'],
-                'Type': rel['type'],
-                'SourceEntity': rel['sourceEntity'],
-                'TargetEntity': rel['targetEntity'],
-                'SourceAttribute': rel.get('sourceAttribute', ''),
-                'TargetAttribute': rel.get('targetAttribute', '')
-            })
-
-    print("✓ Exported to business_relationships.csv")
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export business entities and relationships")
+    parser.add_argument('--ndjson', action='store_true', help="Also write business_entities.ndjson and business_relationships.ndjson")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Business Entity Exporter (System Entities Filtered)")
     print("=" * 60)
 
-    # Export data
-    entities, relationships = export_business_data()
+    # Export JSON and CSVs in a single streaming pass
+    summary = export_business_data(ndjson=args.ndjson)
 
     # Create summary
-    create_business_summary(entities, relationships)
-
-    # Export CSVs
-    export_business_csv(entities, relationships)
+    create_business_summary(summary)
 
     print("\n" + "=" * 60)
     print("Export Complete!")
@@ -224,3 +224,5 @@ if __name__ == "__main__":
     print("  2. business_entities.csv        - Business entities only")
     print("  3. business_relationships.csv   - Business relationships only")
     print("  4. business_entities.json       - Complete data in JSON")
+    if args.ndjson:
+        print("  5. business_entities.ndjson / business_relationships.ndjson - One JSON record per line")
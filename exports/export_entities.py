@@ -1,97 +1,94 @@
 """
 Export Dynamics 365 entities and relationships to JSON and CSV files
+
+Records are streamed: each entity/relationship is written to every output
+format as soon as it is read, so the full graph is never held in memory.
 """
-import json
-import csv
+import argparse
 import sys
+from contextlib import ExitStack
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent))
 from dynamics_api.dynamics_api import DynamicsAPI
 from backend.services.dynamics_service import DynamicsService
-
-def export_to_json():
-    """Export entities and relationships to JSON"""
+from backend.services.export_writers import (
+    ENTITY_CSV_COLUMNS, RELATIONSHIP_CSV_COLUMNS, CsvWriter, FanOut, JsonObjectWriter, NdjsonWriter, tap, write_all
+)
+
+class EntitySummary:
+    """
+    Running totals for the summary file, collected while the records stream
+    past. Keeps one small row per entity and a relationship count per entity,
+    never the relationships themselves.
+    """
+
+    def __init__(self):
+        self.entities = []
+        self.relationship_count = 0
+        self.entity_rel_count = {}
+
+    def add_entity(self, entity):
+        self.entities.append({
+            'logicalName': entity['logicalName'],
+            'label': entity['label'],
+            'isCustomEntity': entity['isCustomEntity'],
+            'isActivity': entity['isActivity'],
+            'description': (entity.get('description') or '')[:100],
+        })
+
+    def add_relationship(self, rel):
+        self.relationship_count += 1
+        for entity in (rel['sourceEntity'], rel['targetEntity']):
+            self.entity_rel_count[entity] = self.entity_rel_count.get(entity, 0) + 1
+
+
+def export_graph(ndjson=False):
+    """
+    Stream entities and relationships into entity_graph_data.json, entities.csv,
+    relationships.csv (and entities.ndjson / relationships.ndjson) in one pass
+
+    :param ndjson: Also write newline-delimited JSON files
+    :return: EntitySummary of the exported records
+    """
     print("Fetching data from Dynamics 365...")
     service = DynamicsService()
+    summary = EntitySummary()
+
+    with ExitStack() as stack:
+        def output(name):
+            return stack.enter_context(open(name, 'w', newline='', encoding='utf-8'))
+
+        graph_json = JsonObjectWriter(output('entity_graph_data.json'))
+        ndjson_files = (output('entities.ndjson'), output('relationships.ndjson')) if ndjson else None
+
+        node_writers = [graph_json.array('nodes'), CsvWriter(output('entities.csv'), ENTITY_CSV_COLUMNS)]
+        if ndjson:
+            node_writers.append(NdjsonWriter(ndjson_files[0]))
+        with FanOut(node_writers) as nodes_out:
+            write_all(tap(service.iter_entities(), summary.add_entity), nodes_out)
+
+        edge_writers = [graph_json.array('edges'), CsvWriter(output('relationships.csv'), RELATIONSHIP_CSV_COLUMNS)]
+        if ndjson:
+            edge_writers.append(NdjsonWriter(ndjson_files[1]))
+        with FanOut(edge_writers) as edges_out:
+            write_all(tap(service.iter_relationships(), summary.add_relationship), edges_out)
 
-    # Get all data
-    graph_data = service.get_entity_graph_data()
-
-    # Save to JSON
-    output_file = 'entity_graph_data.json'
-    with open(output_file, 'w') as f:
-        json.dump(graph_data, f, indent=2)
-
-    print(f"\n✓ Exported to {output_file}")
-    print(f"  - Entities: {len(graph_data['nodes'])}")
-    print(f"  - Relationships: {len(graph_data['edges'])}")
-
-    return graph_data
-
-def export_entities_csv(entities):
-    """Export entities to CSV"""
-    output_file = 'entities.csv'
-
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            'LogicalName', 'Label', 'SchemaName', 'EntitySetName',
-            'IsCustomEntity', 'IsActivity', 'PrimaryIdAttribute',
-            'PrimaryNameAttribute', 'Description'
-        ])
-        writer.writeheader()
-
-        for entity in entities:
-            writer.writerow({
-                'LogicalName': entity['logicalName'],
-                'Label': entity['label'],
-                'SchemaName': entity['schemaName'],
-                'EntitySetName': entity['entitySetName'],
-                'IsCustomEntity': entity['isCustomEntity'],
-                'IsActivity': entity['isActivity'],
-                'PrimaryIdAttribute': entity['primaryIdAttribute'],
-                'PrimaryNameAttribute': entity['primaryNameAttribute'],
-                'Description': entity.get('description', '')
-            })
-
-    print(f"\n✓ Exported to {output_file}")
-
-def export_relationships_csv(relationships):
-    """Export relationships to CSV"""
-    output_file = 'relationships.csv'
-
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            'SchemaName', 'Type', 'SourceEntity', 'TargetEntity',
-            'SourceAttribute', 'TargetAttribute', 'IntersectEntity'
-        ])
-        writer.writeheader()
-
-        for rel in relationships:
-            writer.writerow({
-                'SchemaName': rel['schemaName'],
-                'Type': rel['type'],
-                'SourceEntity': rel['sourceEntity'],
-                'TargetEntity': rel['targetEntity'],
-                'SourceAttribute': rel.get('sourceAttribute', ''),
-                'TargetAttribute': rel.get('targetAttribute', ''),
-                'IntersectEntity': rel.get('intersectEntity', '')
-            })
-
-    print(f"✓ Exported to {output_file}")
-
-def create_entity_summary(entities, relationships):
+        graph_json.close()
+
+    print(f"\n✓ Exported to entity_graph_data.json, entities.csv, relationships.csv")
+    print(f"  - Entities: {len(summary.entities)}")
+    print(f"  - Relationships: {summary.relationship_count}")
+
+    return summary
+
+def create_entity_summary(summary):
     """Create a summary markdown file"""
     output_file = 'ENTITY_SUMMARY.md'
 
-    # Count relationships per entity
-    entity_rel_count = {}
-    for rel in relationships:
-        source = rel['sourceEntity']
-        target = rel['targetEntity']
-        entity_rel_count[source] = entity_rel_count.get(source, 0) + 1
-        entity_rel_count[target] = entity_rel_count.get(target, 0) + 1
+    entities = summary.entities
+    entity_rel_count = summary.entity_rel_count
 
     # Count custom vs standard
     custom_count = sum(1 for e in entities if e['isCustomEntity'])
@@ -105,7 +102,7 @@ def create_entity_summary(entities, relationships):
         f.write(f"- **Custom Entities**: {custom_count}\n")
         f.write(f"- **Standard Entities**: {len(entities) - custom_count}\n")
         f.write(f"- **Activity Entities**: {activity_count}\n")
-        f.write(f"- **Total Relationships**: {len(relationships)}\n\n")
+        f.write(f"- **Total Relationships**: {summary.relationship_count}\n\n")
 
         f.write("## Top 20 Most Connected Entities\n\n")
         f.write("| Entity | Label | Type | Relationship Count |\n")
@@ -130,7 +127,7 @@ def create_entity_summary(entities, relationships):
 
         custom_entities = [e for e in entities if e['isCustomEntity']]
         for entity in sorted(custom_entities, key=lambda e: e['label'])[:50]:  # First 50
-            desc = entity.get('description', '')[:100]  # Truncate long descriptions
+            desc = entity['description']  # Already truncated to 100 characters
             f.write(f"| {entity['logicalName']} | {entity['label']} | {desc} |\n")
 
         if len(custom_entities) > 50:
@@ -139,19 +136,19 @@ def create_entity_summary(entities, relationships):
     print(f"✓ Created summary in {output_file}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Dynamics 365 entities and relationships")
+    parser.add_argument('--ndjson', action='store_true', help="Also write entities.ndjson and relationships.ndjson")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Dynamics 365 Entity & Relationship Exporter")
     print("=" * 60)
 
-    # Export main JSON
-    graph_data = export_to_json()
-
-    # Export CSVs
-    export_entities_csv(graph_data['nodes'])
-    export_relationships_csv(graph_data['edges'])
+    # Export JSON and CSVs in a single streaming pass
+    summary = export_graph(ndjson=args.ndjson)
 
     # Create summary
-    create_entity_summary(graph_data['nodes'], graph_data['edges'])
+    create_entity_summary(summary)
 
     print("\n" + "=" * 60)
     print("Export Complete!")
@@ -161,3 +158,5 @@ if __name__ == "__main__":
     print("  2. entities.csv            - All entities in CSV")
     print("  3. relationships.csv       - All relationships in CSV")
     print("  4. ENTITY_SUMMARY.md       - Human-readable summary")
+    if args.ndjson:
+        print("  5. entities.ndjson / relationships.ndjson - One JSON record per line")
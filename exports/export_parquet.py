@@ -0,0 +1,56 @@
+"""
+Export the entity graph to Parquet (or Feather) files for analysis in pandas/Arrow
+
+Writes nodes, edges and attributes tables with proper column types,
+dictionary-encoded entity names and compression. Requires pyarrow.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent))
+from backend.services.dynamics_service import DynamicsService
+from backend.services.graph_snapshot import SnapshotCache
+from backend.services.graph_analytics import analytics_stage
+from backend.services.arrow_export import ARROW_FORMATS, DEFAULT_COMPRESSION, export_graph_tables
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export entities, relationships and attributes to Parquet/Feather")
+    parser.add_argument('--format', choices=ARROW_FORMATS, default='parquet', help="Output file format (default: parquet)")
+    parser.add_argument('--compression', default=DEFAULT_COMPRESSION, help="Compression codec (default: zstd)")
+    parser.add_argument('--output-dir', default='.', help="Directory for nodes/edges/attributes files")
+    parser.add_argument('--no-attributes', action='store_true', help="Skip the attribute catalog (saves the bulk attribute fetch)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Dynamics 365 Columnar Exporter")
+    print("=" * 60)
+
+    print("Fetching data from Dynamics 365...")
+    service = DynamicsService()
+
+    # Same snapshot the API serves, including the per-entity graph metrics
+    snapshot_cache = SnapshotCache(service)
+    snapshot_cache.add_stage(analytics_stage)
+    snapshot = snapshot_cache.get()
+
+    catalog = None
+    if not args.no_attributes:
+        catalog = service.get_attribute_catalog([n['logicalName'] for n in snapshot.nodes])
+
+    paths = export_graph_tables(
+        snapshot.nodes,
+        snapshot.edges,
+        args.output_dir,
+        catalog=catalog,
+        file_format=args.format,
+        compression=args.compression
+    )
+
+    print("\n" + "=" * 60)
+    print("Export Complete!")
+    print("=" * 60)
+    print("\nGenerated files:")
+    for name, path in paths.items():
+        print(f"  - {path}  ({path.stat().st_size / 1024:.0f} KiB)")
@@ -0,0 +1,69 @@
+"""
+Export from the running backend's cached snapshot instead of crawling Dynamics 365
+
+Downloads /api/export and streams it to disk, so an export takes seconds,
+needs no Dynamics credentials and adds no load on Dataverse.
+
+Usage:
+    python exports/export_snapshot.py --format json --filter-mode business
+    python exports/export_snapshot.py --format csv --table edges -o relationships.csv
+    python exports/export_snapshot.py --format parquet --filter-mode all --table nodes
+    python exports/export_snapshot.py --format gexf --filter-mode business    # Gephi
+    python exports/export_snapshot.py --format dot -o entities.dot            # Graphviz
+"""
+import argparse
+import re
+import sys
+
+import requests
+
+DEFAULT_API_URL = 'http://localhost:8000/api'
+EXPORT_FORMATS = ('json', 'ndjson', 'csv', 'parquet', 'feather', 'graphml', 'gexf', 'dot')
+FILTER_MODES = ('core_custom', 'business', 'custom', 'all')
+
+def download_export(api_url, params, output_file=None):
+    """
+    Stream an export from the backend to a file
+
+    :param api_url: Backend API base URL, e.g. http://localhost:8000/api
+    :param params: Query parameters for /api/export
+    :param output_file: Target path (default: the file name suggested by the server)
+    :return: Tuple of (path written, bytes written)
+    """
+    with requests.get(f"{api_url.rstrip('/')}/export", params=params, stream=True, timeout=300) as response:
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+
+        if output_file is None:
+            match = re.search(r'filename="([^"]+)"', response.headers.get('Content-Disposition', ''))
+            output_file = match.group(1) if match else f"entity_graph.{params['format']}"
+
+        size = 0
+        with open(output_file, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
+                size += len(chunk)
+
+    return output_file, size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the backend's current entity graph snapshot")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='json', help="Output format (default: json)")
+    parser.add_argument('--filter-mode', choices=FILTER_MODES, default='core_custom', help="Graph view, as for /api/graph")
+    parser.add_argument('--prefixes', help="Comma-separated prefixes (core_custom mode only)")
+    parser.add_argument('--table', choices=('nodes', 'edges'), default='nodes', help="Table for csv/ndjson/parquet/feather")
+    parser.add_argument('--api-url', default=DEFAULT_API_URL, help=f"Backend API base URL (default: {DEFAULT_API_URL})")
+    parser.add_argument('-o', '--output', help="Output file (default: name suggested by the server)")
+    args = parser.parse_args()
+
+    params = {'format': args.format, 'filter_mode': args.filter_mode, 'table': args.table}
+    if args.prefixes:
+        params['prefixes'] = args.prefixes
+
+    try:
+        path, size = download_export(args.api_url, params, args.output)
+    except Exception as e:
+        print(f"❌ Export failed: {e}")
+        sys.exit(1)
+
+    print(f"✓ Exported to {path} ({size / 1024:.0f} KiB)")
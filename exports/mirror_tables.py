@@ -0,0 +1,44 @@
+"""
+Mirror Dataverse tables into a local SQLite database and keep them current
+
+The first run loads each table in full; later runs fetch only the changes
+since the previous run (change tracking must be enabled on the table,
+otherwise it is reloaded). Query the database with any SQLite client or
+dynamics_api.table_mirror.TableMirror.
+
+Usage:
+    python exports/mirror_tables.py accounts contacts              # Add and sync tables
+    python exports/mirror_tables.py                                # Sync every mirrored table
+    python exports/mirror_tables.py accounts --columns name,ownerid --db crm.db
+    python exports/mirror_tables.py --full                         # Reload everything
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent))
+from dynamics_api.dynamics_api import DynamicsAPI
+from dynamics_api.table_mirror import TableMirror
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mirror Dataverse tables into SQLite using change tracking")
+    parser.add_argument('tables', nargs='*', help="Entity set names to add (default: sync the mirrored tables)")
+    parser.add_argument('--db', default='dataverse_mirror.db', help="SQLite database file (default: dataverse_mirror.db)")
+    parser.add_argument('--columns', help="Comma-separated columns to mirror for the given tables (default: all)")
+    parser.add_argument('--full', action='store_true', help="Reload in full instead of applying changes")
+    args = parser.parse_args()
+
+    columns = args.columns.split(',') if args.columns else None
+    with TableMirror(DynamicsAPI(), args.db) as mirror:
+        for table in args.tables:
+            mirror.add_table(table, columns)
+
+        results = {}
+        for table in args.tables or [t['table'] for t in mirror.tables()]:
+            results.update(mirror.sync(table, full=args.full))
+
+        print(f"{'table':<32}{'mode':<8}{'upserted':>10}{'deleted':>10}{'seconds':>10}")
+        for table, result in results.items():
+            print(f"{table:<32}{result['mode']:<8}{result['upserted']:>10,}{result['deleted']:>10,}{result['seconds']:>10.1f}")
+        print(f"\nMirror: {Path(args.db).resolve()}")
@@ -7,6 +7,9 @@ import type { GraphData } from '../types';
 // Use environment variable for API base URL, fallback to localhost
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
 
+// Graph view shown by the app; also used to filter pushed updates
+const GRAPH_QUERY = 'filter_mode=core_custom&prefixes=qrt_,msdyn_';
+
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -21,10 +24,18 @@ export const dynamicsApi = {
    * This reduces the dataset from 964 entities to 270 entities for better visualization performance
    */
   getGraphData: async (): Promise<GraphData> => {
-    const response = await apiClient.get<GraphData>('/graph?filter_mode=core_custom&prefixes=qrt_,msdyn_');
+    const response = await apiClient.get<GraphData>(`/graph?${GRAPH_QUERY}`);
     return response.data;
   },
 
+  /**
+   * URL of the server-sent events stream of graph updates for the same view as getGraphData
+   */
+  getGraphEventsUrl: (since?: number): string => {
+    const sinceParam = since !== undefined ? `&since=${since}` : '';
+    return `${API_BASE_URL}/graph/events?${GRAPH_QUERY}${sinceParam}`;
+  },
+
   /**
    * Fetch all entities
    */
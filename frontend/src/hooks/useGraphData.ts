@@ -1,9 +1,10 @@
 /**
  * Custom hook for fetching and managing graph data
  */
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { dynamicsApi } from '../api/dynamicsApi';
-import type { GraphData } from '../types';
+import { applyChangeLog } from '../utils/changeLog';
+import type { ChangeLog, GraphData } from '../types';
 
 export const useGraphData = () => {
   const [data, setData] = useState<GraphData | null>(null);
@@ -29,6 +30,28 @@ export const useGraphData = () => {
     fetchData();
   }, []);
 
+  // Apply schema changes pushed by the backend after each snapshot refresh.
+  // One connection stays open: the server tracks the version this client has
+  // (and the browser resumes from Last-Event-ID after a reconnect).
+  const loadedVersion = useRef<number | undefined>(undefined);
+  loadedVersion.current = data?.snapshotVersion;
+  const hasVersion = data?.snapshotVersion !== undefined;
+  useEffect(() => {
+    if (!hasVersion) return;
+
+    const events = new EventSource(dynamicsApi.getGraphEventsUrl(loadedVersion.current));
+    events.addEventListener('changes', (event) => {
+      const changeLog: ChangeLog = JSON.parse((event as MessageEvent).data);
+      setData((current) => (current ? applyChangeLog(current, changeLog) : current));
+    });
+    events.addEventListener('resync', () => {
+      refetch();
+    });
+
+    return () => events.close();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [hasVersion]);
+
   const refetch = async () => {
     try {
       setLoading(true);
@@ -20,6 +20,7 @@ export interface Entity {
   description: string;
   hierarchyLevel?: number; // 1=account, 2=portfolio/project, 3=child entities
   requiredFields?: RequiredField[]; // Required fields for this entity (only fetched for hierarchy levels 1, 2, 3)
+  recordCount?: number | null; // Total records (RetrieveTotalRecordCount, refreshed about daily); null if not countable
 }
 
 export interface Relationship {
@@ -41,4 +42,21 @@ export interface GraphData {
   edges: Relationship[];
   nodeCount: number;
   edgeCount: number;
+  snapshotVersion?: number;
+  positions?: Record<string, { x: number; y: number }>; // Only present when requested with ?layout=
+}
+
+export interface ChangeSet<T> {
+  added: T[];
+  removed: string[]; // ids
+  modified: { id: string; set: Partial<T>; unset: string[] }[];
+}
+
+export interface ChangeLog {
+  since: number;
+  version: number;
+  resync: boolean;
+  nodes: ChangeSet<Entity>;
+  edges: ChangeSet<Relationship>;
+  requiredFields: { entity: string; added: RequiredField[]; removed: RequiredField[] }[];
 }
@@ -0,0 +1,40 @@
+/**
+ * Apply a server change-log (/api/changes, /api/graph/events) to graph data
+ */
+import type { ChangeLog, ChangeSet, GraphData } from '../types';
+
+const applyChangeSet = <T extends { id: string }>(records: T[], changes: ChangeSet<T>): T[] => {
+  const removed = new Set(changes.removed);
+  const modified = new Map(changes.modified.map((change) => [change.id, change]));
+
+  const updated = records
+    .filter((record) => !removed.has(record.id))
+    .map((record) => {
+      const change = modified.get(record.id);
+      if (!change) return record;
+      const next: Record<string, unknown> = { ...record, ...change.set };
+      change.unset.forEach((key) => delete next[key]);
+      return next as unknown as T;
+    });
+
+  const existing = new Set(updated.map((record) => record.id));
+  return updated.concat(changes.added.filter((record) => !existing.has(record.id)));
+};
+
+export const applyChangeLog = (data: GraphData, changeLog: ChangeLog): GraphData => {
+  const nodes = applyChangeSet(data.nodes, changeLog.nodes);
+  const nodeIds = new Set(nodes.map((node) => node.id));
+  // Drop edges left dangling by removed nodes
+  const edges = applyChangeSet(data.edges, changeLog.edges).filter(
+    (edge) => nodeIds.has(edge.sourceEntity) && nodeIds.has(edge.targetEntity)
+  );
+
+  return {
+    ...data,
+    nodes,
+    edges,
+    nodeCount: nodes.length,
+    edgeCount: edges.length,
+    snapshotVersion: changeLog.version,
+  };
+};
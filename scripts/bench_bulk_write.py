@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-row writes vs bulk writes (CreateMultiple / $batch) against a simulated Web API
+
+The simulated server takes a fixed latency per request plus a per-record cost,
+applies every request atomically (one invalid record, here a record without a
+name, rejects the whole request with 400) and can throttle: more than
+--concurrency-limit requests in flight get a 429 with Retry-After. Per-row
+writes are timed on a sample and extrapolated. Every bulk run is checked to
+return one result per record, in input order, with exactly the invalid
+records failed (besides any given up on after --max-retries throttled
+attempts, which are counted) and every other record stored on the server.
+
+Usage:
+    python scripts/bench_bulk_write.py [--records 20000] [--invalid 20] [--workers 1,4,8] [--concurrency-limit 0]
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import dynamics_api.dynamics_api as dynamics_api_module
+from dynamics_api.dynamics_api import DynamicsAPI
+from dynamics_api.partitioned_scan import RateLimiter
+
+BASE_URL = 'https://example.crm.dynamics.com'
+DEFINITION = {'LogicalName': 'account', 'PrimaryIdAttribute': 'accountid', 'Attributes': []}
+
+
+class Response:
+    def __init__(self, status_code, body=None, headers=None, text=None):
+        self.status_code = status_code
+        self.text = text if text is not None else (json.dumps(body) if body is not None else '')
+        self.content = self.text.encode('utf-8')
+        self.headers = headers or {}
+
+
+class SimulatedWebAPI:
+    """
+    requests.Session stand-in accepting writes to one table
+    """
+
+    def __init__(self, latency, per_record, concurrency_limit=0):
+        self.latency = latency
+        self.per_record = per_record
+        self.concurrency_limit = concurrency_limit
+        self.headers = {}
+        self.records = {}
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, data=None):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            throttle = self.concurrency_limit and self.in_flight > self.concurrency_limit
+            if throttle:
+                self.throttled += 1
+        try:
+            if throttle:
+                time.sleep(self.latency)
+                return Response(429, {'error': {'message': 'Too many concurrent requests'}}, {'Retry-After': '0.2'})
+            if url.endswith('/$batch'):
+                return self._batch(headers, data.decode('utf-8'))
+            if '/Microsoft.Dynamics.CRM.' in url:
+                return self._multiple(url.rsplit('.', 1)[1], json.loads(data)['Targets'])
+            return self._apply('POST', [(None, json.loads(data))])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _write(self, operations):
+        """
+        Apply (method, record_id, record) operations atomically; returns the ids or an error message
+        """
+        time.sleep(self.latency + self.per_record * len(operations))
+        if any(method != 'PATCH' and not record.get('name') for method, _, record in operations):
+            return None, 'A record is missing the required attribute name'
+        ids = []
+        with self._lock:
+            for method, record_id, record in operations:
+                record_id = record_id or record.get('accountid') or str(uuid.uuid4())
+                self.records[record_id] = {**self.records.get(record_id, {}), **record, 'accountid': record_id}
+                ids.append(record_id)
+        return ids, None
+
+    def _apply(self, method, records):
+        ids, error = self._write([(method, record_id, record) for record_id, record in records])
+        if error:
+            return Response(400, {'error': {'code': '0x80040200', 'message': error}})
+        return Response(204, headers={'OData-EntityId': f"{BASE_URL}/api/data/v9.2/accounts({ids[0]})"})
+
+    def _multiple(self, action, targets):
+        records = [{k: v for k, v in t.items() if k != '@odata.type'} for t in targets]
+        method = 'POST' if action == 'CreateMultiple' else 'PATCH' if action == 'UpdateMultiple' else 'UPSERT'
+        ids, error = self._write([(method, None, record) for record in records])
+        if error:
+            return Response(400, {'error': {'code': '0x80040200', 'message': error}})
+        return Response(200, {'Ids': ids}) if action != 'UpdateMultiple' else Response(204)
+
+    def _batch(self, headers, body):
+        operations, content_ids = [], []
+        for part in re.split(r'\r\n--changeset_\S+\r\n', body)[1:]:
+            if 'HTTP/1.1' not in part:  # Closing boundaries
+                continue
+            head, request_line, rest = re.match(r'(.*?)\r\n\r\n(\S+ \S+) HTTP/1\.1\r\n(.*)', part, re.S).groups()
+            content_ids.append(re.search(r'Content-ID: (\d+)', head).group(1))
+            method, url = request_line.split(' ')
+            record = json.loads(rest.split('\r\n\r\n', 1)[1])
+            key = re.search(r'\(([0-9a-f-]{36})\)$', url)
+            operations.append((method, key.group(1) if key else None, record))
+
+        ids, error = self._write(operations)
+        if error:
+            text = ('--batchresponse_1\r\nContent-Type: application/http\r\nContent-Transfer-Encoding: binary\r\n\r\n'
+                    'HTTP/1.1 400 Bad Request\r\nContent-Type: application/json; odata.metadata=minimal\r\n\r\n'
+                    + json.dumps({'error': {'code': '0x80040200', 'message': error}}) + '\r\n--batchresponse_1--\r\n')
+            return Response(200, text=text)
+        parts = ''.join(
+            f'--changesetresponse_2\r\nContent-Type: application/http\r\nContent-Transfer-Encoding: binary\r\n'
+            f'Content-ID: {content_id}\r\n\r\nHTTP/1.1 204 No Content\r\nOData-Version: 4.0\r\n'
+            f'OData-EntityId: {BASE_URL}/api/data/v9.2/accounts({record_id})\r\n\r\n\r\n'
+            for content_id, record_id in zip(content_ids, ids)
+        )
+        text = ('--batchresponse_1\r\nContent-Type: multipart/mixed; boundary=changesetresponse_2\r\n\r\n'
+                + parts + '--changesetresponse_2--\r\n--batchresponse_1--\r\n')
+        return Response(200, text=text)
+
+
+def client(server):
+    dynamics_api_module.DYNAMICS_RESOURCE_URL = BASE_URL
+    api = DynamicsAPI()
+    api.token_expiry = datetime.max  # No authentication against the simulated server
+    api._session = server
+    api._table_definitions['accounts'] = DEFINITION
+    return api
+
+
+def make_records(count, invalid):
+    rng = random.Random(7)
+    bad = set(rng.sample(range(count), invalid))
+    records = [
+        {'name': '' if i in bad else f'Account {i}', 'revenue': round(rng.uniform(0, 1e6), 2),
+         'numberofemployees': rng.randint(1, 5000)}
+        for i in range(count)
+    ]
+    return records, bad
+
+
+def check(results, records, bad, server):
+    """
+    Returns the number of records given up on after throttling retries ran out
+    """
+    assert [r.index for r in results] == list(range(len(records))), "results out of order"
+    throttled = {r.index for r in results if r.status == 'failed' and 'Too many' in r.error}
+    failed = {r.index for r in results if r.status == 'failed'} - throttled
+    assert failed == bad - throttled, f"expected {len(bad)} failed records, got {len(failed)}"
+    for result in results:
+        if result.status != 'failed':
+            assert server.records[result.id]['name'] == records[result.index]['name'], result
+    return len(throttled)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=20_000)
+    parser.add_argument('--invalid', type=int, default=20, help="Records the server rejects")
+    parser.add_argument('--chunk-size', type=int, default=200)
+    parser.add_argument('--workers', default='1,4,8')
+    parser.add_argument('--sample', type=int, default=200, help="Per-row writes timed before extrapolating")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds per request")
+    parser.add_argument('--per-record', type=float, default=2e-3, help="Seconds of server work per record")
+    parser.add_argument('--concurrency-limit', type=int, default=0, help="Throttle above this many requests in flight (0: off)")
+    parser.add_argument('--rps', type=float, default=0, help="Shared rate limit in requests per second (0: off)")
+    parser.add_argument('--max-retries', type=int, default=5, help="Retries for throttled requests")
+    args = parser.parse_args()
+    logging.getLogger('dynamics_api').setLevel(logging.ERROR)
+
+    records, bad = make_records(args.records, args.invalid)
+    server = SimulatedWebAPI(args.latency, args.per_record, args.concurrency_limit)
+    api = client(server)
+
+    url = f"{BASE_URL}/api/data/v9.2/accounts"
+    start = time.perf_counter()
+    for record in records[:args.sample]:
+        api.send('POST', url, headers=api.headers, data=json.dumps(record))
+    per_row = (time.perf_counter() - start) / args.sample * args.records
+
+    print(f"{args.records:,} records ({args.invalid} invalid), {args.chunk_size} per request, "
+          f"{args.latency * 1000:.0f} ms/request + {args.per_record * 1000:g} ms/record"
+          + (f", throttling above {args.concurrency_limit} in flight" if args.concurrency_limit else ""))
+    print("=" * 80)
+    print(f"{'per-row POST (extrapolated)':<34}{per_row:>9.1f}s")
+    for method in ('multiple', 'batch'):
+        for workers in (int(w) for w in args.workers.split(',')):
+            server.records.clear()
+            server.requests = server.throttled = 0
+            start = time.perf_counter()
+            results = api.write_records('accounts', iter(records), method=method, chunk_size=args.chunk_size,
+                                        max_workers=workers, limiter=RateLimiter(args.rps or None),
+                                        max_retries=args.max_retries)
+            elapsed = time.perf_counter() - start
+            gave_up = check(results, records, bad, server)
+            print(f"{f'{method}, {workers} workers':<34}{elapsed:>9.1f}s  ({per_row / elapsed:.0f}x)"
+                  f"  {server.requests} requests, {server.throttled} throttled"
+                  + (f", {gave_up} records out of retries" if gave_up else ""))
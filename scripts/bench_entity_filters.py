@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: boolean-mask filter views vs the previous per-mode filter loops
+
+Selects synthetic entities for all four /api/graph filter modes, once with
+the old approach (one pass per mode, any(startswith) per prefix per entity)
+and once with GraphMasks, the /api/graph filter path: building the
+predicate masks (once per snapshot) and selecting every mode from them.
+
+Usage:
+    python scripts/bench_entity_filters.py [--entities 100000] [--prefixes 20] [--repeat 5]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+from services.entity_rules import FILTER_MODES, get_rules
+from services.graph_masks import GraphMasks, mode_filter
+
+
+def synthetic_entities(count, prefixes, rules):
+    rng = random.Random(42)
+    system = sorted(rules.system_entities)
+    core = sorted(rules.core_entities)
+    entities = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            name = rng.choice(prefixes) + ''.join(rng.choices(string.ascii_lowercase, k=12))
+            is_custom = True
+        elif roll < 0.7:
+            name = 'new_' + ''.join(rng.choices(string.ascii_lowercase, k=12))
+            is_custom = True
+        elif roll < 0.85:
+            name = rng.choice(system)
+            is_custom = False
+        else:
+            name = rng.choice(core) if rng.random() < 0.2 else ''.join(rng.choices(string.ascii_lowercase, k=10))
+            is_custom = False
+        entities.append({'id': f'{name}_{i}', 'logicalName': name, 'isCustomEntity': is_custom})
+    return entities
+
+
+def legacy_views(entities, include_prefixes, rules):
+    """
+    The filters as they were: a separate pass per mode, prefixes tested one by one
+    """
+    views = {}
+    core = rules.core_entities
+    views['core_custom'] = [
+        e for e in entities
+        if e.get('logicalName', '').lower() in core
+        or (e.get('isCustomEntity', False)
+            and (not include_prefixes
+                 or any(e.get('logicalName', '').lower().startswith(p.lower()) for p in include_prefixes)))
+    ]
+    views['business'] = [
+        e for e in entities
+        if e.get('isCustomEntity', False) or e.get('logicalName', '').lower() not in rules.system_entities
+    ]
+    views['custom'] = [e for e in entities if e['isCustomEntity']]
+    views['all'] = list(entities)
+    return views
+
+
+def mask_views(masks, include_prefixes):
+    prefixes = tuple(p.lower() for p in include_prefixes)
+    return {
+        mode: masks.select(mode_filter(mode, prefixes if mode == 'core_custom' else ()))[0]
+        for mode in FILTER_MODES
+    }
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--entities', type=int, default=100_000)
+    parser.add_argument('--prefixes', type=int, default=20, help="Number of core_custom prefixes requested")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rules = get_rules()
+    rng = random.Random(7)
+    prefixes = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 5))) + '_' for _ in range(args.prefixes)]
+    entities = synthetic_entities(args.entities, prefixes, rules)
+
+    print(f"{args.entities:,} entities, {args.prefixes} prefixes, best of {args.repeat}")
+    print("=" * 60)
+
+    legacy_time, legacy = best_of(args.repeat, lambda: legacy_views(entities, prefixes, rules))
+    full_time, selected = best_of(args.repeat, lambda: mask_views(GraphMasks(entities, [], rules), prefixes))
+    masks = GraphMasks(entities, [], rules)
+    cached_time, _ = best_of(args.repeat, lambda: mask_views(masks, prefixes))
+    for mode in FILTER_MODES:
+        assert [e['id'] for e in legacy[mode]] == [e['id'] for e in selected[mode]], mode
+
+    print(f"{'legacy (pass per mode)':<28}{legacy_time * 1000:>10.1f} ms")
+    print(f"{'masks (build + select)':<28}{full_time * 1000:>10.1f} ms   ({legacy_time / full_time:.1f}x)")
+    print(f"{'masks (select, built)':<28}{cached_time * 1000:>10.1f} ms   ({legacy_time / cached_time:.1f}x)")
+    print()
+    for mode in FILTER_MODES:
+        print(f"  {mode:<12}{len(selected[mode]):>10,} entities")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sequential paging vs partitioned scans against a simulated Web API
+
+The simulated server holds synthetic records ordered by createdon, answers
+$filter ranges on createdon, pages with @odata.nextLink and takes a fixed
+latency per request plus a per-record cost (no real network). It can also
+throttle: more than --concurrency-limit requests in flight get a 429 with
+Retry-After. Every scan is checked to return the same records in the same
+order as the sequential read.
+
+Usage:
+    python scripts/bench_partitioned_scan.py [--records 100000] [--workers 1,2,4,8] [--concurrency-limit 0]
+"""
+import argparse
+import bisect
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import dynamics_api.dynamics_api as dynamics_api_module
+from dynamics_api.dynamics_api import DynamicsAPI
+from dynamics_api.partitioned_scan import RateLimiter
+
+RANGE = re.compile(r"createdon (ge|lt) (\S+?)\)*(?: |$)")
+
+
+class Response:
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode('utf-8')
+        self.text = self.content.decode('utf-8')
+        self.headers = headers or {}
+
+
+class SimulatedWebAPI:
+    """
+    requests.Session stand-in serving one table
+    """
+
+    def __init__(self, record_count, latency, per_record, concurrency_limit=0):
+        start = datetime(2018, 1, 1, tzinfo=timezone.utc)
+        # Skewed creation dates: most records are recent
+        self.records = [
+            {'accountid': f'{i:032x}', 'name': f'Account {i}',
+             'createdon': (start + timedelta(days=2900 * (i / record_count) ** 0.5)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+            for i in range(record_count)
+        ]
+        self.keys = [r['createdon'] for r in self.records]
+        self.latency = latency
+        self.per_record = per_record
+        self.concurrency_limit = concurrency_limit
+        self.headers = {}
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            throttle = self.concurrency_limit and self.in_flight > self.concurrency_limit
+            if throttle:
+                self.throttled += 1
+        try:
+            if throttle:
+                time.sleep(self.latency)
+                return Response(429, {'error': {'message': 'Too many concurrent requests'}}, {'Retry-After': '0.2'})
+            return self._page(url, headers or {})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _page(self, url, headers):
+        parts = urlsplit(url)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        lower, upper = 0, len(self.keys)
+        for op, value in RANGE.findall(query.get('$filter', '')):
+            if op == 'ge':
+                lower = max(lower, bisect.bisect_left(self.keys, value))
+            else:
+                upper = min(upper, bisect.bisect_left(self.keys, value))
+        page_size = int(headers.get('Prefer', 'odata.maxpagesize=5000').split('=')[1])
+        if '$top' in query:
+            page_size = int(query['$top'])
+            if query.get('$orderby', '').endswith('desc'):
+                lower = max(lower, upper - page_size)
+        skip = int(query.pop('$skiptoken', 0))
+        start = lower + skip
+        end = min(upper, start + page_size)
+
+        time.sleep(self.latency + self.per_record * (end - start))
+        body = {'value': [dict(r) for r in self.records[start:end]]}
+        if end < upper and '$top' not in query:
+            body['@odata.nextLink'] = f"{parts.scheme}://{parts.netloc}{parts.path}?{urlencode({**query, '$skiptoken': end - lower})}"
+        return Response(200, body)
+
+
+def client(server):
+    dynamics_api_module.DYNAMICS_RESOURCE_URL = 'https://example.crm.dynamics.com'
+    api = DynamicsAPI()
+    api.token_expiry = datetime.max  # No authentication against the simulated server
+    api._session = server
+    return api
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--page-size', type=int, default=5000)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--partitions-per-worker', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds per request")
+    parser.add_argument('--per-record', type=float, default=20e-6, help="Seconds per returned record")
+    parser.add_argument('--concurrency-limit', type=int, default=0, help="Throttle above this many requests in flight (0: off)")
+    parser.add_argument('--rps', type=float, default=0, help="Shared rate limit in requests per second (0: off)")
+    args = parser.parse_args()
+    logging.getLogger('dynamics_api').setLevel(logging.ERROR)
+
+    server = SimulatedWebAPI(args.records, args.latency, args.per_record, args.concurrency_limit)
+    api = client(server)
+    url = f"https://example.crm.dynamics.com/api/data/v9.2/accounts?$orderby=createdon asc"
+
+    start = time.perf_counter()
+    expected = [r['accountid'] for page in api.iter_pages(url, page_size=args.page_size) for r in page]
+    sequential = time.perf_counter() - start
+    assert len(expected) == args.records
+
+    print(f"{args.records:,} records, {args.page_size} per page, {args.latency * 1000:.0f} ms/request "
+          f"+ {args.per_record * 1e6:.0f} us/record" + (f", throttling above {args.concurrency_limit} in flight" if args.concurrency_limit else ""))
+    print("=" * 72)
+    print(f"{'sequential iter_pages':<28}{sequential:>8.2f}s")
+    for workers in (int(w) for w in args.workers.split(',')):
+        server.requests = server.throttled = 0
+        partitions = api.plan_time_partitions('accounts', workers * args.partitions_per_worker)
+        limiter = RateLimiter(args.rps or None)
+        start = time.perf_counter()
+        ids = [r['accountid'] for page in api.scan_table('accounts', partitions, page_size=args.page_size,
+                                                          max_workers=workers, limiter=limiter)
+               for r in page]
+        elapsed = time.perf_counter() - start
+        assert ids == expected, f"{workers} workers: records differ"
+        print(f"{f'{workers} workers, {len(partitions)} partitions':<28}{elapsed:>8.2f}s  ({sequential / elapsed:.1f}x)"
+              f"  {server.requests} requests, {server.throttled} throttled")
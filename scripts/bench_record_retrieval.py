@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: record pages as a pandas DataFrame vs typed Arrow columns
+
+Builds synthetic Web API response pages (JSON bytes, 5000 records each) for
+an account-like table and decodes them twice: the retrieve_records way (json
+-> list of dicts for every page -> pd.DataFrame) and the retrieve_table way
+(each page -> typed RecordBatch -> one chunked Arrow table). Reports decode
+time, peak traced Python heap during decoding (Arrow buffers live outside
+it and are counted in the result size) and the size of the result. With
+--string-numbers, Money, Decimal and BigInt values are strings, as the Web
+API sends them to retrieve_table (IEEE754Compatible).
+
+Usage:
+    python scripts/bench_record_retrieval.py [--records 200000] [--page-size 5000] [--repeat 3] [--string-numbers]
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from dynamics_api.record_columns import pages_to_table, record_schema
+
+ATTRIBUTES = [
+    {'LogicalName': 'accountid', 'AttributeType': 'Uniqueidentifier'},
+    {'LogicalName': 'name', 'AttributeType': 'String'},
+    {'LogicalName': 'accountnumber', 'AttributeType': 'String'},
+    {'LogicalName': 'description', 'AttributeType': 'Memo'},
+    {'LogicalName': 'numberofemployees', 'AttributeType': 'Integer'},
+    {'LogicalName': 'industrycode', 'AttributeType': 'Picklist'},
+    {'LogicalName': 'statecode', 'AttributeType': 'State'},
+    {'LogicalName': 'statuscode', 'AttributeType': 'Status'},
+    {'LogicalName': 'revenue', 'AttributeType': 'Money', 'Precision': 2, 'PrecisionSource': 0},
+    {'LogicalName': 'creditlimit', 'AttributeType': 'Money', 'Precision': 2, 'PrecisionSource': 2},
+    {'LogicalName': 'exchangerate', 'AttributeType': 'Decimal', 'Precision': 10},
+    {'LogicalName': 'donotemail', 'AttributeType': 'Boolean'},
+    {'LogicalName': 'creditonhold', 'AttributeType': 'Boolean'},
+    {'LogicalName': 'createdon', 'AttributeType': 'DateTime'},
+    {'LogicalName': 'modifiedon', 'AttributeType': 'DateTime'},
+    {'LogicalName': 'parentaccountid', 'AttributeType': 'Lookup'},
+    {'LogicalName': 'ownerid', 'AttributeType': 'Owner'},
+    {'LogicalName': 'versionnumber', 'AttributeType': 'BigInt'},
+    {'LogicalName': 'parentaccountidname', 'AttributeType': 'String', 'AttributeOf': 'parentaccountid'},
+]
+
+
+def synthetic_pages(record_count, page_size, seed=42, string_numbers=False):
+    rng = random.Random(seed)
+    owners = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(50)]
+    number = (lambda value: None if value is None else str(value)) if string_numbers else (lambda value: value)
+
+    def record(i):
+        return {
+            '@odata.etag': f'W/"{i}"',
+            'accountid': str(uuid.UUID(int=rng.getrandbits(128))),
+            'name': f'Account {i}',
+            'accountnumber': f'AC-{i:08d}',
+            'description': None if rng.random() < 0.7 else 'Lorem ipsum ' * rng.randint(1, 10),
+            'numberofemployees': rng.randint(1, 50_000) if rng.random() < 0.8 else None,
+            'industrycode': rng.choice([None, 1, 2, 3, 7, 12]),
+            'statecode': 0,
+            'statuscode': 1,
+            'revenue': number(round(rng.uniform(0, 1e7), 2) if rng.random() < 0.6 else None),
+            'creditlimit': None,
+            'exchangerate': number(1.0),
+            'donotemail': rng.random() < 0.1,
+            'creditonhold': False,
+            'createdon': f'20{rng.randint(10, 25)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T0{rng.randint(0, 9)}:15:00Z',
+            'modifiedon': '2025-06-01T12:00:00Z',
+            '_parentaccountid_value': rng.choice(owners) if rng.random() < 0.3 else None,
+            '_ownerid_value': rng.choice(owners),
+            'versionnumber': number(10_000_000 + i),
+        }
+
+    pages = []
+    for start in range(0, record_count, page_size):
+        value = [record(i) for i in range(start, min(start + page_size, record_count))]
+        pages.append(json.dumps({'@odata.context': '...', 'value': value}).encode('utf-8'))
+    return pages
+
+
+def dataframe_path(pages):
+    import pandas as pd
+    records = []
+    for page in pages:
+        records.extend(json.loads(page.decode('utf-8'))['value'])
+    return pd.DataFrame(records)
+
+
+def arrow_path(pages, schema):
+    return pages_to_table((json.loads(page.decode('utf-8'))['value'] for page in pages), schema)
+
+
+def measure(repeat, fn):
+    """
+    Best time of repeat runs, and the peak traced heap of one run
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=200_000)
+    parser.add_argument('--page-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--string-numbers', action='store_true', help="Money, Decimal and BigInt values as strings")
+    args = parser.parse_args()
+
+    import pandas as pd  # Imported up front so the first timed run does not pay for it
+
+    pages = synthetic_pages(args.records, args.page_size, string_numbers=args.string_numbers)
+    schema = record_schema(ATTRIBUTES)
+    print(f"{args.records:,} records in {len(pages)} pages ({sum(map(len, pages)) / 2**20:.0f} MB JSON), "
+          f"{len(schema)} columns, best of {args.repeat}")
+    print("=" * 72)
+
+    df_time, df_peak, df = measure(args.repeat, lambda: dataframe_path(pages))
+    table_time, table_peak, table = measure(args.repeat, lambda: arrow_path(pages, schema))
+    start = time.perf_counter()
+    converted = table.to_pandas()
+    to_pandas_time = time.perf_counter() - start
+
+    assert table.num_rows == len(df) == args.records
+    assert table.column('accountid').num_chunks == len(pages)
+    for name in ('name', 'numberofemployees', '_ownerid_value'):
+        assert df[name].equals(converted[name]) or df[name].astype(object).equals(converted[name].astype(object)), name
+    assert df['revenue'].astype(float).equals(converted['revenue'].astype(float)), 'revenue'  # Decimal objects
+
+    df_bytes = df.memory_usage(deep=True).sum()
+    print(f"{'':<26}{'decode':>10}{'peak py heap':>14}{'result':>12}")
+    print(f"{'DataFrame (dicts)':<26}{df_time * 1000:>8.0f}ms{df_peak / 2**20:>12.0f}MB{df_bytes / 2**20:>10.0f}MB")
+    print(f"{'Arrow (typed pages)':<26}{table_time * 1000:>8.0f}ms{table_peak / 2**20:>12.0f}MB{table.nbytes / 2**20:>10.0f}MB"
+          f"   ({df_time / table_time:.1f}x)")
+    print(f"{'  + to_pandas on demand':<26}{to_pandas_time * 1000:>8.0f}ms")
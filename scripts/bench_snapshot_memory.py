@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: snapshot as entity/relationship dicts vs compact records
+
+Builds synthetic graphs at the current schema size (964 entities, 12,490
+relationships) and at 10x, shaped like exports/business_entities.json, parses
+them the way a crawl does (fresh dicts and strings per record) and measures
+the traced heap size of the dict snapshot and of the compact_graph records.
+
+Usage:
+    python scripts/bench_snapshot_memory.py [--scales 1,10]
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'backend'))
+from services.graph_records import compact_graph
+
+CURRENT_ENTITIES = 964
+CURRENT_RELATIONSHIPS = 12_490
+
+
+def synthetic_graph_json(entity_count, relationship_count, seed=42):
+    """
+    Graph JSON document built from the exported business entities, with
+    entities copied under new names until the requested sizes are reached
+    """
+    template = json.loads((ROOT / 'exports' / 'business_entities.json').read_text(encoding='utf-8'))
+    rng = random.Random(seed)
+    template_nodes, template_edges = template['nodes'], template['edges']
+    copies = -(-entity_count // len(template_nodes))
+
+    def copy_name(name, copy):
+        return name if copy == 0 else f'{name}{copy}'
+
+    nodes = []
+    for i in range(entity_count):
+        node = dict(template_nodes[i % len(template_nodes)])
+        copy = i // len(template_nodes)
+        for key in ('id', 'logicalName', 'schemaName', 'entitySetName'):
+            if node.get(key):
+                node[key] = copy_name(node[key], copy)
+        node['hierarchyLevel'] = 4
+        node['requiredFields'] = []
+        nodes.append(node)
+    names = {n['id'] for n in nodes}
+
+    edges = []
+    for j in range(relationship_count):
+        edge = dict(template_edges[j % len(template_edges)])
+        edge['id'] = edge['schemaName'] = f"{edge['schemaName']}_{j}"
+        for key in ('sourceEntity', 'targetEntity'):
+            name = copy_name(edge[key], rng.randrange(copies))
+            edge[key] = name if name in names else edge[key]
+        edges.append(edge)
+
+    return json.dumps({'nodes': nodes, 'edges': edges})
+
+
+def traced(fn):
+    """
+    Run fn and return (result, bytes allocated and still alive afterwards)
+    """
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def measure(scale):
+    entity_count, relationship_count = CURRENT_ENTITIES * scale, CURRENT_RELATIONSHIPS * scale
+    document = synthetic_graph_json(entity_count, relationship_count)
+
+    tracemalloc.start()
+    graph, dict_bytes = traced(lambda: json.loads(document))
+
+    def compact():
+        records = compact_graph(graph['nodes'], graph['edges'])
+        graph.clear()  # Drop the dicts, as SnapshotCache does once the records exist
+        return records
+
+    records, delta = traced(compact)
+    compact_bytes = dict_bytes + delta
+    tracemalloc.stop()
+
+    return entity_count, relationship_count, dict_bytes, compact_bytes, records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scales', default='1,10', help="Comma-separated multiples of the current schema size")
+    args = parser.parse_args()
+
+    print(f"{'scale':>5} {'entities':>9} {'relations':>10} {'dicts':>10} {'records':>10} {'saved':>6} "
+          f"{'B/dict':>7} {'B/record':>9}")
+    for scale in (int(s) for s in args.scales.split(',')):
+        entities, relationships, dict_bytes, compact_bytes, _ = measure(scale)
+        record_count = entities + relationships
+        print(
+            f"{scale:>4}x {entities:>9,} {relationships:>10,} "
+            f"{dict_bytes / 2**20:>8.1f}MB {compact_bytes / 2**20:>8.1f}MB {1 - compact_bytes / dict_bytes:>6.0%} "
+            f"{dict_bytes / record_count:>7.0f} {compact_bytes / record_count:>9.0f}"
+        )
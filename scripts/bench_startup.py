@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the backend and the export CLIs
+
+Runs each target in a fresh interpreter with -X importtime, reports the
+wall-clock startup time and the slowest imports, and exits non-zero when a
+target exceeds the budget. Nothing connects to Dynamics 365: the backend is
+only imported and the CLIs are run with --help.
+
+Usage:
+    python scripts/bench_startup.py [--budget 1.0] [--top 8] [--repeat 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (name, working directory, python arguments)
+TARGETS = [
+    ('backend (import app)', ROOT / 'backend', ['-c', 'import app']),
+    ('export_snapshot --help', ROOT, ['exports/export_snapshot.py', '--help']),
+    ('export_entities --help', ROOT, ['exports/export_entities.py', '--help']),
+    ('export_business_entities --help', ROOT, ['exports/export_business_entities.py', '--help']),
+    ('export_parquet --help', ROOT, ['exports/export_parquet.py', '--help']),
+    ('mirror_tables --help', ROOT, ['exports/mirror_tables.py', '--help']),
+]
+
+# Imports that must not happen at startup (they belong to specific code paths)
+DEFERRED_MODULES = ('pandas', 'msal', 'pyarrow')
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+
+def run(cwd, args):
+    """
+    Run one target with -X importtime
+
+    :return: Tuple of (wall seconds, {module: (self us, cumulative us, depth)})
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return elapsed, modules
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget', type=float, default=1.0, help="Maximum startup seconds per target")
+    parser.add_argument('--top', type=int, default=8, help="Slowest packages to list")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per target (best is reported)")
+    args = parser.parse_args()
+
+    failures = []
+    for name, cwd, target_args in TARGETS:
+        try:
+            runs = [run(cwd, target_args) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"✗ {name}: {e}")
+            failures.append(name)
+            continue
+
+        elapsed, modules = min(runs, key=lambda r: r[0])
+        imports = sum(cumulative for _, cumulative, depth in modules.values() if depth == 0) / 1e6
+        deferred = sorted({m.split('.')[0] for m in modules if m.split('.')[0] in DEFERRED_MODULES})
+        ok = elapsed <= args.budget and not deferred
+        print(f"{'✓' if ok else '✗'} {name:<34} {elapsed:6.3f}s  (imports {imports:.3f}s)")
+        if deferred:
+            print(f"    imported at startup: {', '.join(deferred)}")
+
+        # Self time summed per top-level package, wherever in the import tree it was pulled in
+        by_package = {}
+        for module, (self_us, _, _) in modules.items():
+            package = module.split('.')[0]
+            by_package[package] = by_package.get(package, 0) + self_us
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {self_us / 1000:8.1f} ms  {package}")
+        if not ok:
+            failures.append(name)
+
+    if failures:
+        print(f"\nOver budget ({args.budget:.1f}s) or importing deferred modules: {', '.join(failures)}")
+        sys.exit(1)
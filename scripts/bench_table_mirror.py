@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite table mirror (full load, delta syncs, local reads)
+
+A simulated Web API serves one table with change tracking: the full load ends
+with an @odata.deltaLink, and delta requests return only the records created,
+updated or deleted since that link (deletions as $deletedEntity entries).
+Between syncs a fraction of the records is changed. Reports the records and
+bytes transferred per sync, sync time, and local lookup latency against a
+simulated remote lookup, and checks the mirror matches the server after
+every sync. Finally checks that a throttled delta request is retried and
+stays a delta sync, while an expired delta link (410) falls back to a full
+reload.
+
+Usage:
+    python scripts/bench_table_mirror.py [--records 100000] [--change-rate 0.01] [--syncs 3]
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import dynamics_api.dynamics_api as dynamics_api_module
+from dynamics_api.dynamics_api import DynamicsAPI
+from dynamics_api.table_mirror import TableMirror
+
+BASE_URL = 'https://example.crm.dynamics.com'
+
+ATTRIBUTES = [
+    {'LogicalName': 'accountid', 'AttributeType': 'Uniqueidentifier', 'IsPrimaryId': True},
+    {'LogicalName': 'name', 'AttributeType': 'String'},
+    {'LogicalName': 'revenue', 'AttributeType': 'Money'},
+    {'LogicalName': 'numberofemployees', 'AttributeType': 'Integer'},
+    {'LogicalName': 'donotemail', 'AttributeType': 'Boolean'},
+    {'LogicalName': 'modifiedon', 'AttributeType': 'DateTime'},
+    {'LogicalName': 'ownerid', 'AttributeType': 'Owner'},
+]
+
+
+class Response:
+    def __init__(self, body, status_code=200, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode('utf-8')
+        self.text = self.content.decode('utf-8') if status_code != 200 else ''
+        self.headers = headers or {}
+
+
+class ChangeTrackingWebAPI:
+    """
+    requests.Session stand-in for one change-tracked table
+    """
+
+    def __init__(self, record_count, seed=42):
+        self.rng = random.Random(seed)
+        self.version = 0
+        self.records = {}  # id -> record
+        self.changed_at = {}  # id -> version of last change (deletions included)
+        self.deleted = set()
+        self.next_id = 0
+        for _ in range(record_count):
+            self.create()
+        self.headers = {}
+        self.records_sent = 0
+        self.bytes_sent = 0
+        self.failures = []  # Status codes answered to the next requests instead of data
+
+    def _record(self, record_id):
+        return {
+            '@odata.etag': f'W/"{self.version}"',
+            'accountid': record_id,
+            'name': f'Account {record_id[-6:]} v{self.version}',
+            'revenue': round(self.rng.uniform(0, 1e6), 2),
+            'numberofemployees': self.rng.randint(1, 5000),
+            'donotemail': self.rng.random() < 0.1,
+            'modifiedon': datetime(2025, 1, 1).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            '_ownerid_value': f'{self.rng.randrange(50):032x}',
+        }
+
+    def create(self):
+        record_id = f'{self.next_id:08x}-0000-0000-0000-000000000000'
+        self.next_id += 1
+        self.records[record_id] = self._record(record_id)
+        self.changed_at[record_id] = self.version
+
+    def mutate(self, rate):
+        """
+        Change about rate * records: 70% updates, 20% creates, 10% deletes
+        """
+        self.version += 1
+        ids = list(self.records)
+        for _ in range(max(1, int(len(ids) * rate))):
+            roll = self.rng.random()
+            if roll < 0.7:
+                record_id = self.rng.choice(ids)
+                if record_id in self.records:
+                    self.records[record_id] = self._record(record_id)
+                    self.changed_at[record_id] = self.version
+            elif roll < 0.9:
+                self.create()
+            else:
+                record_id = self.rng.choice(ids)
+                if self.records.pop(record_id, None) is not None:
+                    self.deleted.add(record_id)
+                    self.changed_at[record_id] = self.version
+
+    def get(self, url, headers=None):
+        if self.failures:
+            status = self.failures.pop(0)
+            return Response({'error': {'message': f'Simulated HTTP {status}'}}, status, {'Retry-After': '0.01'})
+        parts = urlsplit(url)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        page_size = 5000
+        for preference in (headers or {}).get('Prefer', '').split(','):
+            if preference.startswith('odata.maxpagesize='):
+                page_size = int(preference.split('=')[1])
+        since = int(query['$deltatoken']) if '$deltatoken' in query else None
+        snapshot = int(query.get('snapshot', self.version))
+        skip = int(query.get('$skiptoken', 0))
+        columns = query['$select'].split(',')
+
+        if since is None:
+            ids = sorted(self.records)
+        else:
+            ids = sorted(i for i, version in self.changed_at.items() if since < version <= snapshot)
+        page_ids = ids[skip:skip + page_size]
+        value = []
+        for record_id in page_ids:
+            if record_id in self.records:
+                record = self.records[record_id]
+                value.append({'@odata.etag': record['@odata.etag'], **{c: record.get(c) for c in columns}})
+            else:
+                value.append({'@odata.context': f'{BASE_URL}/api/data/v9.2/$metadata#accounts/$deletedEntity',
+                              'id': record_id, 'reason': 'deleted'})
+
+        body = {'@odata.context': '...', 'value': value}
+        base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        if skip + page_size < len(ids):
+            body['@odata.nextLink'] = f"{base}?{urlencode({**query, '$skiptoken': skip + page_size, 'snapshot': snapshot})}"
+        else:
+            body['@odata.deltaLink'] = f"{base}?{urlencode({'$select': query['$select'], '$deltatoken': snapshot})}"
+        response = Response(body)
+        self.records_sent += len(value)
+        self.bytes_sent += len(response.content)
+        return response
+
+
+def client(server):
+    dynamics_api_module.DYNAMICS_RESOURCE_URL = BASE_URL
+    api = DynamicsAPI()
+    api.token_expiry = datetime.max  # No authentication against the simulated server
+    api._session = server
+    api._table_definitions['accounts'] = {'LogicalName': 'account', 'PrimaryIdAttribute': 'accountid', 'Attributes': ATTRIBUTES}
+    return api
+
+
+def check(mirror, server):
+    local = {row['accountid']: row for row in mirror.query('SELECT * FROM accounts')}
+    assert local.keys() == server.records.keys(), "mirror and server hold different records"
+    for record_id, record in server.records.items():
+        assert local[record_id]['name'] == record['name'], record_id
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--change-rate', type=float, default=0.01, help="Fraction of records changed between syncs")
+    parser.add_argument('--syncs', type=int, default=3)
+    parser.add_argument('--remote-latency', type=float, default=0.05, help="Seconds per remote lookup")
+    args = parser.parse_args()
+    logging.getLogger('dynamics_api').setLevel(logging.ERROR)
+
+    server = ChangeTrackingWebAPI(args.records)
+    api = client(server)
+    with tempfile.TemporaryDirectory() as directory, TableMirror(api, str(Path(directory) / 'mirror.db')) as mirror:
+        mirror.add_table('accounts')
+        print(f"{args.records:,} records, {args.change_rate:.1%} changed between syncs")
+        print("=" * 72)
+        print(f"{'sync':<10}{'records':>10}{'transferred':>14}{'upserted':>10}{'deleted':>9}{'time':>10}")
+
+        for i in range(args.syncs + 1):
+            if i:
+                server.mutate(args.change_rate)
+            server.records_sent = server.bytes_sent = 0
+            result = mirror.sync('accounts')['accounts']
+            check(mirror, server)
+            print(f"{result['mode']:<10}{server.records_sent:>10,}{server.bytes_sent / 2**20:>12.1f}MB"
+                  f"{result['upserted']:>10,}{result['deleted']:>9,}{result['seconds'] * 1000:>8.0f}ms")
+
+        server.mutate(args.change_rate)
+        server.failures = [503, 429]
+        assert mirror.sync('accounts')['accounts']['mode'] == 'delta', "throttled delta sync was not retried"
+        server.mutate(args.change_rate)
+        server.failures = [410]
+        assert mirror.sync('accounts')['accounts']['mode'] == 'full', "expired delta link did not reload"
+        check(mirror, server)
+
+        ids = list(server.records)[:10_000]
+        start = time.perf_counter()
+        for record_id in ids:
+            mirror.get('accounts', record_id)
+        local = (time.perf_counter() - start) / len(ids)
+        print()
+        print(f"local lookup (mirror.get)   {local * 1e6:8.1f} us")
+        print(f"remote lookup (simulated)   {args.remote_latency * 1e6:8.0f} us")